@@ -1,9 +1,13 @@
 """Asset endpoints"""
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, Depends, Header, HTTPException
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.storage import save_upload_file
+from app.core.shape_descriptors import enqueue_descriptor, is_mesh_file
+from app.core.compression import accepts_encoding, decompress_chunks, stored_encoding
+from app.core.retention import register_artifact, set_pinned, touch
+from app.core.storage import save_upload_file, storage_for
 from app.models.asset import Asset
 from app.schemas.asset import AssetOut
 
@@ -20,7 +24,7 @@ def upload_assets(
     """Upload assets (images, drawings, 3D models)"""
     outs = []
     for uf in files:
-        path, size = save_upload_file(uf.file, uf.filename)
+        path, size = save_upload_file(uf.file, uf.filename, uf.content_type)
         a = Asset(
             project_id=project_id,
             asset_type=asset_type,
@@ -30,12 +34,57 @@ def upload_assets(
             storage_path=path,
         )
         db.add(a)
+        register_artifact(db, path, project_id, "upload", size)
         db.commit()
         db.refresh(a)
+        if asset_type == "model3d" and is_mesh_file(uf.filename):
+            enqueue_descriptor("asset", a.id)
         outs.append(a)
     return outs
 
 
+def _serve_asset(asset: Asset, inline: bool, accept_encoding: Optional[str]):
+    """
+    Serve an asset's bytes.
+    
+    Compressed objects go out as stored (Content-Encoding) to clients that
+    accept the codec and are decoded on the fly for the rest. Remote
+    backends redirect to a presigned URL when no decoding is needed.
+    """
+    storage = storage_for(asset.storage_path)
+    encoding = stored_encoding(asset.storage_path)
+    disposition = "inline" if inline else "attachment"
+    headers = {"Content-Disposition": f'{disposition}; filename="{asset.filename}"'}
+    if encoding:
+        headers["Vary"] = "Accept-Encoding"
+    
+    if encoding and not accepts_encoding(accept_encoding, encoding):
+        return StreamingResponse(
+            decompress_chunks(storage.open_stream(asset.storage_path), encoding),
+            media_type=asset.content_type,
+            headers=headers,
+        )
+    
+    url = storage.presigned_url(asset.storage_path, filename=asset.filename, inline=inline)
+    if url:
+        return RedirectResponse(url, status_code=307, headers={"Vary": "Accept-Encoding"} if encoding else None)
+    
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    
+    path = storage.local_path(asset.storage_path)
+    if path is not None:
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="Asset file missing")
+        return FileResponse(path, media_type=asset.content_type, headers=headers)
+    
+    return StreamingResponse(
+        storage.open_stream(asset.storage_path),
+        media_type=asset.content_type,
+        headers=headers,
+    )
+
+
 @router.get("/{asset_id}", response_model=AssetOut)
 def get_asset(asset_id: str, db: Session = Depends(get_db)):
     """Get asset by ID"""
@@ -46,18 +95,48 @@ def get_asset(asset_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/{asset_id}/download")
-def download_asset(asset_id: str, db: Session = Depends(get_db)):
+def download_asset(
+    asset_id: str,
+    accept_encoding: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """Download asset file"""
     asset = db.query(Asset).filter(Asset.id == asset_id).first()
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
-    return FileResponse(asset.storage_path, filename=asset.filename)
+    touch(db, asset.storage_path)
+    return _serve_asset(asset, inline=False, accept_encoding=accept_encoding)
 
 
 @router.get("/{asset_id}/preview")
-def preview_asset(asset_id: str, db: Session = Depends(get_db)):
+def preview_asset(
+    asset_id: str,
+    accept_encoding: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """Preview asset (for images/renders)"""
     asset = db.query(Asset).filter(Asset.id == asset_id).first()
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
-    return FileResponse(asset.storage_path, filename=asset.filename)
+    touch(db, asset.storage_path)
+    return _serve_asset(asset, inline=True, accept_encoding=accept_encoding)
+
+
+@router.post("/{asset_id}/pin")
+def pin_asset(asset_id: str, db: Session = Depends(get_db)):
+    """Protect an asset's file from retention eviction"""
+    asset = db.query(Asset).filter(Asset.id == asset_id).first()
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    set_pinned(db, asset.storage_path, asset.project_id, "upload", True)
+    return {"asset_id": asset.id, "pinned": True}
+
+
+@router.delete("/{asset_id}/pin")
+def unpin_asset(asset_id: str, db: Session = Depends(get_db)):
+    """Make an asset's file evictable again"""
+    asset = db.query(Asset).filter(Asset.id == asset_id).first()
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    set_pinned(db, asset.storage_path, asset.project_id, "upload", False)
+    return {"asset_id": asset.id, "pinned": False}
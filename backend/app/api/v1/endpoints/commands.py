@@ -0,0 +1,32 @@
+"""Command autocomplete endpoints"""
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.core.command_index import TOP_K, get_command_index
+from app.core.database import get_db
+from app.schemas.command import CommandSuggestion, CommandSuggestionsOut
+
+router = APIRouter()
+
+
+@router.get("/suggest", response_model=CommandSuggestionsOut)
+def suggest_commands(
+    prefix: str = Query("", max_length=200),
+    tool: Optional[str] = Query(None, description="blender, rhino, freecad, ... (default: all tools)"),
+    limit: int = Query(10, ge=1, le=TOP_K),
+    db: Session = Depends(get_db),
+):
+    """
+    Autocomplete commands from MCP command history, most frequent first.
+    
+    Served from an in-memory prefix index (app.core.command_index), not by
+    scanning the history columns.
+    """
+    index = get_command_index(db)
+    return CommandSuggestionsOut(
+        prefix=prefix,
+        suggestions=[
+            CommandSuggestion(command=command, count=count, tool=tool)
+            for command, count in index.suggest(prefix, tool, limit)
+        ],
+    )
@@ -1,7 +1,9 @@
 """Extraction endpoints"""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.response_cache import cached_response, invalidate_project
 from app.schemas.extraction import ScaleReferenceIn, ExtractionResultOut
 from app.models.scale_reference import ScaleReference
 from app.models.extraction_result import ExtractionResult
@@ -23,23 +25,31 @@ def set_scale_reference(payload: ScaleReferenceIn, db: Session = Depends(get_db)
     )
     db.add(sr)
     db.commit()
+    invalidate_project(payload.project_id)
     return {"ok": True}
 
 
 @router.get("/result/{project_id}", response_model=ExtractionResultOut)
-def get_extraction_result(project_id: str, db: Session = Depends(get_db)):
+def get_extraction_result(
+    project_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """Get latest extraction result for a project"""
-    result = (
-        db.query(ExtractionResult)
-        .filter(ExtractionResult.project_id == project_id)
-        .order_by(ExtractionResult.version.desc())
-        .first()
-    )
-    
-    if not result:
-        raise HTTPException(
-            status_code=404,
-            detail="No extraction result found. Run extraction first."
+    def build():
+        result = (
+            db.query(ExtractionResult)
+            .filter(ExtractionResult.project_id == project_id)
+            .order_by(ExtractionResult.version.desc())
+            .first()
         )
+        
+        if not result:
+            raise HTTPException(
+                status_code=404,
+                detail="No extraction result found. Run extraction first."
+            )
+        
+        return ExtractionResultOut.model_validate(result).model_dump_json()
     
-    return result
+    return cached_response("extraction", project_id, build, if_none_match)
@@ -0,0 +1,80 @@
+"""Prompt-to-model endpoints"""
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+from app.api.v1.endpoints.jobs import submit_job
+from app.core.database import get_db
+from app.core.prompt_interpreter import InterpreterUnavailable, PromptError, interpret_prompt
+from app.core.response_cache import invalidate_project
+from app.models.project import Project
+from app.schemas.generate import GenerateIn, GenerateOut, TemplateParameters
+from app.schemas.job import JobCreate, JobOut
+
+router = APIRouter()
+
+
+def _project_name(prompt: str) -> str:
+    name = " ".join(prompt.split())
+    return name if len(name) <= 120 else name[:117] + "..."
+
+
+@router.post("", response_model=GenerateOut)
+def generate(payload: GenerateIn, response: Response, db: Session = Depends(get_db)):
+    """
+    Generate a model from a text prompt.
+
+    The prompt is interpreted into base-plate template parameters
+    (PROMPT_INTERPRETER; cached per normalized prompt), then a
+    generate_script job is submitted with them. With run_blender (the
+    default) the worker queues a run_blender job once the script exists;
+    its id appears as result.next_job_id of the generate_script job.
+    """
+    try:
+        interpretation = interpret_prompt(payload.prompt)
+    except PromptError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except InterpreterUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    parameters = {**interpretation.parameters, **payload.parameters.model_dump(exclude_none=True)}
+    
+    if payload.project_id:
+        project = db.query(Project).filter(Project.id == payload.project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+    else:
+        project = Project(name=payload.project_name or _project_name(payload.prompt), description=payload.prompt)
+        db.add(project)
+        db.commit()
+        db.refresh(project)
+        invalidate_project(project.id)
+    
+    # The prompt marks the job as prompt-driven: missing dimensions come from
+    # the project's extraction if there is one, else from template defaults
+    params = {**parameters, "prompt": payload.prompt}
+    if payload.formats:
+        params["formats"] = payload.formats
+    if payload.run_blender:
+        params["then"] = {
+            "job_type": "run_blender",
+            "params": {"formats": payload.formats} if payload.formats else {},
+        }
+    try:
+        job = submit_job(db, JobCreate(project_id=project.id, job_type="generate_script", params=params), response)
+    except HTTPException:
+        if not payload.project_id:
+            # Refused (429) or invalid (422): don't leave an empty project per retry
+            project_id = project.id
+            db.rollback()
+            db.delete(project)
+            db.commit()
+            invalidate_project(project_id)
+        raise
+    
+    return GenerateOut(
+        project_id=project.id,
+        prompt_key=interpretation.key,
+        interpreter=interpretation.interpreter,
+        cached=interpretation.cached,
+        parameters=TemplateParameters(**parameters),
+        job=JobOut.model_validate(job),
+    )
@@ -1,5 +1,6 @@
 """Health check endpoint"""
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from app.core.admission import queue_pressure
 
 router = APIRouter()
 
@@ -8,3 +9,16 @@ router = APIRouter()
 def health():
     """Health check endpoint"""
     return {"status": "ok"}
+
+
+@router.get("/health/queue")
+def queue_health(queue: str = Query(None, description="Queue name (default: RQ_QUEUE_NAME)")):
+    """
+    Queue pressure for autoscalers.
+    
+    pressure is the larger of depth / ADMISSION_MAX_QUEUE_DEPTH and
+    estimated wait / ADMISSION_MAX_WAIT_SECONDS; at 1.0 POST /jobs starts
+    answering 429. desired_workers is the worker count that would bring the
+    wait down to half the limit.
+    """
+    return queue_pressure(queue, fresh=True).to_dict()
@@ -1,18 +1,126 @@
 """Job endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from typing import Iterator, Literal, Optional
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from rq.exceptions import NoSuchJobError
+from rq.job import Job as RQJob
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.queue import q
+from app.core import job_export, sweep
+from app.core.admission import admit
+from app.core.cancellation import request_cancel
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
+from app.core.export_formats import ExportFormatError, resolve_formats
+from app.core.idempotency import IdempotencyKeyMismatch, claim_job, find_duplicate
+from app.core.job_archive import archived_job, list_archived
+from app.core.job_logs import read_log
+from app.core.queue import get_queue, get_redis, job_timeout
 from app.schemas.job import JobCreate, JobOut
+from app.schemas.sweep import SweepSpec
 from app.models.job import Job
-from app.workers.tasks import run_extraction_db, generate_script_db, run_blender_db
+from app.models.model import Model
 
 router = APIRouter()
 
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+LOG_FOLLOW_POLL_SECONDS = 0.5
+
+# Task functions by job type, referenced by import path so the API process
+# never imports worker code (subprocess handling, Blender templates)
+JOB_TASKS = {
+    "extract": "app.workers.tasks.run_extraction_db",
+    "generate_script": "app.workers.tasks.generate_script_db",
+    "run_blender": "app.workers.tasks.run_blender_db",
+    "export": "app.workers.tasks.run_export_db",
+    "measure": "app.workers.tasks.run_measure_db",
+    "sweep": "app.workers.sweep.run_sweep_db",
+}
+
 
 @router.post("", response_model=JobOut)
-def create_job(payload: JobCreate, db: Session = Depends(get_db)):
-    """Create a new async job"""
+def create_job(
+    payload: JobCreate,
+    response: Response,
+    idempotency_key_header: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a new async job.
+    
+    Identical jobs (same project_id, job_type and params) that are still
+    queued or running are returned instead of enqueueing a duplicate, as is
+    any job previously submitted with the same idempotency key.
+    
+    New jobs pass admission control (app.core.admission): past the queue
+    depth or estimated wait limits the request is refused with 429 and
+    Retry-After; accepted jobs carry X-Queue-Depth, X-Queue-Wait-Seconds
+    and X-Job-ETA-Seconds headers.
+    """
+    return submit_job(db, payload, response, payload.idempotency_key or idempotency_key_header)
+
+
+def submit_job(db: Session, payload: JobCreate, response: Response, idempotency_key: Optional[str] = None) -> Job:
+    """Validate, deduplicate, admit and enqueue a job (create_job; also used by /generate)"""
+    if payload.job_type == "sweep":
+        # Reject a bad sweep definition now rather than in the worker
+        try:
+            spec = SweepSpec.model_validate(payload.params)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+        model = None
+        if spec.model_id is not None:
+            model = db.query(Model).options(Model.with_parameters()).filter(Model.id == spec.model_id).first()
+            if model is None:
+                raise HTTPException(status_code=422, detail=f"Model {spec.model_id} not found")
+        try:
+            sweep.sweep_space({k: v.model_dump() for k, v in spec.parameters.items()}, spec.fixed, model)
+        except sweep.SweepError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    if payload.params and "formats" in payload.params:
+        try:
+            resolve_formats(payload.params["formats"])
+        except ExportFormatError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    then = (payload.params or {}).get("then")
+    if then:
+        # Follow-up job the worker queues once this one succeeds
+        if payload.job_type != "generate_script" or not isinstance(then, dict) or then.get("job_type") != "run_blender":
+            raise HTTPException(status_code=422, detail="params.then is only supported as run_blender after generate_script")
+        if "formats" in (then.get("params") or {}):
+            try:
+                resolve_formats(then["params"]["formats"])
+            except ExportFormatError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        existing = find_duplicate(
+            db, payload.project_id, payload.job_type, payload.params, idempotency_key
+        )
+    except IdempotencyKeyMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if existing:
+        response.headers["X-Job-Deduplicated"] = "true"
+        return existing
+    
+    # Duplicates above add no load; everything else is checked against the queue
+    task = JOB_TASKS.get(payload.job_type)
+    if task is None:
+        raise HTTPException(status_code=400, detail=f"Unknown job_type: {payload.job_type}")
+    if settings.ADMISSION_ENABLED:
+        admission = admit(task)
+        if not admission.admitted:
+            raise HTTPException(
+                status_code=429,
+                detail=admission.reason,
+                headers={"Retry-After": str(admission.retry_after)},
+            )
+        response.headers["X-Queue-Depth"] = str(admission.pressure.depth)
+        response.headers["X-Queue-Wait-Seconds"] = str(round(admission.pressure.estimated_wait_seconds))
+        response.headers["X-Job-ETA-Seconds"] = str(round(admission.eta_seconds))
+    
     j = Job(
         project_id=payload.project_id,
         job_type=payload.job_type,
@@ -24,25 +132,182 @@ def create_job(payload: JobCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(j)
     
+    # A concurrent identical submission may have won the race since the lookup
+    try:
+        winner = claim_job(db, j, idempotency_key)
+    except IdempotencyKeyMismatch as e:
+        db.delete(j)
+        db.commit()
+        raise HTTPException(status_code=422, detail=str(e))
+    if winner:
+        db.delete(j)
+        db.commit()
+        response.headers["X-Job-Deduplicated"] = "true"
+        return winner
+    
     # Enqueue task based on job type
-    if payload.job_type == "extract":
-        q.enqueue(run_extraction_db, j.id, payload.project_id, j.params, job_id=j.id)
-    elif payload.job_type == "generate_script":
-        q.enqueue(generate_script_db, j.id, payload.project_id, j.params, job_id=j.id)
-    elif payload.job_type == "run_blender":
-        q.enqueue(run_blender_db, j.id, payload.project_id, j.params, job_id=j.id)
-    else:
-        raise HTTPException(status_code=400, detail=f"Unknown job_type: {payload.job_type}")
+    get_queue().enqueue(
+        task, j.id, payload.project_id, j.params, job_id=j.id, job_timeout=job_timeout(payload.job_type)
+    )
     
     return j
 
 
+def _stream_export(source: str, fmt: str, filters: dict) -> Iterator[bytes]:
+    # The request's session is gone once streaming starts; the cursor needs its own
+    db = SessionLocal()
+    try:
+        yield from job_export.encode(job_export.iter_rows(db, source, **filters), fmt, source)
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_jobs(
+    source: Literal["jobs", "automation"] = Query("jobs", description="jobs (Job) or automation (AutomationJob)"),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    since: Optional[datetime] = Query(None, description="created_at >= since (ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="created_at < until (ISO 8601)"),
+    status: Optional[list[str]] = Query(None, description="repeatable"),
+    job_type: Optional[list[str]] = Query(None, description="repeatable"),
+    project_id: Optional[str] = Query(None, description="jobs only"),
+):
+    """
+    Stream job history as NDJSON or CSV, oldest first.
+
+    Rows are read with a server-side cursor and streamed in chunks, so the
+    export runs in constant memory however many rows match. Each row adds
+    total_seconds, queue_wait_seconds and run_seconds where the source
+    records the timestamps (see app.core.job_export).
+    """
+    filters = {
+        "since": since,
+        "until": until,
+        "statuses": status,
+        "job_types": job_type,
+        "project_id": project_id,
+    }
+    return StreamingResponse(
+        _stream_export(source, format, filters),
+        media_type=job_export.EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{source}-export.{format}"',
+            "Cache-Control": "no-cache",
+        },
+    )
+
+
 @router.get("/{job_id}", response_model=JobOut)
-def get_job(job_id: str, db: Session = Depends(get_db)):
-    """Get job status by ID"""
+def get_job(job_id: str, response: Response, db: Session = Depends(get_db)):
+    """Get job status by ID (finished jobs moved to the archive are served from there)"""
     job = db.query(Job).filter(Job.id == job_id).first()
-    if not job:
+    if job:
+        return job
+    archived = archived_job(db, job_id)
+    if archived is None:
         raise HTTPException(status_code=404, detail="Job not found")
+    response.headers["X-Job-Archived"] = "true"
+    return archived
+
+
+def _follow_log(job_id: str, offset: int, limit: int) -> Iterator[bytes]:
+    """Yield new log bytes until the job finishes (or JOB_LOG_FOLLOW_SECONDS pass)"""
+    deadline = time.monotonic() + settings.JOB_LOG_FOLLOW_SECONDS
+    while True:
+        data, offset, _ = read_log(job_id, offset, limit)
+        if data:
+            yield data
+            continue
+        # The request's session is gone once streaming starts; check status with our own
+        db = SessionLocal()
+        try:
+            status = db.query(Job.status).filter(Job.id == job_id).scalar()
+        finally:
+            db.close()
+        if status in FINISHED_STATUSES or status is None:
+            # Drain anything written between the last read and the final status
+            data, offset, _ = read_log(job_id, offset)
+            if data:
+                yield data
+            return
+        if time.monotonic() >= deadline:
+            return
+        time.sleep(LOG_FOLLOW_POLL_SECONDS)
+
+
+@router.get("/{job_id}/logs")
+def get_job_logs(
+    job_id: str,
+    offset: int = Query(0, description="Byte offset; negative counts back from the end (offset=-4096 tails)"),
+    limit: int = Query(64 * 1024, ge=1, le=4 * 1024 * 1024),
+    follow: bool = Query(False, description="Keep streaming new output until the job finishes"),
+    db: Session = Depends(get_db),
+):
+    """
+    Read a job's full log (Blender stdout/stderr and worker messages).
+    
+    Returns plain text. X-Log-Next-Offset is the offset to pass next time and
+    X-Log-Size the log size at read time. follow=true streams from offset
+    until the job finishes.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job and archived_job(db, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if follow:
+        start = offset
+        if start < 0:
+            _, start, _ = read_log(job_id, offset, 0)
+        return StreamingResponse(
+            _follow_log(job_id, start, limit),
+            media_type="text/plain; charset=utf-8",
+            headers={"X-Log-Offset": str(start), "Cache-Control": "no-cache"},
+        )
+    
+    data, next_offset, size = read_log(job_id, offset, limit)
+    return Response(
+        content=data,
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "X-Log-Offset": str(next_offset - len(data)),
+            "X-Log-Next-Offset": str(next_offset),
+            "X-Log-Size": str(size),
+        },
+    )
+
+
+@router.post("/{job_id}/cancel", response_model=JobOut)
+def cancel_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Cancel a queued or running job.
+    
+    Queued jobs are removed from the RQ queue. Running jobs are signalled;
+    the worker kills the Blender process group, removes partial outputs and
+    picks up the next job.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        archived = archived_job(db, job_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail=f"Job is already {archived['status']}")
+    if job.status not in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+    
+    # Flag first so a worker that dequeues it right now still sees the cancel
+    request_cancel(job.id)
+    
+    try:
+        rq_job = RQJob.fetch(job.id, connection=get_redis())
+    except NoSuchJobError:
+        rq_job = None
+    if rq_job is not None and rq_job.get_status() in ("queued", "deferred", "scheduled"):
+        rq_job.cancel()
+    
+    job.status = "cancelled"
+    job.message = "Cancelled by user"
+    db.commit()
+    db.refresh(job)
     return job
 
 
@@ -51,9 +316,12 @@ def list_jobs(
     project_id: str = Query(None),
     status: str = Query(None),
     limit: int = Query(50, le=100),
+    archived: bool = Query(False, description="List archived jobs (finished more than JOB_ARCHIVE_AFTER_DAYS ago)"),
     db: Session = Depends(get_db)
 ):
     """List jobs with optional filters"""
+    if archived:
+        return list_archived(db, "jobs", project_id=project_id, status=status, limit=limit)
     query = db.query(Job)
     
     if project_id:
@@ -0,0 +1,132 @@
+"""Model library endpoints"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.model_search import InvalidCursor, search_models
+from app.core.shape_descriptors import UnsupportedMeshFormat
+from app.core.shape_index import find_similar
+from app.models.model import Model
+from app.schemas.model import (
+    ModelListOut, ModelOut, ModelParameterOut, ModelSearchHit, ModelSearchOut, ModelSummaryOut,
+    SimilarShape, SimilarShapesOut
+)
+
+router = APIRouter()
+
+
+def _model_out(model: Model, include_parameters: bool, validate: bool) -> ModelOut:
+    out = ModelOut.model_validate(model)
+    if include_parameters:
+        out.parameters = [
+            ModelParameterOut(**p.to_dict())
+            for p in model.model_parameters
+        ]
+    if validate:
+        out.invalid_parameters = {
+            name: message
+            for name, (ok, message) in model.validate_parameters().items()
+            if not ok
+        }
+    return out
+
+
+@router.get("", response_model=ModelListOut)
+def list_models(
+    category: Optional[str] = None,
+    style: Optional[str] = None,
+    after_id: Optional[int] = Query(None, description="next_after_id from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    include_parameters: bool = True,
+    validate: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    List models for the model browser.
+    
+    Parameters for the whole page come from one selectin query, so the
+    number of queries doesn't grow with the page size.
+    """
+    query = db.query(Model)
+    if include_parameters or validate:
+        query = query.options(Model.with_parameters())
+    if category:
+        query = query.filter(Model.category == category)
+    if style:
+        query = query.filter(Model.style == style)
+    if after_id is not None:
+        query = query.filter(Model.id > after_id)
+    models = query.order_by(Model.id).limit(limit + 1).all()
+    
+    has_more = len(models) > limit
+    models = models[:limit]
+    return ModelListOut(
+        items=[_model_out(m, include_parameters, validate) for m in models],
+        next_after_id=models[-1].id if has_more else None,
+    )
+
+
+@router.get("/search", response_model=ModelSearchOut)
+def search(
+    q: Optional[str] = Query(None, max_length=200, description="Words to match (last word matches as a prefix)"),
+    category: Optional[str] = None,
+    style: Optional[str] = None,
+    tag: list[str] = Query([], description="Require every given tag"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    facets: bool = True,
+    db: Session = Depends(get_db),
+):
+    """Search the model library with ranking, facets and cursor pagination"""
+    try:
+        result = search_models(
+            db,
+            q=q,
+            category=category,
+            style=style,
+            tags=tag,
+            limit=limit,
+            cursor=cursor,
+            facets=facets,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return ModelSearchOut(
+        items=[
+            ModelSearchHit(model=ModelSummaryOut.model_validate(model), score=score)
+            for model, score in result["items"]
+        ],
+        next_cursor=result["next_cursor"],
+        total=result["total"],
+        facets=result["facets"],
+    )
+
+
+@router.get("/similar", response_model=SimilarShapesOut)
+def similar(
+    model_id: Optional[int] = None,
+    asset_id: Optional[str] = None,
+    k: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Find models and model3d assets with a similar shape to a model or asset"""
+    if (model_id is None) == (asset_id is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of model_id or asset_id")
+    subject_type, subject_id = ("model", str(model_id)) if model_id is not None else ("asset", asset_id)
+    
+    try:
+        results = find_similar(db, subject_type, subject_id, k=k)
+    except UnsupportedMeshFormat as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"No mesh found for {subject_type} {subject_id}")
+    
+    return SimilarShapesOut(
+        subject_type=subject_type,
+        subject_id=subject_id,
+        results=[
+            SimilarShape(subject_type=key[0], subject_id=key[1], distance=distance)
+            for key, distance in results
+        ],
+    )
@@ -1,7 +1,9 @@
 """Project endpoints"""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.response_cache import cached_response, invalidate_project
 from app.models.project import Project
 from app.schemas.project import ProjectCreate, ProjectOut
 
@@ -15,6 +17,7 @@ def create_project(payload: ProjectCreate, db: Session = Depends(get_db)):
     db.add(p)
     db.commit()
     db.refresh(p)
+    invalidate_project(p.id)
     return p
 
 
@@ -25,9 +28,16 @@ def list_projects(db: Session = Depends(get_db)):
 
 
 @router.get("/{project_id}", response_model=ProjectOut)
-def get_project(project_id: str, db: Session = Depends(get_db)):
+def get_project(
+    project_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """Get project by ID"""
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    def build():
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return ProjectOut.model_validate(project).model_dump_json()
+    
+    return cached_response("project", project_id, build, if_none_match)
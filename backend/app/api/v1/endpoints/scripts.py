@@ -1,66 +1,97 @@
 """Script endpoints"""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from app.core.compression import accepts_encoding
 from app.core.database import get_db
+from app.core.response_cache import cached_response
 from app.models.script_version import ScriptVersion
 from app.schemas.script import ScriptListOut, ScriptVersionOut
+import gzip
 import io
 
 router = APIRouter()
 
 
 @router.get("/{project_id}", response_model=ScriptListOut)
-def list_scripts(project_id: str, db: Session = Depends(get_db)):
+def list_scripts(
+    project_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """List all script versions for a project"""
-    scripts = (
-        db.query(ScriptVersion)
-        .filter(ScriptVersion.project_id == project_id)
-        .order_by(ScriptVersion.version.desc())
-        .all()
-    )
+    def build():
+        scripts = (
+            db.query(ScriptVersion)
+            .filter(ScriptVersion.project_id == project_id)
+            .order_by(ScriptVersion.version.desc())
+            .all()
+        )
+        
+        return ScriptListOut(
+            project_id=project_id,
+            versions=[
+                ScriptVersionOut(
+                    id=s.id,
+                    project_id=s.project_id,
+                    version=s.version,
+                    created_at=s.created_at,
+                    script_length=len(s.script_text)
+                )
+                for s in scripts
+            ]
+        ).model_dump_json()
     
-    return ScriptListOut(
-        project_id=project_id,
-        versions=[
-            ScriptVersionOut(
-                id=s.id,
-                project_id=s.project_id,
-                version=s.version,
-                created_at=s.created_at,
-                script_length=len(s.script_text)
-            )
-            for s in scripts
-        ]
-    )
+    return cached_response("scripts", project_id, build, if_none_match)
 
 
 @router.get("/{project_id}/latest", response_class=PlainTextResponse)
-def get_latest_script(project_id: str, db: Session = Depends(get_db)):
+def get_latest_script(
+    project_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """Get latest script text for a project"""
-    script = (
-        db.query(ScriptVersion)
-        .filter(ScriptVersion.project_id == project_id)
-        .order_by(ScriptVersion.version.desc())
-        .first()
-    )
+    def build():
+        script = (
+            db.query(ScriptVersion)
+            .filter(ScriptVersion.project_id == project_id)
+            .order_by(ScriptVersion.version.desc())
+            .first()
+        )
+        
+        if not script:
+            raise HTTPException(status_code=404, detail="No script found")
+        
+        return script.script_text
     
-    if not script:
-        raise HTTPException(status_code=404, detail="No script found")
-    
-    return PlainTextResponse(script.script_text)
+    return cached_response("script_latest", project_id, build, if_none_match, media_type="text/plain")
 
 
 @router.get("/{script_id}/download")
-def download_script(script_id: str, db: Session = Depends(get_db)):
-    """Download script file"""
+def download_script(
+    script_id: str,
+    accept_encoding: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """Download script file (gzip-encoded if the client accepts it)"""
     script = db.query(ScriptVersion).filter(ScriptVersion.id == script_id).first()
     if not script:
         raise HTTPException(status_code=404, detail="Script not found")
     
+    body = script.script_text.encode("utf-8")
+    headers = {
+        "Content-Disposition": f'attachment; filename="blender_script_v{script.version}.py"',
+        "Vary": "Accept-Encoding",
+    }
+    if len(body) > 1024 and accepts_encoding(accept_encoding, "gzip"):
+        body = gzip.compress(body, mtime=0)
+        headers["Content-Encoding"] = "gzip"
+    
     # Use StreamingResponse to avoid temp file
     return StreamingResponse(
-        io.BytesIO(script.script_text.encode("utf-8")),
+        io.BytesIO(body),
         media_type="text/x-python",
-        headers={"Content-Disposition": f'attachment; filename="blender_script_v{script.version}.py"'}
+        headers=headers,
     )
@@ -0,0 +1,87 @@
+"""Design-space sweep result endpoints (sweeps run as 'sweep' jobs)"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from app.core import sweep
+from app.core.database import get_db
+from app.core.job_archive import archived_job
+from app.core.retention import touch
+from app.core.storage import read_artifact, storage_for
+from app.models.job import Job
+from app.schemas.sweep import SweepResultsOut
+
+router = APIRouter()
+
+
+def _results_location(db: Session, job_id: str) -> str:
+    """Stored results of a finished sweep (archived sweep jobs keep theirs)"""
+    job = db.query(Job).filter(Job.id == job_id, Job.job_type == "sweep").first()
+    if job:
+        status, result = job.status, job.result
+    else:
+        archived = archived_job(db, job_id)
+        if archived is None or archived.get("job_type") != "sweep":
+            raise HTTPException(status_code=404, detail="Sweep not found")
+        status, result = archived.get("status"), archived.get("result")
+    location = (result or {}).get("results_path")
+    if status != "succeeded" or not location:
+        raise HTTPException(status_code=409, detail=f"Sweep is {status}; results are not ready")
+    return location
+
+
+@router.get("/{job_id}/results", response_model=SweepResultsOut)
+def query_sweep_results(
+    job_id: str,
+    where: List[str] = Query([], description='Filters like "mass_g<50" or "success==true" (ANDed)'),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    order_by: Optional[str] = Query(None, description='Sort column, "-" prefix for descending'),
+    limit: int = Query(100, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """Filter, sort and page a finished sweep's variants"""
+    location = _results_location(db, job_id)
+    try:
+        table = sweep.load_results(read_artifact(location))
+        matched, rows = sweep.query_results(
+            table,
+            where=where,
+            columns=[c.strip() for c in columns.split(",") if c.strip()] if columns else None,
+            order_by=order_by,
+            limit=limit,
+            offset=offset,
+        )
+    except sweep.SweepError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    return SweepResultsOut(
+        job_id=job_id,
+        total_variants=table.num_rows,
+        matched=matched,
+        columns=list(rows[0]) if rows else (columns.split(",") if columns else table.column_names),
+        rows=rows,
+    )
+
+
+@router.get("/{job_id}/results.parquet")
+def download_sweep_results(job_id: str, db: Session = Depends(get_db)):
+    """Download the full results as Parquet (pandas/polars/DuckDB read it directly)"""
+    location = _results_location(db, job_id)
+    touch(db, location)
+    storage = storage_for(location)
+    filename = f"sweep_{job_id}.parquet"
+    
+    url = storage.presigned_url(location, filename=filename)
+    if url:
+        return RedirectResponse(url, status_code=307)
+    
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    path = storage.local_path(location)
+    if path is not None:
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="Results file missing")
+        return FileResponse(path, media_type=sweep.RESULTS_CONTENT_TYPE, headers=headers)
+    return StreamingResponse(storage.open_stream(location), media_type=sweep.RESULTS_CONTENT_TYPE, headers=headers)
@@ -1,6 +1,6 @@
 """API v1 router"""
 from fastapi import APIRouter
-from app.api.v1.endpoints import health, projects, assets, extraction, scripts, jobs, blender
+from app.api.v1.endpoints import health, projects, assets, extraction, scripts, jobs, blender, models, sweeps, generate, commands
 
 api_router = APIRouter()
 
@@ -11,3 +11,7 @@ api_router.include_router(extraction.router, prefix="/extraction", tags=["extrac
 api_router.include_router(scripts.router, prefix="/scripts", tags=["scripts"])
 api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
 api_router.include_router(blender.router, prefix="/blender", tags=["blender"])
+api_router.include_router(models.router, prefix="/models", tags=["models"])
+api_router.include_router(sweeps.router, prefix="/sweeps", tags=["sweeps"])
+api_router.include_router(generate.router, prefix="/generate", tags=["generate"])
+api_router.include_router(commands.router, prefix="/commands", tags=["commands"])
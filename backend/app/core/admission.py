@@ -0,0 +1,159 @@
+"""
+Admission control for job submission.
+
+POST /jobs looks at the queue before accepting work. Queue depth, the
+number of workers and recent run times (recorded by the workers per task
+function) give an estimated wait. Past ADMISSION_MAX_QUEUE_DEPTH or
+ADMISSION_MAX_WAIT_SECONDS new jobs are refused with 429 and a
+Retry-After; otherwise they are accepted with the estimate in response
+headers. queue_pressure() is the same snapshot for autoscalers
+(GET /api/v1/health/queue).
+"""
+from dataclasses import asdict, dataclass
+from typing import Optional
+import math
+import statistics
+import threading
+import time
+from app.core.config import settings
+from app.core.queue import get_queue, get_redis
+
+RUNTIME_SAMPLES = 200
+# Submissions within this window share one Redis snapshot (adjusted for what they enqueue)
+SNAPSHOT_SECONDS = 1.0
+MAX_RETRY_AFTER_SECONDS = 3600
+
+_snapshot_lock = threading.Lock()
+_snapshots: dict[str, tuple[float, "QueuePressure"]] = {}
+
+
+def _runtime_key(func_name: Optional[str] = None) -> str:
+    return f"admission:runtimes:{func_name or '*'}"
+
+
+def record_run_time(func_name: str, seconds: float) -> None:
+    """Add a finished job's run time to its task's and the queue-wide samples (workers call this)"""
+    pipe = get_redis().pipeline(transaction=False)
+    for key in (_runtime_key(func_name), _runtime_key()):
+        pipe.lpush(key, round(seconds, 3))
+        pipe.ltrim(key, 0, RUNTIME_SAMPLES - 1)
+    pipe.execute()
+
+
+def mean_run_seconds(func_name: Optional[str] = None) -> float:
+    """Mean recent run time of a task (all tasks if None); ADMISSION_DEFAULT_RUN_SECONDS without samples"""
+    samples = get_redis().lrange(_runtime_key(func_name), 0, -1)
+    if not samples:
+        return settings.ADMISSION_DEFAULT_RUN_SECONDS
+    return statistics.fmean(float(s) for s in samples)
+
+
+@dataclass(frozen=True)
+class QueuePressure:
+    queue: str
+    depth: int  # jobs waiting
+    running: int
+    workers: int
+    mean_run_seconds: float
+    estimated_wait_seconds: float  # until a newly queued job starts
+    pressure: float  # 1.0 = at the admission limit; above it new jobs are refused
+    
+    @property
+    def desired_workers(self) -> int:
+        """Workers needed to bring the wait down to half the admission limit"""
+        work = (self.depth + self.running) * self.mean_run_seconds
+        # Without a wait limit, aim to drain the backlog in ten minutes
+        target = (settings.ADMISSION_MAX_WAIT_SECONDS or 1200) / 2
+        return max(1 if work else 0, math.ceil(work / target))
+    
+    def to_dict(self) -> dict:
+        return {**asdict(self), "desired_workers": self.desired_workers, "admitting": self.pressure < 1}
+
+
+def _measure(queue_name: str) -> QueuePressure:
+    from rq import Worker
+    
+    queue = get_queue(queue_name)
+    depth = queue.count
+    running = queue.started_job_registry.count
+    workers = Worker.count(queue=queue)
+    mean = mean_run_seconds()
+    return _pressure(queue_name, depth, running, workers, mean)
+
+
+def _pressure(queue_name: str, depth: int, running: int, workers: int, mean: float) -> QueuePressure:
+    # Without workers the backlog can't be timed; assume one so depth still counts
+    wait = depth * mean / max(workers, 1)
+    ratios = [wait / settings.ADMISSION_MAX_WAIT_SECONDS] if settings.ADMISSION_MAX_WAIT_SECONDS else [0.0]
+    if settings.ADMISSION_MAX_QUEUE_DEPTH:
+        ratios.append(depth / settings.ADMISSION_MAX_QUEUE_DEPTH)
+    return QueuePressure(
+        queue=queue_name,
+        depth=depth,
+        running=running,
+        workers=workers,
+        mean_run_seconds=round(mean, 3),
+        estimated_wait_seconds=round(wait, 1),
+        pressure=round(max(ratios), 3),
+    )
+
+
+def queue_pressure(queue_name: Optional[str] = None, fresh: bool = False) -> QueuePressure:
+    """Current load of a queue (cached for SNAPSHOT_SECONDS unless fresh)"""
+    queue_name = queue_name or settings.RQ_QUEUE_NAME
+    now = time.monotonic()
+    with _snapshot_lock:
+        cached = _snapshots.get(queue_name)
+        if cached and not fresh and now - cached[0] < SNAPSHOT_SECONDS:
+            return cached[1]
+    snapshot = _measure(queue_name)
+    with _snapshot_lock:
+        _snapshots[queue_name] = (now, snapshot)
+    return snapshot
+
+
+def _note_enqueued(snapshot: QueuePressure) -> None:
+    """Count a job accepted on a cached snapshot so a burst can't overshoot the limits"""
+    with _snapshot_lock:
+        cached = _snapshots.get(snapshot.queue)
+        if cached and cached[1] is snapshot:
+            s = snapshot
+            _snapshots[s.queue] = (cached[0], _pressure(s.queue, s.depth + 1, s.running, s.workers, s.mean_run_seconds))
+
+
+@dataclass(frozen=True)
+class Admission:
+    admitted: bool
+    pressure: QueuePressure
+    run_seconds: float  # expected run time of the submitted job
+    retry_after: int = 0  # seconds, when refused
+    reason: Optional[str] = None
+    
+    @property
+    def eta_seconds(self) -> float:
+        """Expected time until the submitted job finishes"""
+        return self.pressure.estimated_wait_seconds + self.run_seconds
+
+
+def admit(func_name: Optional[str], queue_name: Optional[str] = None) -> Admission:
+    """Decide whether one more job of this task may be queued; counts it if so"""
+    snapshot = queue_pressure(queue_name)
+    run_seconds = round(mean_run_seconds(func_name), 3) if func_name else snapshot.mean_run_seconds
+    per_job = snapshot.mean_run_seconds / max(snapshot.workers, 1)
+    
+    reason = None
+    excess_seconds = 0.0
+    max_depth = settings.ADMISSION_MAX_QUEUE_DEPTH
+    max_wait = settings.ADMISSION_MAX_WAIT_SECONDS
+    if max_depth and snapshot.depth >= max_depth:
+        reason = f"Queue '{snapshot.queue}' is full ({snapshot.depth} jobs waiting)"
+        excess_seconds = (snapshot.depth - max_depth + 1) * per_job
+    elif max_wait and snapshot.estimated_wait_seconds >= max_wait:
+        reason = f"Estimated queue wait is {snapshot.estimated_wait_seconds:.0f}s (limit {max_wait:.0f}s)"
+        excess_seconds = snapshot.estimated_wait_seconds - max_wait + per_job
+    
+    if reason:
+        retry_after = min(MAX_RETRY_AFTER_SECONDS, max(1, math.ceil(excess_seconds)))
+        return Admission(False, snapshot, run_seconds, retry_after, reason)
+    _note_enqueued(snapshot)
+    return Admission(True, snapshot, run_seconds)
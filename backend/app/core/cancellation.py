@@ -0,0 +1,28 @@
+"""Cooperative job cancellation signalled through Redis"""
+from app.core.queue import get_redis
+
+# Long enough for any running job to notice the flag (run_blender timeout is 300s)
+CANCEL_FLAG_TTL_SECONDS = 3600
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the job it is running has been cancelled"""
+
+
+def _cancel_key(job_id: str) -> str:
+    return f"jobs:cancel:{job_id}"
+
+
+def request_cancel(job_id: str) -> None:
+    """Ask whichever worker holds job_id to stop it"""
+    get_redis().set(_cancel_key(job_id), 1, ex=CANCEL_FLAG_TTL_SECONDS)
+
+
+def is_cancel_requested(job_id: str) -> bool:
+    """Check whether job_id has been cancelled"""
+    return bool(get_redis().exists(_cancel_key(job_id)))
+
+
+def clear_cancel(job_id: str) -> None:
+    """Drop the cancel flag once the job has been wound down"""
+    get_redis().delete(_cancel_key(job_id))
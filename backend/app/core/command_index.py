@@ -0,0 +1,256 @@
+"""
+Prefix index over MCP command history for autocomplete.
+
+Every command found in Model.mcp_command_history is counted once per
+occurrence. The index keeps the distinct commands (normalized: lowercase,
+single spaces) in one sorted list, so the commands starting with a prefix
+are a contiguous slice found by bisection. Suggestions are the most
+frequent commands of that slice. Slices wider than SCAN_LIMIT are ranked
+once and cached until a command under that prefix changes, so a lookup
+costs a bisection plus at most SCAN_LIMIT count comparisons.
+
+Commands without a tool count for every tool: a suggestion request for
+"blender" sees the blender-tagged history plus all untagged history.
+
+Each process builds its index on first use. Models committed by the same
+process are applied right away (see the Model mapper events in
+app.models.model); changes made elsewhere are picked up by polling
+updated_at every COMMAND_INDEX_REFRESH_SECONDS.
+"""
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+import heapq
+import re
+import threading
+import time
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.model import Model
+
+MAX_COMMAND_LENGTH = 500
+TOP_K = 50  # suggestions kept per cached prefix (the most a request may ask for)
+SCAN_LIMIT = 2000  # wider slices are ranked once and cached
+CACHE_MAX_PREFIXES = 4096
+# Re-read rows updated slightly before the last poll: commits land out of updated_at order
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+ALL_TOOLS = ""
+COMMAND_KEYS = ("command", "cmd", "text", "prompt")
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_command(text: str) -> str:
+    return _SPACE_RE.sub(" ", text).strip().lower()[:MAX_COMMAND_LENGTH]
+
+
+def commands_from_history(history: Any) -> list[tuple[str, str]]:
+    """
+    (tool, command text) pairs from an mcp_command_history value.
+
+    Accepts a list of strings or of dicts holding the text under one of
+    COMMAND_KEYS (optionally with "tool"), or a dict with such a list under
+    "commands".
+    """
+    if isinstance(history, dict):
+        history = history.get("commands")
+    if not isinstance(history, list):
+        return []
+    found = []
+    for entry in history:
+        tool = ALL_TOOLS
+        if isinstance(entry, dict):
+            tool = str(entry.get("tool") or "").lower()
+            entry = next((entry[k] for k in COMMAND_KEYS if isinstance(entry.get(k), str)), None)
+        if isinstance(entry, str) and entry.strip():
+            found.append((tool, " ".join(entry.split())[:MAX_COMMAND_LENGTH]))
+    return found
+
+
+class PrefixIndex:
+    """Distinct commands in sorted order with occurrence counts"""
+    
+    def __init__(self):
+        self._keys: list[str] = []
+        self._counts: dict[str, int] = {}
+        self._display: dict[str, str] = {}  # latest original spelling
+        self._top: dict[str, list[str]] = {}  # ranked keys of wide prefixes
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def add(self, text: str, delta: int) -> None:
+        key = normalize_command(text)
+        if not key:
+            return
+        count = self._counts.get(key, 0) + delta
+        if count > 0:
+            if key not in self._counts:
+                insort(self._keys, key)
+            self._counts[key] = count
+            if delta > 0:
+                self._display[key] = text
+        elif key in self._counts:
+            del self._keys[bisect_left(self._keys, key)]
+            del self._counts[key]
+            del self._display[key]
+        # Cached rankings of every prefix of the key may have changed
+        if self._top:
+            for end in range(len(key) + 1):
+                self._top.pop(key[:end], None)
+    
+    def items(self) -> list[tuple[str, int]]:
+        """Every (command, count) pair, in bulk_load's input form"""
+        return [(self._display[key], self._counts[key]) for key in self._keys]
+    
+    def bulk_load(self, items: Iterable[tuple[str, int]]) -> None:
+        """Add many (text, count) pairs, sorting once instead of inserting one by one"""
+        for text, n in items:
+            key = normalize_command(text)
+            if key and n > 0:
+                self._counts[key] = self._counts.get(key, 0) + n
+                self._display[key] = text
+        self._keys = sorted(self._counts)
+        self._top.clear()
+    
+    def _rank(self, keys: Iterable[str], k: int) -> list[str]:
+        counts = self._counts
+        return heapq.nsmallest(k, keys, key=lambda key: (-counts[key], len(key), key))
+    
+    def suggest(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        """Most frequent commands starting with prefix: [(command, count)]"""
+        prefix = normalize_command(prefix)
+        limit = min(limit, TOP_K)
+        ranked = self._top.get(prefix)
+        if ranked is None:
+            start = bisect_left(self._keys, prefix)
+            end = bisect_left(self._keys, prefix + "\U0010ffff", start)
+            if end - start <= SCAN_LIMIT:
+                ranked = self._rank(self._keys[start:end], limit)
+            else:
+                ranked = self._rank(self._keys[start:end], TOP_K)
+                if len(self._top) >= CACHE_MAX_PREFIXES:
+                    self._top.clear()
+                self._top[prefix] = ranked
+        return [(self._display[key], self._counts[key]) for key in ranked[:limit]]
+
+
+class CommandIndex:
+    """Per-tool prefix indexes plus the per-model counts needed to replace a model's history"""
+    
+    def __init__(self):
+        self._tools: dict[str, PrefixIndex] = {ALL_TOOLS: PrefixIndex()}
+        self._untagged = PrefixIndex()  # also counted in every tool's index
+        self._models: dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self.loaded_until: Optional[datetime] = None
+        self.checked_at = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._tools[ALL_TOOLS])
+    
+    def _tool_index(self, tool: str) -> PrefixIndex:
+        index = self._tools.get(tool)
+        if index is None:
+            # A tool's first tagged command: start from the untagged history
+            index = self._tools[tool] = PrefixIndex()
+            index.bulk_load(self._untagged.items())
+        return index
+    
+    def _apply(self, counts: Counter, sign: int) -> None:
+        for (tool, text), n in counts.items():
+            if tool:
+                self._tools[ALL_TOOLS].add(text, sign * n)
+                self._tool_index(tool).add(text, sign * n)
+            else:
+                self._untagged.add(text, sign * n)
+                for index in self._tools.values():
+                    index.add(text, sign * n)
+    
+    def _build(self) -> None:
+        tagged: dict[str, list[tuple[str, int]]] = {ALL_TOOLS: []}
+        untagged: list[tuple[str, int]] = []
+        for counts in self._models.values():
+            for (tool, text), n in counts.items():
+                if tool:
+                    tagged[ALL_TOOLS].append((text, n))
+                    tagged.setdefault(tool, []).append((text, n))
+                else:
+                    untagged.append((text, n))
+        with self._lock:
+            self._untagged.bulk_load(untagged)
+            for tool, items in tagged.items():
+                self._tools.setdefault(tool, PrefixIndex()).bulk_load(items + untagged)
+    
+    def set_model(self, model_id: int, history: Any) -> None:
+        """Replace one model's contribution with its current history"""
+        counts = Counter(commands_from_history(history))
+        with self._lock:
+            old = self._models.pop(model_id, None)
+            if old:
+                self._apply(old, -1)
+            if counts:
+                self._apply(counts, 1)
+                self._models[model_id] = counts
+    
+    def remove_model(self, model_id: int) -> None:
+        self.set_model(model_id, None)
+    
+    def suggest(self, prefix: str, tool: Optional[str] = None, limit: int = 10) -> list[tuple[str, int]]:
+        with self._lock:
+            # A tool nothing is tagged with yet still gets the untagged history
+            index = self._tools.get((tool or ALL_TOOLS).lower(), self._untagged)
+            return index.suggest(prefix, limit)
+    
+    def load(self, db: Session, batch_size: int = 1000) -> int:
+        """Apply every model updated since the last load; returns models read"""
+        query = db.query(Model.id, Model.mcp_command_history, Model.updated_at)
+        if self.loaded_until is not None:
+            query = query.filter(Model.updated_at >= self.loaded_until - REFRESH_OVERLAP)
+        initial = self.loaded_until is None and not self._models
+        seen = 0
+        latest = self.loaded_until
+        for row in query.execution_options(yield_per=batch_size):
+            if initial:
+                counts = Counter(commands_from_history(row.mcp_command_history))
+                if counts:
+                    self._models[row.id] = counts
+            elif row.mcp_command_history or row.id in self._models:
+                self.set_model(row.id, row.mcp_command_history)
+            if latest is None or (row.updated_at is not None and row.updated_at > latest):
+                latest = row.updated_at
+            seen += 1
+        if initial:
+            self._build()
+        self.loaded_until = latest
+        self.checked_at = time.monotonic()
+        return seen
+
+
+_index: Optional[CommandIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_command_index(db: Session) -> CommandIndex:
+    """Process-wide index, refreshed from the database every COMMAND_INDEX_REFRESH_SECONDS"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = CommandIndex()
+            index.load(db)
+            _index = index
+        elif time.monotonic() - _index.checked_at >= settings.COMMAND_INDEX_REFRESH_SECONDS:
+            _index.load(db)
+        return _index
+
+
+def apply_committed(changes: dict[int, Any]) -> None:
+    """Apply models committed by this process ({model_id: history, None when deleted})"""
+    index = _index
+    if index is None:
+        # Not built yet: the first lookup reads everything anyway
+        return
+    for model_id, history in changes.items():
+        index.set_model(model_id, history)
@@ -0,0 +1,138 @@
+"""
+Transparent compression of stored artifacts.
+
+Compressed objects keep their codec as a server-only suffix on storage_path
+(output.stl+zst, notes.txt+gz), so no schema change is needed to know how
+an asset is stored. "+" never appears in names taken from users (see
+app.core.storage.storage_name), so an upload of its own named foo.stl.gz is
+stored and served as the plain bytes it is. Downloads hand the stored bytes
+to clients that accept the codec (Content-Encoding) and decode on the fly
+for everyone else.
+
+zstd needs the optional `zstandard` package; gzip is always available.
+"""
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+import gzip
+import shutil
+import tempfile
+import zlib
+from app.core.config import settings
+
+SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}  # file extensions (job log segments)
+STORED_SUFFIXES = {"zstd": "+zst", "gzip": "+gz"}  # markers on compressed artifacts
+
+COPY_CHUNK_SIZE = 1024 * 1024
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("zstd compression requires the 'zstandard' package") from e
+    return zstandard
+
+
+def stored_encoding(location: str) -> Optional[str]:
+    """Content-Encoding of a stored artifact, from the marker the server gave it"""
+    for encoding, suffix in STORED_SUFFIXES.items():
+        if location.endswith(suffix):
+            return encoding
+    return None
+
+
+def configured_encoding() -> Optional[str]:
+    """Codec new artifacts are written with (STORAGE_COMPRESSION)"""
+    encoding = settings.STORAGE_COMPRESSION.lower()
+    if encoding in ("", "none"):
+        return None
+    if encoding not in SUFFIXES:
+        raise ValueError(f"Unknown STORAGE_COMPRESSION: {settings.STORAGE_COMPRESSION}")
+    return encoding
+
+
+def should_compress(content_type: Optional[str]) -> Optional[str]:
+    """Codec to store an artifact of this type with, or None to store it raw"""
+    encoding = configured_encoding()
+    if encoding is None or not content_type:
+        return None
+    types = {t.strip() for t in settings.STORAGE_COMPRESS_TYPES.split(",") if t.strip()}
+    return encoding if content_type.split(";")[0].strip() in types else None
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows the given codec"""
+    if not accept_encoding:
+        return False
+    aliases = {encoding, "x-gzip"} if encoding == "gzip" else {encoding}
+    wildcard = False
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token in aliases:
+            # An explicit entry wins over the wildcard, including q=0
+            return q > 0
+        if token == "*":
+            wildcard = q > 0
+    return wildcard
+
+
+def _writer(raw, encoding: str):
+    level = settings.STORAGE_COMPRESSION_LEVEL
+    if encoding == "gzip":
+        # No embedded filename/mtime so identical inputs give identical objects
+        return gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=level or 6, mtime=0)
+    return _zstandard().ZstdCompressor(level=level or 3).stream_writer(raw, closefd=False)
+
+
+def compress_file(src: Path, encoding: str, suffix: Optional[str] = None) -> Path:
+    """Write src compressed next to it (src + suffix, the codec's extension by default); returns the new path"""
+    src = Path(src)
+    dest = src.with_name(src.name + (suffix or SUFFIXES[encoding]))
+    with src.open("rb") as fin, dest.open("wb") as raw:
+        with _writer(raw, encoding) as fout:
+            shutil.copyfileobj(fin, fout, COPY_CHUNK_SIZE)
+    return dest
+
+
+def compress_stream(file_obj, encoding: str) -> tuple[tempfile.SpooledTemporaryFile, int]:
+    """Compress a stream into a rewound temp file; returns (file, uncompressed size)"""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    size = 0
+    with _writer(out, encoding) as writer:
+        while True:
+            chunk = file_obj.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            writer.write(chunk)
+    out.seek(0)
+    return out, size
+
+
+def decompress_chunks(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Decode a stream of stored chunks for clients that don't accept the codec"""
+    if encoding == "gzip":
+        decoder = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = decoder.decompress(chunk)
+            if data:
+                yield data
+        tail = decoder.flush()
+        if tail:
+            yield tail
+        return
+    
+    decoder = _zstandard().ZstdDecompressor().decompressobj()
+    for chunk in chunks:
+        data = decoder.decompress(chunk)
+        if data:
+            yield data
@@ -14,22 +14,113 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    DB_ECHO: bool = False  # log every SQL statement (slow; debugging only)
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # long-lived workers keep connections this long
     
     # Redis + Queue
     REDIS_URL: str = "redis://localhost:6379/0"
     RQ_QUEUE_NAME: str = "default"
     
+    # Workers
+    WORKER_MODE: str = "fork"  # fork | persistent
+    WORKER_PROCESSES: int = 1  # persistent mode: long-lived processes per host
+    WORKER_MAX_JOBS: int = 500  # persistent mode: recycle a process after N jobs
+    WORKER_MAX_RSS_MB: int = 1024  # persistent mode: recycle when RSS exceeds this
+    
+    # Job submission
+    JOB_DEDUP_ENABLED: bool = True  # coalesce identical in-flight jobs
+    JOB_IDEMPOTENCY_TTL_SECONDS: int = 86400
+    JOB_RESULT_REUSE_SECONDS: int = 0  # reuse succeeded jobs younger than this (0 = off)
+    
+    # Admission control (429 + Retry-After on POST /jobs when the queue is saturated)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_QUEUE_DEPTH: int = 1000  # waiting jobs per queue (0 = no limit)
+    ADMISSION_MAX_WAIT_SECONDS: float = 1800  # estimated wait before a new job starts (0 = no limit)
+    ADMISSION_DEFAULT_RUN_SECONDS: float = 30  # run time assumed until workers have recorded some
+    
+    # Response cache (project, extraction and script GETs; invalidated by writes)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: int = 3600  # Redis entries; also bounds staleness if an invalidation fails
+    RESPONSE_CACHE_L1_SECONDS: float = 2.0  # in-process copies served without asking Redis (0 = no L1)
+    RESPONSE_CACHE_L1_MAX_ENTRIES: int = 1024
+    
+    # Job logs (append-only segments per job, compressed once sealed)
+    JOB_LOG_DIR: str = "./job_logs"  # must be shared by the API and all workers (not routed through STORAGE_MODE)
+    JOB_LOG_SEGMENT_BYTES: int = 1024 * 1024
+    JOB_LOG_FOLLOW_SECONDS: int = 300  # longest a follow=true request stays open
+    
     # Storage
     STORAGE_MODE: str = "local"
     LOCAL_UPLOAD_DIR: str = "./uploads"
     LOCAL_OUTPUT_DIR: str = "./outputs"
+    STORAGE_COMPRESSION: str = "none"  # none | gzip | zstd (zstd needs `zstandard`)
+    STORAGE_COMPRESSION_LEVEL: int = 0  # 0 = codec default
+    STORAGE_COMPRESS_TYPES: str = "model/stl,model/obj,application/sla,text/plain,text/x-python,application/json"
+    STL_NORMALIZE_BINARY: bool = False  # rewrite ASCII STL (uploads + Blender output) as binary
+    
+    # Artifact retention (LRU eviction over quota; 0 = no quota)
+    RETENTION_ENABLED: bool = True
+    RETENTION_PROJECT_QUOTA_MB: int = 0
+    RETENTION_GLOBAL_QUOTA_MB: int = 0
+    RETENTION_TARGET_RATIO: float = 0.9  # evict down to this fraction of the quota
+    RETENTION_INTERVAL_MINUTES: int = 60
+    
+    # Job archival (finished jobs move from the hot tables to archived_jobs)
+    JOB_ARCHIVE_ENABLED: bool = True
+    JOB_ARCHIVE_AFTER_DAYS: int = 30  # finished longer ago than this
+    JOB_ARCHIVE_BATCH_SIZE: int = 500  # rows moved per transaction
+    JOB_ARCHIVE_INTERVAL_MINUTES: int = 60
+    
+    # S3-compatible object storage (STORAGE_MODE=s3; AWS S3, MinIO, ...)
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: str = ""  # e.g. http://localhost:9000 for MinIO; empty = AWS
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: str = ""  # empty = default AWS credential chain
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_PREFIX: str = ""  # key prefix inside the bucket
+    S3_ADDRESSING_STYLE: str = "auto"  # auto | path | virtual (MinIO: path)
+    S3_PRESIGN_DOWNLOADS: bool = True  # redirect downloads to presigned URLs
+    S3_PRESIGN_EXPIRES_SECONDS: int = 3600
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+    S3_MULTIPART_CHUNK_MB: int = 8
+    S3_MAX_CONCURRENCY: int = 8  # parallel part uploads per file
     
     # Blender Integration
     BLENDER_EXEC_MODE: str = "local_only"  # local_only | server_headless
     BLENDER_PATH: str = "/usr/bin/blender"
     BLENDER_WORKDIR: str = "./outputs"
+    BLENDER_SCRATCH_DIR: str = ""  # per-job run directories; empty = <BLENDER_WORKDIR>/.scratch (tmpfs works, e.g. /dev/shm/mcp3d)
     BLENDER_UNIT_SCALE: float = 1.0
-    BLENDER_EXPORT_FORMAT: str = "stl"
+    BLENDER_EXPORT_FORMAT: str = "stl"  # default export formats, comma-separated: stl,obj,glb,fbx
+    BLENDER_TIMEOUT_SECONDS: int = 300  # per script run
+    BLENDER_PACK_SIZE: int = 1  # queued run_blender jobs run per Blender process; 1 disables packing
+    BLENDER_STAGE_CACHE: bool = True  # generated scripts checkpoint each stage under .stage_cache/
+    
+    # CAD executors (app.workers.executors): routed per job by capability and recorded cost
+    CAD_EXECUTORS: str = "blender,local"  # enabled, comma-separated: blender | local (NumPy mesh export/measure)
+    
+    # Shape similarity search
+    SHAPE_DESCRIPTORS_ENABLED: bool = True  # compute descriptors for new model3d assets/models
+    SHAPE_INDEX_IVF_MIN_SIZE: int = 20000  # below this, search exhaustively
+    SHAPE_INDEX_NPROBE: int = 8  # clusters scanned per query (recall vs speed)
+    
+    # Prompt interpretation (POST /generate)
+    PROMPT_INTERPRETER: str = "rules"  # rules | llm (OpenAI-compatible API; needs `openai`)
+    PROMPT_LLM_MODEL: str = "gpt-4o-mini"
+    PROMPT_LLM_BASE_URL: str = ""  # empty = api.openai.com; any OpenAI-compatible server works
+    PROMPT_LLM_API_KEY: str = ""
+    PROMPT_LLM_TIMEOUT_SECONDS: float = 30
+    PROMPT_CACHE_TTL_SECONDS: int = 7 * 86400  # interpreted parameters per normalized prompt
+    PROMPT_CACHE_MAX_ENTRIES: int = 10000  # in-process LRU (Redis holds the shared copy)
+    
+    # Command autocomplete (GET /commands/suggest)
+    COMMAND_INDEX_REFRESH_SECONDS: float = 5  # poll for models saved by other processes
+    
+    # Design-space sweeps
+    SWEEP_MAX_VARIANTS: int = 100000
+    SWEEP_CHUNK_SIZE: int = 1000  # variants per worker job (blender evaluator: keep small)
+    SWEEP_VARIANT_TIMEOUT_SECONDS: int = 300  # per Blender run
+    SWEEP_DEADLINE_SECONDS: int = 6 * 3600  # chunks not done by then count as failed; the sweep finishes with what it has
     
     # Security
     SECRET_KEY: str = "dev-change-me"
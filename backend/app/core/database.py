@@ -1,20 +1,51 @@
 """Database configuration and session management"""
+import os
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
 
-# Create engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.APP_ENV == "dev"
-)
+# Created on first use: importing the app must not load the DB driver
+_engine: Optional[Engine] = None
+
+
+def get_engine() -> Engine:
+    """Get the shared engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            settings.DATABASE_URL,
+            pool_pre_ping=True,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            echo=settings.DB_ECHO
+        )
+    return _engine
+
+
+def _dispose_pool_after_fork():
+    """Forked children (RQ work horses) must not reuse the parent's connections"""
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_pool_after_fork)
+
+
+class _LazySessionMaker(sessionmaker):
+    """sessionmaker that binds to the engine when the first session is made"""
+    
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
 
 # Create session factory
-SessionLocal = sessionmaker(
+SessionLocal = _LazySessionMaker(
     autocommit=False,
-    autoflush=False,
-    bind=engine
+    autoflush=False
 )
 
 
@@ -28,3 +59,10 @@ def get_db() -> Session:
         yield db
     finally:
         db.close()
+
+
+def __getattr__(name):
+    # Backwards compatibility for `from app.core.database import engine`
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
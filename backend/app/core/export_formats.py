@@ -0,0 +1,72 @@
+"""
+Mesh export formats produced by Blender runs.
+
+A run_blender job exports every requested format in the same Blender
+session once the geometry is built, and also saves the geometry as a
+.blend. 'export' jobs open that .blend to add formats later without
+rebuilding the model.
+"""
+from dataclasses import dataclass
+from typing import Iterable, Optional, Union
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    name: str
+    extension: str
+    content_type: str
+
+
+EXPORT_FORMATS = {
+    f.name: f for f in (
+        ExportFormat("stl", ".stl", "model/stl"),
+        ExportFormat("obj", ".obj", "model/obj"),
+        ExportFormat("glb", ".glb", "model/gltf-binary"),
+        ExportFormat("fbx", ".fbx", "application/octet-stream"),
+    )
+}
+ALIASES = {"gltf": "glb"}
+
+BLEND_CONTENT_TYPE = "application/x-blender"
+
+
+class ExportFormatError(ValueError):
+    """Unknown or empty export format list"""
+
+
+def resolve_formats(requested: Union[str, Iterable[str], None] = None) -> list[str]:
+    """
+    Normalize a format list ("stl,obj" or ["STL", "gltf"]) to known format names.
+
+    Defaults to BLENDER_EXPORT_FORMAT; duplicates are dropped, order is kept.
+    """
+    if not requested:
+        requested = settings.BLENDER_EXPORT_FORMAT
+    if isinstance(requested, str):
+        requested = requested.split(",")
+    formats = []
+    for name in requested:
+        name = str(name).strip().lower()
+        name = ALIASES.get(name, name)
+        if not name:
+            continue
+        if name not in EXPORT_FORMATS:
+            raise ExportFormatError(
+                f"Unsupported export format: {name!r} (supported: {', '.join(EXPORT_FORMATS)})"
+            )
+        if name not in formats:
+            formats.append(name)
+    if not formats:
+        raise ExportFormatError("No export format requested")
+    return formats
+
+
+def export_filename(project_id: str, fmt: str, tag: Optional[str] = None) -> str:
+    """File a format is exported to in the project's Blender workdir"""
+    stem = f"output_{project_id}" if tag is None else f"output_{project_id}_{tag}"
+    return stem + EXPORT_FORMATS[fmt].extension
+
+
+def blend_filename(project_id: str) -> str:
+    return f"geometry_{project_id}.blend"
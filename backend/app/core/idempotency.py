@@ -0,0 +1,168 @@
+"""Idempotent job submission and in-flight job deduplication"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from redis.exceptions import WatchError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.queue import get_redis
+from app.models.job import Job
+
+IN_FLIGHT_STATUSES = ("queued", "running")
+
+
+class IdempotencyKeyMismatch(ValueError):
+    """An idempotency key was reused for a different submission"""
+
+
+def job_fingerprint(project_id: str, job_type: str, params: Optional[dict]) -> str:
+    """Stable hash of (project_id, job_type, params) used to detect identical jobs"""
+    payload = json.dumps(
+        {"project_id": project_id, "job_type": job_type, "params": params or {}},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _idempotency_redis_key(idempotency_key: str) -> str:
+    return f"jobs:idempotency:{idempotency_key}"
+
+
+def _fingerprint_redis_key(fingerprint: str) -> str:
+    return f"jobs:fingerprint:{fingerprint}"
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _check_key_payload(stored, fingerprint: str) -> None:
+    """Idempotency keys hold "<job_id>:<fingerprint>"; a different fingerprint means a different payload"""
+    _, _, stored_fingerprint = _decode(stored).partition(":")
+    # Keys written before fingerprints were stored carry none
+    if stored_fingerprint and stored_fingerprint != fingerprint:
+        raise IdempotencyKeyMismatch(
+            "Idempotency key was already used for a job with a different project_id, job_type or params"
+        )
+
+
+def is_reusable(job: Job) -> bool:
+    """Whether an identical submission may be answered with this job"""
+    if job.status in IN_FLIGHT_STATUSES:
+        return True
+    
+    if job.status == "succeeded" and settings.JOB_RESULT_REUSE_SECONDS > 0:
+        updated_at = job.updated_at
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        age = datetime.now(timezone.utc) - updated_at
+        return age <= timedelta(seconds=settings.JOB_RESULT_REUSE_SECONDS)
+    
+    return False
+
+
+def _load_job(db: Session, job_id) -> Optional[Job]:
+    if not job_id:
+        return None
+    job_id = _decode(job_id).partition(":")[0]
+    return db.query(Job).filter(Job.id == job_id).first()
+
+
+def find_duplicate(
+    db: Session,
+    project_id: str,
+    job_type: str,
+    params: Optional[dict],
+    idempotency_key: Optional[str] = None,
+) -> Optional[Job]:
+    """
+    Find an existing job that answers this submission.
+
+    A job registered under the same idempotency key is always returned,
+    provided the payload matches; reusing the key for a different payload
+    raises IdempotencyKeyMismatch. Otherwise an identical job is returned
+    while it is queued/running, or while it is a recent success inside
+    JOB_RESULT_REUSE_SECONDS.
+    """
+    fingerprint = job_fingerprint(project_id, job_type, params)
+    if idempotency_key:
+        stored = get_redis().get(_idempotency_redis_key(idempotency_key))
+        job = _load_job(db, stored)
+        if job:
+            _check_key_payload(stored, fingerprint)
+            return job
+    
+    if not settings.JOB_DEDUP_ENABLED:
+        return None
+    
+    job = _load_job(db, get_redis().get(_fingerprint_redis_key(fingerprint)))
+    if job and is_reusable(job):
+        return job
+    return None
+
+
+def _claim(db: Session, redis_key: str, job: Job, holder_is_valid, value: Optional[str] = None) -> Optional[Job]:
+    """
+    Atomically register job under redis_key (stored as value, default job.id).
+
+    Returns the job already holding the key if it is still valid, else None
+    once the key points at our job. Stale holders are replaced under WATCH.
+    """
+    conn = get_redis()
+    ttl = settings.JOB_IDEMPOTENCY_TTL_SECONDS
+    value = value or job.id
+    while True:
+        if conn.set(redis_key, value, nx=True, ex=ttl):
+            return None
+        
+        with conn.pipeline() as pipe:
+            try:
+                pipe.watch(redis_key)
+                holder_id = pipe.get(redis_key)
+                holder = _load_job(db, holder_id)
+                if holder is not None and holder.id != job.id and holder_is_valid(holder):
+                    pipe.unwatch()
+                    return holder
+                
+                pipe.multi()
+                pipe.set(redis_key, value, ex=ttl)
+                pipe.execute()
+                return None
+            except WatchError:
+                # Another submission touched the key in between - re-check
+                continue
+
+
+def claim_job(db: Session, job: Job, idempotency_key: Optional[str] = None) -> Optional[Job]:
+    """
+    Register a freshly created job for idempotency and deduplication.
+
+    Closes the race between find_duplicate() and the insert: if a concurrent
+    request registered an equivalent job first, that job is returned and the
+    caller should discard its own row instead of enqueueing it. Raises
+    IdempotencyKeyMismatch if a concurrent request claimed the key for a
+    different payload (the caller discards its row then too).
+    """
+    fingerprint = job_fingerprint(job.project_id, job.job_type, job.params)
+    if idempotency_key:
+        key = _idempotency_redis_key(idempotency_key)
+        winner = _claim(db, key, job, lambda holder: True, f"{job.id}:{fingerprint}")
+        if winner:
+            _check_key_payload(get_redis().get(key) or b"", fingerprint)
+            return winner
+    
+    if not settings.JOB_DEDUP_ENABLED:
+        return None
+    
+    winner = _claim(db, _fingerprint_redis_key(fingerprint), job, is_reusable)
+    if winner and idempotency_key:
+        # Retries with this key must resolve to the surviving job
+        get_redis().set(
+            _idempotency_redis_key(idempotency_key),
+            f"{winner.id}:{fingerprint}",
+            ex=settings.JOB_IDEMPOTENCY_TTL_SECONDS,
+        )
+    return winner
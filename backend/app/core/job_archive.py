@@ -0,0 +1,213 @@
+"""
+Hot/cold partitioning of finished jobs.
+
+Finished Job and AutomationJob rows older than JOB_ARCHIVE_AFTER_DAYS move
+to the archived_jobs table (app.models.job_archive): a few indexed columns
+for lookups plus the whole row as gzip-compressed JSON. The hot tables then
+only hold recent and in-flight jobs, so job lists and status polls stay
+fast however long the service runs.
+
+Rows move in batches of JOB_ARCHIVE_BATCH_SIZE, each in its own short
+transaction (select, insert into the archive, delete from the hot table,
+commit), so archival never holds locks for long. Rows locked by another
+transaction are skipped (FOR UPDATE SKIP LOCKED where the database has it)
+and picked up by a later batch. Each project's latest successful
+run_blender job stays hot: export and measure jobs start from it.
+
+archive_finished() runs as a scheduled RQ job every
+JOB_ARCHIVE_INTERVAL_MINUTES and stops after MAX_BATCHES_PER_RUN batches
+per table; the next run continues. GET /jobs/{id} falls back to
+archived_job() for ids no longer in the hot table.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Optional
+import gzip
+import json
+import logging
+from sqlalchemy import Select, delete, exists, func, inspect, or_, select
+from sqlalchemy.orm import Session, aliased
+from app.core.config import settings
+from app.core.queue import get_queue, get_redis
+from app.models.automation_job import AutomationJob
+from app.models.job import Job
+from app.models.job_archive import ArchivedJob
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCHES_PER_RUN = 200
+SCHEDULE_KEY = "job_archive:scheduled"
+TASK = "app.workers.tasks.archive_jobs"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def encode_row(row) -> bytes:
+    """Every mapped column of a row as gzip-compressed JSON"""
+    data = {attr.key: _jsonable(getattr(row, attr.key)) for attr in inspect(row).mapper.column_attrs}
+    # No embedded mtime so the same row always gives the same bytes
+    return gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), mtime=0)
+
+
+def decode_payload(payload: bytes) -> dict:
+    return json.loads(gzip.decompress(payload))
+
+
+def _eligible_jobs(cutoff: datetime) -> Select:
+    newer = aliased(Job)
+    newer_run = exists().where(
+        newer.project_id == Job.project_id,
+        newer.job_type == "run_blender",
+        newer.status == "succeeded",
+        newer.created_at > Job.created_at,
+    )
+    return (
+        select(Job)
+        .where(Job.status.in_(("succeeded", "failed", "cancelled")), Job.updated_at < cutoff)
+        # Keep the latest successful run of every project hot
+        .where(or_(Job.job_type != "run_blender", Job.status != "succeeded", newer_run))
+        .order_by(Job.updated_at)
+    )
+
+
+def _eligible_automation(cutoff: datetime) -> Select:
+    finished_at = func.coalesce(AutomationJob.completed_at, AutomationJob.created_at)
+    return (
+        select(AutomationJob)
+        .where(AutomationJob.status.in_(("completed", "failed", "cancelled")), finished_at < cutoff)
+        .order_by(finished_at)
+    )
+
+
+@dataclass(frozen=True)
+class ArchiveSource:
+    model: type
+    eligible: Callable[[datetime], Select]  # finished rows older than the cutoff, oldest first
+    fields: Callable[[Any], dict]  # indexed ArchivedJob columns of a row
+
+
+ARCHIVE_SOURCES = {
+    "jobs": ArchiveSource(
+        Job,
+        _eligible_jobs,
+        lambda row: {
+            "job_id": row.id,
+            "project_id": row.project_id,
+            "job_type": row.job_type,
+            "status": row.status,
+            "job_created_at": row.created_at,
+            "finished_at": row.updated_at,
+        },
+    ),
+    "automation": ArchiveSource(
+        AutomationJob,
+        _eligible_automation,
+        lambda row: {
+            "job_id": str(row.id),
+            "user_id": row.user_id,
+            "job_type": row.job_type,
+            "status": row.status,
+            "job_created_at": row.created_at,
+            "finished_at": row.completed_at,
+        },
+    ),
+}
+
+
+def archive_batch(db: Session, source: str, cutoff: datetime, batch_size: int) -> int:
+    """Move up to batch_size eligible rows to the archive in one transaction; returns rows moved"""
+    spec = ARCHIVE_SOURCES[source]
+    rows = db.execute(spec.eligible(cutoff).limit(batch_size).with_for_update(skip_locked=True)).scalars().all()
+    if not rows:
+        db.rollback()
+        return 0
+    db.add_all(ArchivedJob(source=source, payload=encode_row(row), **spec.fields(row)) for row in rows)
+    db.execute(
+        delete(spec.model).where(spec.model.id.in_([row.id for row in rows])),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    # Nothing from this batch is needed again; keep the session from growing
+    db.expunge_all()
+    return len(rows)
+
+
+def archive_finished(
+    db: Session,
+    older_than: Optional[timedelta] = None,
+    batch_size: Optional[int] = None,
+    max_batches: int = MAX_BATCHES_PER_RUN,
+) -> dict[str, int]:
+    """Archive finished jobs older than older_than (JOB_ARCHIVE_AFTER_DAYS); returns rows moved per source"""
+    cutoff = _now() - (older_than if older_than is not None else timedelta(days=settings.JOB_ARCHIVE_AFTER_DAYS))
+    batch_size = batch_size or settings.JOB_ARCHIVE_BATCH_SIZE
+    moved = {}
+    for source in ARCHIVE_SOURCES:
+        total = 0
+        for _ in range(max_batches):
+            count = archive_batch(db, source, cutoff, batch_size)
+            total += count
+            if count < batch_size:
+                break
+        moved[source] = total
+        if total:
+            logger.info("Archived %d finished %s rows older than %s", total, source, cutoff.isoformat())
+    return moved
+
+
+def archived_job(db: Session, job_id: str, source: str = "jobs") -> Optional[dict]:
+    """Archived row as it was in the hot table, or None"""
+    payload = (
+        db.query(ArchivedJob.payload)
+        .filter(ArchivedJob.source == source, ArchivedJob.job_id == str(job_id))
+        .scalar()
+    )
+    return decode_payload(payload) if payload is not None else None
+
+
+def list_archived(
+    db: Session,
+    source: str = "jobs",
+    project_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 50,
+) -> list[dict]:
+    """Archived rows, newest first"""
+    query = db.query(ArchivedJob.payload).filter(ArchivedJob.source == source)
+    if project_id:
+        query = query.filter(ArchivedJob.project_id == project_id)
+    if status:
+        query = query.filter(ArchivedJob.status == status)
+    rows = query.order_by(ArchivedJob.job_created_at.desc()).limit(limit).all()
+    return [decode_payload(row.payload) for row in rows]
+
+
+def schedule_archival(reschedule: bool = False) -> bool:
+    """
+    Enqueue the next archive run JOB_ARCHIVE_INTERVAL_MINUTES from now.
+
+    At most one run is scheduled at a time (workers call this on start-up);
+    the running task passes reschedule=True to queue its successor.
+    Returns whether a run was queued.
+    """
+    if not settings.JOB_ARCHIVE_ENABLED:
+        return False
+    interval = timedelta(minutes=settings.JOB_ARCHIVE_INTERVAL_MINUTES)
+    redis = get_redis()
+    if reschedule:
+        redis.delete(SCHEDULE_KEY)
+    if not redis.set(SCHEDULE_KEY, 1, nx=True, ex=int(interval.total_seconds()) + 300):
+        return False
+    get_queue().enqueue_in(interval, TASK, result_ttl=0)
+    return True
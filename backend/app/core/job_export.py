@@ -0,0 +1,221 @@
+"""
+Streaming export of job history for analytics.
+
+Rows are read through a server-side cursor (yield_per) as plain column
+tuples, so no ORM objects pile up in the session, and encoded to NDJSON or
+CSV in chunks of about CHUNK_BYTES: memory stays constant however many
+rows match.
+
+Derived fields (seconds):
+- total_seconds: created until finished (finished jobs only)
+- queue_wait_seconds: created until started
+- run_seconds: started until finished
+
+Job rows record no start time, so for them only total_seconds is derived;
+AutomationJob rows have all three.
+
+Archived rows (app.core.job_archive) come first, then the hot table's, so
+the export covers the whole history.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+import csv
+import io
+import json
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.job_archive import decode_payload
+from app.models.automation_job import AutomationJob
+from app.models.job import Job
+from app.models.job_archive import ArchivedJob
+
+FETCH_ROWS = 1000  # rows per cursor fetch
+CHUNK_BYTES = 64 * 1024  # encoded bytes per response chunk
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+JOB_FINISHED = ("succeeded", "failed", "cancelled")
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Older columns store naive UTC (datetime.utcnow())
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _seconds(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return round((_utc(end) - _utc(start)).total_seconds(), 3)
+
+
+def _job_row(row) -> dict:
+    finished = row.status in JOB_FINISHED
+    return {
+        "id": row.id,
+        "project_id": row.project_id,
+        "job_type": row.job_type,
+        "status": row.status,
+        "progress": row.progress,
+        "message": row.message,
+        "created_at": _utc(row.created_at),
+        "updated_at": _utc(row.updated_at),
+        "total_seconds": _seconds(row.created_at, row.updated_at) if finished else None,
+        "queue_wait_seconds": None,
+        "run_seconds": None,
+    }
+
+
+def _automation_row(row) -> dict:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "job_type": row.job_type,
+        "status": row.status,
+        "target_tool": row.target_tool,
+        "error_message": row.error_message,
+        "memory_usage_mb": row.memory_usage_mb,
+        "created_at": _utc(row.created_at),
+        "started_at": _utc(row.started_at),
+        "completed_at": _utc(row.completed_at),
+        "total_seconds": _seconds(row.created_at, row.completed_at),
+        "queue_wait_seconds": _seconds(row.created_at, row.started_at),
+        "run_seconds": _seconds(row.started_at, row.completed_at),
+    }
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    model: type
+    columns: tuple[str, ...]  # selected model columns
+    fields: tuple[str, ...]  # exported fields, in CSV column order
+    to_row: Callable[[object], dict]
+    project_scoped: bool
+
+
+EXPORT_SOURCES = {
+    "jobs": ExportSource(
+        Job,
+        ("id", "project_id", "job_type", "status", "progress", "message", "created_at", "updated_at"),
+        ("id", "project_id", "job_type", "status", "progress", "message", "created_at", "updated_at",
+         "total_seconds", "queue_wait_seconds", "run_seconds"),
+        _job_row,
+        True,
+    ),
+    "automation": ExportSource(
+        AutomationJob,
+        ("id", "user_id", "job_type", "status", "target_tool", "error_message", "memory_usage_mb",
+         "created_at", "started_at", "completed_at"),
+        ("id", "user_id", "job_type", "status", "target_tool", "error_message", "memory_usage_mb",
+         "created_at", "started_at", "completed_at", "total_seconds", "queue_wait_seconds", "run_seconds"),
+        _automation_row,
+        False,
+    ),
+}
+
+
+def _archived_rows(
+    db: Session,
+    source: str,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    statuses: Optional[Sequence[str]],
+    job_types: Optional[Sequence[str]],
+    project_id: Optional[str],
+) -> Iterator[SimpleNamespace]:
+    """Archived rows of a source (oldest first), with the attributes of the original row"""
+    stmt = select(ArchivedJob.payload).where(ArchivedJob.source == source)
+    if since is not None:
+        stmt = stmt.where(ArchivedJob.job_created_at >= since)
+    if until is not None:
+        stmt = stmt.where(ArchivedJob.job_created_at < until)
+    if statuses:
+        stmt = stmt.where(ArchivedJob.status.in_(statuses))
+    if job_types:
+        stmt = stmt.where(ArchivedJob.job_type.in_(job_types))
+    if project_id and EXPORT_SOURCES[source].project_scoped:
+        stmt = stmt.where(ArchivedJob.project_id == project_id)
+    stmt = stmt.order_by(ArchivedJob.job_created_at, ArchivedJob.id).execution_options(yield_per=FETCH_ROWS)
+    
+    for (payload,) in db.execute(stmt):
+        data = decode_payload(payload)
+        yield SimpleNamespace(**{
+            key: datetime.fromisoformat(value) if key.endswith("_at") and value else value
+            for key, value in data.items()
+        })
+
+
+def iter_rows(
+    db: Session,
+    source: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    statuses: Optional[Sequence[str]] = None,
+    job_types: Optional[Sequence[str]] = None,
+    project_id: Optional[str] = None,
+) -> Iterator[dict]:
+    """Matching rows of a source (archived, then hot; oldest first) as dicts with the derived fields"""
+    spec = EXPORT_SOURCES[source]
+    for row in _archived_rows(db, source, since, until, statuses, job_types, project_id):
+        yield spec.to_row(row)
+    
+    model = spec.model
+    stmt = select(*(getattr(model, name) for name in spec.columns))
+    if since is not None:
+        stmt = stmt.where(model.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(model.created_at < until)
+    if statuses:
+        stmt = stmt.where(model.status.in_(statuses))
+    if job_types:
+        stmt = stmt.where(model.job_type.in_(job_types))
+    if project_id and spec.project_scoped:
+        stmt = stmt.where(model.project_id == project_id)
+    stmt = stmt.order_by(model.created_at, model.id).execution_options(yield_per=FETCH_ROWS)
+    
+    for row in db.execute(stmt):
+        yield spec.to_row(row)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_ndjson(rows: Iterable[dict]) -> Iterator[bytes]:
+    buf = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, default=_json_default, separators=(",", ":")) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buf).encode("utf-8")
+            buf.clear()
+            size = 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def encode_csv(rows: Iterable[dict], fields: Sequence[str]) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()})
+        if out.tell() >= CHUNK_BYTES:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+def encode(rows: Iterable[dict], fmt: str, source: str) -> Iterator[bytes]:
+    if fmt == "csv":
+        return encode_csv(rows, EXPORT_SOURCES[source].fields)
+    return encode_ndjson(rows)
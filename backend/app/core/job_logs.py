@@ -0,0 +1,213 @@
+"""
+Append-only, segmented job logs.
+
+Each log is a directory under JOB_LOG_DIR. Lines are appended to an open
+segment file (seg-<start>.log); once it passes JOB_LOG_SEGMENT_BYTES it is
+sealed: compressed to seg-<start>-<end>.log.gz (.zst with
+STORAGE_COMPRESSION=zstd) and never written again. Offsets are byte
+offsets into the uncompressed log and are encoded in segment names, so
+reading a range opens only the segments it overlaps and appending never
+rewrites earlier output.
+
+One writer per log (the worker running the job); any number of readers.
+Logs are read straight from disk, not through the storage backend, so when
+the API and workers run on different hosts JOB_LOG_DIR must be a shared
+filesystem (NFS/EFS, a shared Docker volume), even with STORAGE_MODE=s3;
+otherwise /jobs/{id}/logs finds nothing.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import os
+import re
+import threading
+from datetime import datetime
+from app.core.compression import SUFFIXES, compress_file, configured_encoding, decompress_chunks
+from app.core.config import settings
+
+_KEY_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+_SEGMENT_RE = re.compile(r"^seg-(\d{16})(?:-(\d{16}))?\.log(\.gz|\.zst)?$")
+_SEGMENT_ENCODINGS = {suffix: encoding for encoding, suffix in SUFFIXES.items()}
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Segment:
+    path: Path
+    start: int
+    end: Optional[int]  # None for the open segment (size grows)
+    
+    @property
+    def sealed(self) -> bool:
+        return self.end is not None
+    
+    def length(self) -> int:
+        if self.end is not None:
+            return self.end - self.start
+        return self.path.stat().st_size
+
+
+def log_dir(key: str) -> Path:
+    if not _KEY_RE.match(key):
+        raise ValueError(f"Invalid log key: {key!r}")
+    return Path(settings.JOB_LOG_DIR) / key
+
+
+def _segments(directory: Path) -> list[Segment]:
+    """Segments ordered by start offset; a sealed copy wins over an open file being sealed"""
+    found: dict[int, Segment] = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        match = _SEGMENT_RE.match(name)
+        if not match:
+            continue
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else None
+        if end is None and match.group(3):
+            continue
+        if start in found and found[start].sealed:
+            continue
+        found[start] = Segment(directory / name, start, end)
+    return [found[start] for start in sorted(found)]
+
+
+def _segment_bytes(segment: Segment) -> bytes:
+    if not segment.sealed:
+        with segment.path.open("rb") as f:
+            return f.read()
+    encoding = _SEGMENT_ENCODINGS.get(_SEGMENT_RE.match(segment.path.name).group(3))
+    with segment.path.open("rb") as f:
+        chunks = iter(lambda: f.read(READ_CHUNK_SIZE), b"")
+        if encoding is None:
+            return b"".join(chunks)
+        return b"".join(decompress_chunks(chunks, encoding))
+
+
+class JobLogWriter:
+    """Appends to one log; thread-safe so stdout/stderr pumps can share it"""
+    
+    def __init__(self, key: str, segment_bytes: Optional[int] = None):
+        self.directory = log_dir(key)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes or settings.JOB_LOG_SEGMENT_BYTES
+        self._lock = threading.Lock()
+        segments = _segments(self.directory)
+        if segments and not segments[-1].sealed:
+            self._start = segments[-1].start
+            self._file = segments[-1].path.open("ab")
+        else:
+            self._start = segments[-1].end if segments else 0
+            self._file = self._open_segment(self._start)
+        self._size = self._file.tell()
+    
+    def _open_segment(self, start: int):
+        return (self.directory / f"seg-{start:016d}.log").open("ab")
+    
+    @property
+    def offset(self) -> int:
+        """End of the log: the offset the next write lands at"""
+        return self._start + self._size
+    
+    def write(self, text) -> int:
+        """Append text (str or bytes); returns the offset it was written at"""
+        data = text.encode("utf-8", errors="replace") if isinstance(text, str) else bytes(text)
+        with self._lock:
+            at = self.offset
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            if self._size >= self.segment_bytes:
+                self._seal()
+            return at
+    
+    def line(self, message: str) -> int:
+        """Append a timestamped line"""
+        return self.write(f"[{datetime.utcnow().isoformat()}] {message}\n")
+    
+    def _seal(self) -> None:
+        self._file.close()
+        raw = self.directory / f"seg-{self._start:016d}.log"
+        end = self._start + self._size
+        if self._size:
+            encoding = configured_encoding() or "gzip"
+            compressed = compress_file(raw, encoding)
+            # Readers pick the sealed name as soon as it appears, then the raw file goes
+            os.replace(compressed, self.directory / f"seg-{self._start:016d}-{end:016d}.log{SUFFIXES[encoding]}")
+            raw.unlink()
+        self._start, self._size = end, 0
+        self._file = self._open_segment(self._start)
+    
+    def close(self, seal: bool = True) -> None:
+        """Finish writing; by default seal the open segment so the whole log is compressed"""
+        with self._lock:
+            if self._file.closed:
+                return
+            if seal and self._size:
+                self._seal()
+            self._file.close()
+            empty = self.directory / f"seg-{self._start:016d}.log"
+            if empty.exists() and empty.stat().st_size == 0:
+                empty.unlink()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_log(key: str) -> JobLogWriter:
+    return JobLogWriter(key)
+
+
+def log_size(key: str) -> int:
+    """Total bytes written to a log (0 if it doesn't exist)"""
+    return read_log(key, 0, 0)[2]
+
+
+def read_log(key: str, offset: int = 0, limit: Optional[int] = None) -> tuple[bytes, int, int]:
+    """
+    Read up to limit bytes starting at offset.
+
+    A negative offset counts back from the end (tail). Returns
+    (data, next_offset, size); pass next_offset back to continue.
+    """
+    directory = log_dir(key)
+    for _ in range(5):
+        segments = _segments(directory)
+        if any(prev.end != seg.start for prev, seg in zip(segments, segments[1:])):
+            # Listed mid-seal (neither name of a segment seen); list again
+            continue
+        parts = []
+        try:
+            size = segments[-1].start + segments[-1].length() if segments else 0
+            if offset < 0:
+                offset = max(size + offset, 0)
+            end = size if limit is None else min(size, offset + limit)
+            if offset >= end:
+                return b"", min(offset, size), size
+            for segment in segments:
+                seg_end = segment.start + segment.length()
+                if seg_end <= offset or segment.start >= end:
+                    continue
+                data = _segment_bytes(segment)
+                parts.append(data[max(offset - segment.start, 0):end - segment.start])
+        except FileNotFoundError:
+            # Sealed underneath us; list again
+            continue
+        data = b"".join(parts)
+        return data, offset + len(data), size
+    raise RuntimeError(f"Log {key} kept changing while being read")
+
+
+def delete_log(key: str) -> None:
+    directory = log_dir(key)
+    for segment in _segments(directory):
+        segment.path.unlink(missing_ok=True)
+    try:
+        directory.rmdir()
+    except OSError:
+        pass
@@ -0,0 +1,247 @@
+"""
+Model library search.
+
+Models are indexed when flushed (see the Model mapper events in
+app.models.model) into two narrow tables:
+
+- model_tags: normalized (tag, model_id) rows mirroring the JSON tags
+- model_search_terms: an inverted index of (term, model_id, weight) built
+  from name, category, style, tags, description and training_prompt
+
+A search touches only the index rows for its terms, using the
+(term, model_id) index. Ranking is the sum of field weights of the matched
+terms. Every query term must match; the last one also matches as a prefix,
+for type-ahead. Results are keyset-paginated on (score, id), so deep pages
+cost the same as the first one.
+"""
+from typing import Iterable, Optional
+import base64
+import json
+import re
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+from app.models.model import Model, ModelSearchTerm, ModelTag
+
+# Points a term earns per field it appears in
+FIELD_WEIGHTS = {
+    "name": 8,
+    "tags": 4,
+    "category": 4,
+    "style": 4,
+    "description": 2,
+    "training_prompt": 1,
+}
+# Model columns the index is built from; other updates don't touch the index rows
+INDEXED_FIELDS = tuple(FIELD_WEIGHTS)
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+MIN_PREFIX_LENGTH = 2
+FACET_LIMIT = 20
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset({"a", "an", "and", "the", "of", "for", "with", "in", "on", "to", "or"})
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by search_models"""
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Lowercased word tokens (underscores split words; stopwords dropped)"""
+    if not text:
+        return []
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def normalize_tag(tag: str) -> str:
+    return " ".join(str(tag).lower().split())[:100]
+
+
+def build_terms(model: Model) -> dict[str, int]:
+    """Inverted-index rows for one model: {term: weight}"""
+    weights: dict[str, int] = {}
+    fields = {
+        "name": model.name,
+        "category": model.category,
+        "style": model.style,
+        "tags": " ".join(str(t) for t in (model.tags or [])),
+        "description": model.description,
+        "training_prompt": model.training_prompt,
+    }
+    for field, text in fields.items():
+        for term in set(tokenize(text)):
+            weights[term] = weights.get(term, 0) + FIELD_WEIGHTS[field]
+    return weights
+
+
+def index_model(connection, model: Model) -> None:
+    """Replace the tag and search-term rows for model (runs inside the flush)"""
+    tags_table = ModelTag.__table__
+    terms_table = ModelSearchTerm.__table__
+    
+    connection.execute(delete(tags_table).where(tags_table.c.model_id == model.id))
+    tags = {normalize_tag(t) for t in (model.tags or []) if str(t).strip()}
+    if tags:
+        connection.execute(insert(tags_table), [{"model_id": model.id, "tag": t} for t in sorted(tags)])
+    
+    connection.execute(delete(terms_table).where(terms_table.c.model_id == model.id))
+    terms = build_terms(model)
+    if terms:
+        connection.execute(
+            insert(terms_table),
+            [{"model_id": model.id, "term": term, "weight": weight} for term, weight in terms.items()],
+        )
+
+
+def rebuild_index(db: Session, batch_size: int = 1000) -> int:
+    """Re-index every model (backfill after deploying the index tables); returns count"""
+    count = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(Model)
+            .filter(Model.id > last_id)
+            .order_by(Model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        connection = db.connection()
+        for model in batch:
+            index_model(connection, model)
+        db.commit()
+        count += len(batch)
+        last_id = batch[-1].id
+        db.expunge_all()
+    return count
+
+
+def encode_cursor(score: int, model_id: int) -> str:
+    raw = json.dumps([score, model_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, model_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(score), int(model_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def _matches(terms: list[str]):
+    """(model_id, score) for models matching every query term"""
+    conditions = [ModelSearchTerm.term == term for term in terms]
+    last = terms[-1]
+    if len(last) >= MIN_PREFIX_LENGTH:
+        # Type-ahead: the last word may be incomplete (terms never contain % or _)
+        conditions[-1] = ModelSearchTerm.term.like(f"{last}%")
+    
+    # Each condition on its own: one term row may satisfy several ("bracket br")
+    satisfied = [func.max(case((cond, 1), else_=0)) == 1 for cond in conditions]
+    return (
+        select(
+            ModelSearchTerm.model_id.label("model_id"),
+            func.sum(ModelSearchTerm.weight).label("score"),
+        )
+        .where(or_(*conditions))
+        .group_by(ModelSearchTerm.model_id)
+        .having(and_(*satisfied))
+        .subquery()
+    )
+
+
+def _filtered(q: Optional[str], category: Optional[str], style: Optional[str], tags: Iterable[str]):
+    """Select (id, score) of every model matching the query and filters"""
+    terms = list(dict.fromkeys(tokenize(q)))[:MAX_QUERY_TERMS]
+    if terms:
+        matches = _matches(terms)
+        stmt = select(Model.id.label("id"), matches.c.score.label("score")).join(
+            matches, matches.c.model_id == Model.id
+        )
+        score = matches.c.score
+    else:
+        score = literal(0)
+        stmt = select(Model.id.label("id"), score.label("score"))
+    
+    if category:
+        stmt = stmt.where(Model.category == category)
+    if style:
+        stmt = stmt.where(Model.style == style)
+    for tag in {normalize_tag(t) for t in tags if t}:
+        stmt = stmt.where(Model.id.in_(select(ModelTag.model_id).where(ModelTag.tag == tag)))
+    return stmt, score
+
+
+def _facet(db: Session, column, ids, id_column) -> list[dict]:
+    rows = db.execute(
+        select(column, func.count())
+        .where(id_column.in_(ids), column.isnot(None))
+        .group_by(column)
+        .order_by(func.count().desc(), column)
+        .limit(FACET_LIMIT)
+    ).all()
+    return [{"value": value, "count": n} for value, n in rows]
+
+
+def _facets(db: Session, ids) -> dict[str, list[dict]]:
+    """Counts per category, style and tag over the whole result set"""
+    return {
+        "category": _facet(db, Model.category, ids, Model.id),
+        "style": _facet(db, Model.style, ids, Model.id),
+        "tags": _facet(db, ModelTag.tag, ids, ModelTag.model_id),
+    }
+
+
+def search_models(
+    db: Session,
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    style: Optional[str] = None,
+    tags: Iterable[str] = (),
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    facets: bool = True,
+) -> dict:
+    """
+    Ranked, filtered model search.
+
+    Returns {"items": [(model, score), ...], "next_cursor", "total", "facets"}.
+    total and facets are only computed for the first page (cursor=None).
+    """
+    tags = list(tags or ())
+    stmt, score = _filtered(q, category, style, tags)
+    
+    page = stmt
+    if cursor:
+        after_score, after_id = decode_cursor(cursor)
+        page = page.where(
+            or_(score < after_score, and_(score == after_score, Model.id < after_id))
+        )
+    rows = db.execute(page.order_by(score.desc(), Model.id.desc()).limit(limit + 1)).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    models = {}
+    if rows:
+        models = {m.id: m for m in db.query(Model).filter(Model.id.in_([r.id for r in rows])).all()}
+    
+    result = {
+        "items": [(models[r.id], int(r.score or 0)) for r in rows if r.id in models],
+        "next_cursor": encode_cursor(int(rows[-1].score or 0), rows[-1].id) if has_more else None,
+        "total": None,
+        "facets": None,
+    }
+    if cursor is None:
+        matched = stmt.subquery()
+        result["total"] = db.execute(select(func.count()).select_from(matched)).scalar_one()
+        if facets:
+            result["facets"] = _facets(db, select(matched.c.id))
+    return result
@@ -0,0 +1,404 @@
+"""
+Text prompt to base-plate template parameters.
+
+Interpreters (PROMPT_INTERPRETER):
+- rules: regular expressions for dimensions, hole patterns and fillets
+  ("120 x 60 x 5 mm plate with 6 holes of 8 mm, 2 mm fillets"); instant,
+  no external service
+- llm: an OpenAI-compatible chat completions API (PROMPT_LLM_*) asked for
+  the parameters as JSON; needs the optional `openai` package
+
+Interpretation is the slow step and prompts repeat a lot, so results are
+cached on the normalized prompt (Unicode NFKC, case, whitespace, trailing
+punctuation) together with the interpreter and its version: an in-process
+LRU (PROMPT_CACHE_MAX_ENTRIES) in front of Redis, both expiring after
+PROMPT_CACHE_TTL_SECONDS. Identical prompts arriving together share one
+interpreter call: threads of a process wait on the first one, and other
+processes wait on a Redis lock for its result. Failures are not cached.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.queue import get_redis
+from app.schemas.generate import TemplateParameters
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_SECONDS = 0.1
+
+
+class PromptError(ValueError):
+    """The prompt can't be turned into template parameters"""
+
+
+class InterpreterUnavailable(RuntimeError):
+    """The interpreter's backing service failed"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    text = unicodedata.normalize("NFKC", prompt).lower()
+    text = text.replace("×", "x")
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(".!?;, ")
+
+
+def _validated(parameters: dict) -> dict:
+    try:
+        return TemplateParameters.model_validate(parameters).model_dump(exclude_none=True)
+    except ValidationError as e:
+        raise PromptError(f"Interpreted parameters are out of range: {e.errors(include_url=False)}") from e
+
+
+# ===== Rule-based interpreter =====
+
+NUMBER = r"(\d+(?:\.\d+)?)"
+# A bare "in" only counts as inches before a dimension word or punctuation ("0.25 in thick", not "50 in steel")
+INCH_IN = r"in\.?(?=\s*(?:$|[,;)]|x\b|by\b|thick|wide|long|dia|holes?\b|radius|fillets?\b|round|corner|square))"
+UNIT = r"((?:mm|millimet(?:er|re)s?|cm|centimet(?:er|re)s?|m|met(?:er|re)s?|inch(?:es)?)(?![a-z])|" + INCH_IN + r"|\")?"
+WORD_NUMBERS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "sixteen": 16, "twenty": 20, "twenty-four": 24,
+}
+COUNT = r"(\d+|" + "|".join(sorted(WORD_NUMBERS, key=len, reverse=True)) + r")"
+LENGTH = NUMBER + r"\s*" + UNIT
+
+DIMENSIONS_RE = re.compile(
+    NUMBER + r"\s*" + UNIT + r"\s*x\s*" + NUMBER + r"\s*" + UNIT + r"(?:\s*x\s*" + NUMBER + r"\s*" + UNIT + r")?"
+)
+NAMED_PATTERNS = {
+    "length": (
+        r"\blength\s*(?:of|=|:)?\s*" + LENGTH,
+        LENGTH + r"\s*long\b",
+        r"\bsquare\s*(?:plate|base|panel)?\s*(?:of\s*)?" + LENGTH,
+        LENGTH + r"\s*square\b",
+    ),
+    "width": (r"\bwidth\s*(?:of|=|:)?\s*" + LENGTH, LENGTH + r"\s*wide\b"),
+    "thickness": (r"\bthick(?:ness)?\s*(?:of|=|:)?\s*" + LENGTH, LENGTH + r"\s*thick\b"),
+    "hole_diameter": (
+        r"\bholes?\s*,?\s*(?:(?:of|with)\s*)?(?:diameter|dia\.?)\s*(?:of|=|:)?\s*" + LENGTH,
+        r"\bholes?\s*of\s*" + LENGTH,
+        r"(?:ø|⌀)\s*" + LENGTH,
+        # "8 mm holes" / "8 diameter holes", but "6 holes" is a count
+        NUMBER + r"\s*" + UNIT[:-1] + r"\s*(?:diameter|dia\.?)?\s*holes?\b",
+        LENGTH + r"\s*(?:diameter|dia\.?)\s*holes?\b",
+    ),
+    "hole_ring_radius": (
+        r"\b(?:ring|circle|pitch|bolt circle)\s*radius\s*(?:of|=|:)?\s*" + LENGTH,
+        r"\bon\s*an?\s*" + LENGTH + r"\s*radius\b",
+    ),
+    "fillet_radius": (
+        r"\bfillets?\s*(?:radius)?\s*(?:of|=|:)?\s*" + LENGTH,
+        r"\b(?:rounded|round)\s*corners?\s*(?:of|=|:)?\s*" + LENGTH,
+        LENGTH + r"\s*(?:radius\s*)?(?:fillets?|rounded corners?|corner radius)\b",
+    ),
+}
+HOLE_COUNT_RES = (
+    re.compile(r"(?<![\w.])" + COUNT + r"\s*(?:x\s*)?(?:m\d+\s*)?(?:through[- ]?|mounting |bolt |screw )?holes?\b"),
+    re.compile(r"\bholes?\s*(?:count)?\s*(?:=|:)\s*(\d+)"),
+)
+# "6 x 8 mm holes": count and diameter together (taken out before reading "L x W x T")
+HOLE_SPEC_RE = re.compile(
+    r"(?<![\w.])" + COUNT + r"\s*x\s*" + NUMBER + r"\s*" + UNIT + r"\s*(?:diameter|dia\.?)?\s*(?:through[- ]?)?holes?\b"
+)
+PLATE_RE = re.compile(r"\b(plate|bracket|base|flange|panel|mount|slab|square|disc|block)\b")
+
+
+def _mm(value: str, unit: Optional[str], default_unit: Optional[str] = None) -> float:
+    unit = unit or default_unit or "mm"
+    if unit.startswith("c"):
+        factor = 10.0
+    elif unit.startswith("in") or unit == '"':
+        factor = 25.4
+    elif unit == "m" or unit.startswith("met"):
+        factor = 1000.0
+    else:
+        factor = 1.0
+    return round(float(value) * factor, 4)
+
+
+def _count(token: str) -> int:
+    return int(token) if token.isdigit() else WORD_NUMBERS[token]
+
+
+class RuleBasedInterpreter:
+    """Local stand-in for the LLM: reads dimensions and features with regular expressions"""
+    
+    name = "rules"
+    version = "2"
+    
+    def interpret(self, prompt: str) -> dict:
+        found = {}
+        
+        m = HOLE_SPEC_RE.search(prompt)
+        if m:
+            found["hole_count"] = _count(m.group(1))
+            found["hole_diameter"] = _mm(m.group(2), m.group(3))
+            prompt = prompt[:m.start()] + " " + prompt[m.end():]
+        
+        m = DIMENSIONS_RE.search(prompt)
+        if m:
+            values = list(m.groups()[0::2])
+            units = list(m.groups()[1::2])
+            # "120 x 60 x 5 mm": a trailing unit applies to every value
+            default_unit = next((u for u in reversed(units) if u), None)
+            dims = [_mm(v, u, default_unit) for v, u in zip(values, units) if v is not None]
+            found.update(zip(("length", "width", "thickness"), dims))
+        
+        for name, patterns in NAMED_PATTERNS.items():
+            if name in found:
+                continue
+            for pattern in patterns:
+                m = re.search(pattern, prompt)
+                if m:
+                    found[name] = _mm(m.group(1), m.group(2))
+                    break
+        
+        if re.search(r"\b(?:no|without)\s*holes?\b", prompt):
+            found["hole_count"] = 0
+        elif "hole_count" not in found:
+            for pattern in HOLE_COUNT_RES:
+                m = pattern.search(prompt)
+                if m:
+                    found["hole_count"] = _count(m.group(1))
+                    break
+        if re.search(r"\b(?:sharp corners?|no fillets?|without fillets?)\b", prompt):
+            found["fillet_radius"] = 0.0
+        if "square" in prompt and "length" in found and "width" not in found:
+            found["width"] = found["length"]
+        
+        if not found and not PLATE_RE.search(prompt):
+            raise PromptError("No dimensions or plate features found in the prompt")
+        # generate_script fills in the rest from the project's extraction or relative to the length
+        return _validated(found)
+
+
+# ===== LLM interpreter =====
+
+LLM_SYSTEM_PROMPT = """You turn descriptions of flat parts into parameters of a parametric base plate:
+a rectangular plate with an optional circular pattern of through holes and filleted corners.
+Reply with one JSON object using only these keys (millimetres; omit anything not implied):
+length, width, thickness, hole_diameter, hole_count, hole_ring_radius, fillet_radius.
+If the description is not a plate-like part, reply {"error": "<reason>"}."""
+
+
+class LLMInterpreter:
+    """OpenAI-compatible chat completions API (PROMPT_LLM_*)"""
+    
+    name = "llm"
+    
+    def __init__(self):
+        try:
+            from openai import OpenAI
+        except ImportError as e:
+            raise RuntimeError("PROMPT_INTERPRETER=llm requires the 'openai' package") from e
+        
+        self.client = OpenAI(
+            api_key=settings.PROMPT_LLM_API_KEY or None,
+            base_url=settings.PROMPT_LLM_BASE_URL or None,
+            timeout=settings.PROMPT_LLM_TIMEOUT_SECONDS,
+            max_retries=1,
+        )
+    
+    @property
+    def version(self) -> str:
+        # A new model or instructions must not be answered from the old cache
+        digest = hashlib.sha1(LLM_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:8]
+        return f"{settings.PROMPT_LLM_MODEL}:{digest}"
+    
+    def interpret(self, prompt: str) -> dict:
+        try:
+            response = self.client.chat.completions.create(
+                model=settings.PROMPT_LLM_MODEL,
+                temperature=0,
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": LLM_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+            )
+        except Exception as e:
+            raise InterpreterUnavailable(f"Prompt interpreter request failed: {e}") from e
+        
+        try:
+            data = json.loads(response.choices[0].message.content or "")
+        except ValueError as e:
+            raise InterpreterUnavailable("Prompt interpreter returned invalid JSON") from e
+        if not isinstance(data, dict):
+            raise InterpreterUnavailable("Prompt interpreter returned invalid JSON")
+        if data.get("error"):
+            raise PromptError(str(data["error"]))
+        return _validated({k: v for k, v in data.items() if k in TemplateParameters.model_fields})
+
+
+_interpreters: dict = {}
+
+
+def get_interpreter():
+    """Interpreter selected by PROMPT_INTERPRETER"""
+    mode = settings.PROMPT_INTERPRETER
+    interpreter = _interpreters.get(mode)
+    if interpreter is None:
+        if mode == "rules":
+            interpreter = RuleBasedInterpreter()
+        elif mode == "llm":
+            interpreter = LLMInterpreter()
+        else:
+            raise ValueError(f"Unknown PROMPT_INTERPRETER: {mode}")
+        _interpreters[mode] = interpreter
+    return interpreter
+
+
+# ===== Cache =====
+
+@dataclass(frozen=True)
+class Interpretation:
+    key: str
+    interpreter: str
+    parameters: dict
+    cached: bool  # answered from the cache or by another request's call
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.parameters: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+_inflight: dict[str, _Call] = {}
+
+
+def prompt_key(normalized: str, interpreter) -> str:
+    raw = f"{interpreter.name}:{interpreter.version}:{normalized}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _result_key(key: str) -> str:
+    return f"prompt:result:{key}"
+
+
+def _lock_key(key: str) -> str:
+    return f"prompt:lock:{key}"
+
+
+def _memory_get(key: str) -> Optional[dict]:
+    with _lock:
+        cached = _memory.get(key)
+        if not cached:
+            return None
+        if time.monotonic() - cached[0] >= settings.PROMPT_CACHE_TTL_SECONDS:
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return cached[1]
+
+
+def _memory_put(key: str, parameters: dict) -> None:
+    with _lock:
+        _memory[key] = (time.monotonic(), parameters)
+        _memory.move_to_end(key)
+        while len(_memory) > settings.PROMPT_CACHE_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _redis_get(key: str) -> Optional[dict]:
+    try:
+        data = get_redis().get(_result_key(key))
+    except RedisError:
+        logger.warning("prompt cache unavailable", exc_info=True)
+        return None
+    return json.loads(data) if data else None
+
+
+def _interpret_shared(key: str, normalized: str, interpreter) -> tuple[dict, bool]:
+    """
+    Run the interpreter unless another process already is; returns
+    (parameters, whether another process's call answered)
+    """
+    redis = get_redis()
+    timeout = settings.PROMPT_LLM_TIMEOUT_SECONDS + 5
+    try:
+        holder = redis.set(_lock_key(key), "1", nx=True, ex=int(timeout) + 1)
+    except RedisError:
+        holder = True
+    if not holder:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            parameters = _redis_get(key)
+            if parameters is not None:
+                return parameters, True
+            try:
+                if not redis.exists(_lock_key(key)):
+                    # The other call failed (or finished without caching); try ourselves
+                    break
+            except RedisError:
+                break
+            time.sleep(LOCK_POLL_SECONDS)
+    
+    try:
+        parameters = interpreter.interpret(normalized)
+        try:
+            redis.set(_result_key(key), json.dumps(parameters), ex=settings.PROMPT_CACHE_TTL_SECONDS)
+        except RedisError:
+            logger.warning("could not cache prompt interpretation", exc_info=True)
+        return parameters, False
+    finally:
+        if holder:
+            try:
+                redis.delete(_lock_key(key))
+            except RedisError:
+                pass
+
+
+def interpret_prompt(prompt: str) -> Interpretation:
+    """Template parameters for a prompt, from the cache when it was interpreted before"""
+    normalized = normalize_prompt(prompt)
+    if not normalized:
+        raise PromptError("Prompt is empty")
+    interpreter = get_interpreter()
+    key = prompt_key(normalized, interpreter)
+    
+    parameters = _memory_get(key)
+    if parameters is None:
+        parameters = _redis_get(key)
+        if parameters is not None:
+            _memory_put(key, parameters)
+    if parameters is not None:
+        return Interpretation(key, interpreter.name, parameters, True)
+    
+    with _lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+    
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return Interpretation(key, interpreter.name, call.parameters, True)
+    
+    try:
+        parameters, shared = _interpret_shared(key, normalized, interpreter)
+        _memory_put(key, parameters)
+        call.parameters = parameters
+        return Interpretation(key, interpreter.name, parameters, shared)
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            del _inflight[key]
+        call.done.set()
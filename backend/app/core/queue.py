@@ -1,11 +1,54 @@
 """Redis Queue configuration for background tasks"""
-import os
+from typing import Optional
 import redis
-from rq import Queue
 from app.core.config import settings
 
-# Redis connection
-conn = redis.from_url(settings.REDIS_URL)
+# Created on first use so importing the API does not touch Redis
+_conn: Optional[redis.Redis] = None
+_queues: dict = {}
 
-# Default queue
-q = Queue(settings.RQ_QUEUE_NAME, connection=conn)
+
+def get_redis() -> redis.Redis:
+    """Get the shared Redis connection, creating it on first use"""
+    global _conn
+    if _conn is None:
+        _conn = redis.from_url(settings.REDIS_URL)
+    return _conn
+
+
+def get_queue(name: Optional[str] = None):
+    """Get an RQ queue (default: RQ_QUEUE_NAME), creating it on first use"""
+    name = name or settings.RQ_QUEUE_NAME
+    queue = _queues.get(name)
+    if queue is None:
+        from rq import Queue
+        
+        queue = Queue(name, connection=get_redis())
+        _queues[name] = queue
+    return queue
+
+
+def job_timeout(job_type: str) -> Optional[int]:
+    """RQ timeout for a job type (None: RQ's default)"""
+    if job_type == "run_blender":
+        # The job may run a whole pack of scripts (BLENDER_PACK_SIZE)
+        return settings.BLENDER_TIMEOUT_SECONDS * max(1, settings.BLENDER_PACK_SIZE) + 60
+    if job_type == "export":
+        return settings.BLENDER_TIMEOUT_SECONDS + 60
+    return None
+
+
+def use_connection(connection: redis.Redis) -> None:
+    """Replace the shared connection (benchmarks, tests, worker bootstrap)"""
+    global _conn
+    _conn = connection
+    _queues.clear()
+
+
+def __getattr__(name):
+    # Backwards compatibility for `from app.core.queue import conn, q`
+    if name == "conn":
+        return get_redis()
+    if name == "q":
+        return get_queue()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,182 @@
+"""
+Read-through cache for per-project GET responses.
+
+Project, extraction result and script responses change only when a
+project is created or edited or a job writes a new version, yet dashboards
+poll them constantly. Rendered response bodies are cached in Redis (shared
+by all API processes) behind a small in-process L1.
+
+Every project has a generation counter in Redis and cache keys include it,
+so invalidate_project() is a single INCR: older entries are never read
+again and expire after RESPONSE_CACHE_TTL_SECONDS. Readers fetch the
+generation before querying the database, so a response built while a
+write commits is stored under the old generation and never served after
+the invalidation. In-process invalidations are also counted per project,
+and a reader that started before one never puts its body into L1. L1
+entries are trusted for RESPONSE_CACHE_L1_SECONDS without asking Redis,
+which bounds how stale another process's write can look. Redis errors
+never fail a request; the response is built from the database instead.
+
+Responses carry an ETag (hash of the body); a matching If-None-Match is
+answered with 304 whether or not the cache is enabled.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+import hashlib
+import logging
+import threading
+import time
+from fastapi import Response
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.queue import get_redis
+
+logger = logging.getLogger(__name__)
+
+_l1_lock = threading.Lock()
+_l1: "OrderedDict[tuple[str, str], tuple[float, int, CachedBody]]" = OrderedDict()
+# invalidate_project() calls per project in this process (guarded by _l1_lock)
+_l1_invalidations: dict[str, int] = {}
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    media_type: str
+    etag: str
+    
+    @classmethod
+    def build(cls, body: Union[str, bytes], media_type: str) -> "CachedBody":
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        return cls(body, media_type, f'"{hashlib.sha1(body).hexdigest()}"')
+    
+    def dumps(self) -> bytes:
+        return f"{self.etag}\n{self.media_type}\n".encode("utf-8") + self.body
+    
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedBody":
+        etag, media_type, body = data.split(b"\n", 2)
+        return cls(body, media_type.decode("utf-8"), etag.decode("utf-8"))
+
+
+def _generation_key(project_id: str) -> str:
+    return f"respcache:gen:{project_id}"
+
+
+def _entry_key(resource: str, project_id: str, generation: int) -> str:
+    return f"respcache:{resource}:{project_id}:{generation}"
+
+
+def _l1_get(resource: str, project_id: str) -> Optional[CachedBody]:
+    with _l1_lock:
+        cached = _l1.get((resource, project_id))
+        if not cached:
+            return None
+        if time.monotonic() - cached[0] >= settings.RESPONSE_CACHE_L1_SECONDS:
+            del _l1[(resource, project_id)]
+            return None
+        _l1.move_to_end((resource, project_id))
+        return cached[2]
+
+
+def _l1_epoch(project_id: str) -> int:
+    with _l1_lock:
+        return _l1_invalidations.get(project_id, 0)
+
+
+def _l1_put(resource: str, project_id: str, generation: int, epoch: int, entry: CachedBody) -> None:
+    if settings.RESPONSE_CACHE_L1_SECONDS <= 0:
+        return
+    with _l1_lock:
+        # Built before a local invalidation: the body may predate that write
+        if _l1_invalidations.get(project_id, 0) != epoch:
+            return
+        # Never replace an entry of a newer generation (a concurrent reader saw the invalidation)
+        current = _l1.get((resource, project_id))
+        if current and current[1] > generation:
+            return
+        _l1[(resource, project_id)] = (time.monotonic(), generation, entry)
+        _l1.move_to_end((resource, project_id))
+        while len(_l1) > settings.RESPONSE_CACHE_L1_MAX_ENTRIES:
+            _l1.popitem(last=False)
+
+
+def _read_through(resource: str, project_id: str, build: Callable[[], CachedBody]) -> CachedBody:
+    entry = _l1_get(resource, project_id)
+    if entry is not None:
+        return entry
+    
+    epoch = _l1_epoch(project_id)
+    try:
+        redis = get_redis()
+        generation = int(redis.get(_generation_key(project_id)) or 0)
+        data = redis.get(_entry_key(resource, project_id, generation))
+    except RedisError:
+        logger.warning("response cache unavailable; serving %s/%s from the database", resource, project_id, exc_info=True)
+        return build()
+    
+    if data is not None:
+        entry = CachedBody.loads(data)
+    else:
+        entry = build()
+        try:
+            redis.set(_entry_key(resource, project_id, generation), entry.dumps(), ex=settings.RESPONSE_CACHE_TTL_SECONDS)
+        except RedisError:
+            logger.warning("could not cache %s/%s", resource, project_id, exc_info=True)
+            return entry
+    _l1_put(resource, project_id, generation, epoch, entry)
+    return entry
+
+
+def invalidate_project(project_id: str) -> None:
+    """Drop every cached response of a project (call after committing a write)"""
+    with _l1_lock:
+        _l1_invalidations[project_id] = _l1_invalidations.get(project_id, 0) + 1
+        for key in [key for key in _l1 if key[1] == project_id]:
+            del _l1[key]
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return
+    try:
+        get_redis().incr(_generation_key(project_id))
+    except RedisError:
+        # Other processes keep the old responses until RESPONSE_CACHE_TTL_SECONDS
+        logger.warning("could not invalidate cached responses of project %s", project_id, exc_info=True)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists this ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cached_response(
+    resource: str,
+    project_id: str,
+    build: Callable[[], Union[str, bytes]],
+    if_none_match: Optional[str] = None,
+    media_type: str = "application/json",
+) -> Response:
+    """
+    Response for a per-project resource, built by build() on a cache miss.
+
+    build() may raise HTTPException (e.g. 404); errors are never cached.
+    """
+    def render() -> CachedBody:
+        return CachedBody.build(build(), media_type)
+    
+    if settings.RESPONSE_CACHE_ENABLED:
+        entry = _read_through(resource, project_id, render)
+    else:
+        entry = render()
+    
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
@@ -0,0 +1,277 @@
+"""
+Quota-based artifact retention with least-recently-used eviction.
+
+Every upload, generated script and Blender output is registered in the
+stored_artifacts table with its size and last access time, so usage per
+project and overall is one GROUP BY and eviction candidates come
+LRU-ordered from an index. Retention never walks the file tree
+(rebuild_index does that once, to backfill existing files).
+
+enforce_quotas() runs as a scheduled RQ job every RETENTION_INTERVAL_MINUTES.
+Projects over RETENTION_PROJECT_QUOTA_MB, then the whole store over
+RETENTION_GLOBAL_QUOTA_MB, are trimmed to RETENTION_TARGET_RATIO of the
+quota, least recently accessed first. Never evicted:
+- pinned artifacts
+- the script file of a project's latest ScriptVersion
+- the outputs (every exported format and the .blend) of the project's
+  latest successful Blender run
+"""
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional
+import logging
+import os
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.queue import get_queue, get_redis
+from app.core.storage import storage_for
+from app.models.artifact import StoredArtifact
+
+logger = logging.getLogger(__name__)
+
+EVICT_BATCH = 200
+# Downloads refresh last_accessed_at at most this often per artifact
+TOUCH_INTERVAL = timedelta(minutes=5)
+SCHEDULE_KEY = "retention:scheduled"
+TASK = "app.workers.tasks.enforce_retention"
+
+MB = 1024 * 1024
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _disk_size(location: str, size_bytes: Optional[int]) -> int:
+    path = storage_for(location).local_path(location)
+    if path is not None:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            pass
+    return size_bytes or 0
+
+
+def register_artifact(
+    db: Session, location: str, project_id: Optional[str], kind: str, size_bytes: Optional[int] = None
+) -> StoredArtifact:
+    """
+    Add or refresh the index row for a stored file (caller commits).
+
+    Local files are measured on disk (compressed size); remote objects use size_bytes.
+    """
+    artifact = db.query(StoredArtifact).filter(StoredArtifact.location == location).first()
+    if artifact is None:
+        artifact = StoredArtifact(location=location, pinned=False)
+        db.add(artifact)
+    artifact.project_id = project_id
+    artifact.kind = kind
+    artifact.size_bytes = _disk_size(location, size_bytes)
+    artifact.last_accessed_at = _now()
+    return artifact
+
+
+def touch(db: Session, location: str) -> None:
+    """Record an access (download/preview); throttled to one write per TOUCH_INTERVAL"""
+    now = _now()
+    updated = (
+        db.query(StoredArtifact)
+        .filter(StoredArtifact.location == location, StoredArtifact.last_accessed_at < now - TOUCH_INTERVAL)
+        .update({StoredArtifact.last_accessed_at: now}, synchronize_session=False)
+    )
+    if updated:
+        db.commit()
+
+
+def set_pinned(db: Session, location: str, project_id: Optional[str], kind: str, pinned: bool) -> StoredArtifact:
+    """Pin (protect from eviction) or unpin a stored file"""
+    artifact = db.query(StoredArtifact).filter(StoredArtifact.location == location).first()
+    if artifact is None:
+        artifact = register_artifact(db, location, project_id, kind)
+    artifact.pinned = pinned
+    db.commit()
+    return artifact
+
+
+def protected_locations(db: Session, project_id: Optional[str]) -> set[str]:
+    """Artifacts of a project that must survive eviction (besides pinned ones)"""
+    if project_id is None:
+        return set()
+    from app.models.job import Job
+    from app.models.script_version import ScriptVersion
+    
+    protected = set()
+    latest = db.query(func.max(ScriptVersion.version)).filter(ScriptVersion.project_id == project_id).scalar()
+    if latest is not None:
+        # Same path run_blender_db writes the script to
+        protected.add(str(Path(settings.BLENDER_WORKDIR) / project_id / f"script_v{latest}.py"))
+    
+    run = (
+        db.query(Job.result)
+        .filter(Job.project_id == project_id, Job.job_type == "run_blender", Job.status == "succeeded")
+        .order_by(Job.created_at.desc())
+        .first()
+    )
+    if run is not None and run.result:
+        protected.update(run.result[key] for key in ("output_file", "render_file", "blend_file") if run.result.get(key))
+        protected.update(export["file"] for export in (run.result.get("exports") or {}).values())
+    return protected
+
+
+def _evict(db: Session, query, to_free: int, is_protected: Callable[[StoredArtifact], bool]) -> tuple[int, int]:
+    """Delete unpinned artifacts from query, least recently accessed first, until to_free bytes are gone"""
+    count = freed = 0
+    after = None
+    while freed < to_free:
+        batch_query = query.filter(StoredArtifact.pinned.is_(False))
+        if after is not None:
+            batch_query = batch_query.filter(tuple_(StoredArtifact.last_accessed_at, StoredArtifact.id) > after)
+        batch = batch_query.order_by(StoredArtifact.last_accessed_at, StoredArtifact.id).limit(EVICT_BATCH).all()
+        if not batch:
+            break
+        for artifact in batch:
+            after = (artifact.last_accessed_at, artifact.id)
+            if is_protected(artifact):
+                continue
+            try:
+                storage_for(artifact.location).delete(artifact.location)
+            except Exception:
+                logger.exception("could not delete %s", artifact.location)
+                continue
+            freed += artifact.size_bytes
+            count += 1
+            db.delete(artifact)
+            if freed >= to_free:
+                break
+        db.commit()
+    return count, freed
+
+
+def enforce_quotas(db: Session) -> dict:
+    """Trim over-quota projects, then the global store; returns what was evicted"""
+    target = settings.RETENTION_TARGET_RATIO
+    cache: dict[Optional[str], set[str]] = {}
+    
+    def is_protected(artifact: StoredArtifact) -> bool:
+        if artifact.project_id not in cache:
+            cache[artifact.project_id] = protected_locations(db, artifact.project_id)
+        return artifact.location in cache[artifact.project_id]
+    
+    report = {"evicted": 0, "freed_bytes": 0, "projects": {}}
+    project_quota = settings.RETENTION_PROJECT_QUOTA_MB * MB
+    if project_quota:
+        usage = func.sum(StoredArtifact.size_bytes)
+        over = (
+            db.query(StoredArtifact.project_id, usage)
+            .filter(StoredArtifact.project_id.isnot(None))
+            .group_by(StoredArtifact.project_id)
+            .having(usage > project_quota)
+            .all()
+        )
+        for project_id, used in over:
+            count, freed = _evict(
+                db,
+                db.query(StoredArtifact).filter(StoredArtifact.project_id == project_id),
+                int(used - project_quota * target),
+                is_protected,
+            )
+            report["projects"][project_id] = {"evicted": count, "freed_bytes": freed}
+            report["evicted"] += count
+            report["freed_bytes"] += freed
+    
+    global_quota = settings.RETENTION_GLOBAL_QUOTA_MB * MB
+    if global_quota:
+        used = db.query(func.coalesce(func.sum(StoredArtifact.size_bytes), 0)).scalar()
+        if used > global_quota:
+            count, freed = _evict(db, db.query(StoredArtifact), int(used - global_quota * target), is_protected)
+            report["evicted"] += count
+            report["freed_bytes"] += freed
+    
+    if report["evicted"]:
+        logger.info("retention evicted %d artifacts (%d bytes)", report["evicted"], report["freed_bytes"])
+    return report
+
+
+def _kind_for(name: str) -> str:
+    for prefix, kind in (("script_", "script"), ("output_", "output"), ("render_", "render"), ("geometry_", "blend")):
+        if name.startswith(prefix):
+            return kind
+    return "output"
+
+
+def rebuild_index(db: Session) -> int:
+    """
+    Register local files the index doesn't know yet (one walk; for existing deployments).
+
+    Uploads are attributed to projects through their Asset rows, workdir
+    files through their BLENDER_WORKDIR/<project_id>/ directory (or its
+    per-job <job_id>/ subdirectories).
+    Returns the number of files added.
+    """
+    from app.models.asset import Asset
+    
+    known = {location for (location,) in db.query(StoredArtifact.location)}
+    owners = dict(db.query(Asset.storage_path, Asset.project_id))
+    added = 0
+    
+    def add(path: Path, project_id: Optional[str], kind: str) -> None:
+        nonlocal added
+        location = str(path)
+        if location in known:
+            return
+        stat = path.stat()
+        db.add(StoredArtifact(
+            location=location,
+            project_id=project_id,
+            kind=kind,
+            size_bytes=stat.st_size,
+            last_accessed_at=datetime.fromtimestamp(max(stat.st_atime, stat.st_mtime), timezone.utc),
+            pinned=False,
+        ))
+        added += 1
+    
+    upload_dir = Path(settings.LOCAL_UPLOAD_DIR)
+    if upload_dir.is_dir():
+        for entry in os.scandir(upload_dir):
+            if entry.is_file():
+                path = upload_dir / entry.name
+                add(path, owners.get(str(path)), "upload")
+    
+    workdir = Path(settings.BLENDER_WORKDIR)
+    if workdir.is_dir():
+        for project_dir in os.scandir(workdir):
+            # sweeps/ holds per-job files that are registered when a sweep finishes,
+            # packs/ the runner files of packed Blender runs, dot-dirs (.scratch) in-flight jobs
+            if not project_dir.is_dir() or project_dir.name in ("sweeps", "packs") or project_dir.name.startswith("."):
+                continue
+            for entry in os.scandir(project_dir.path):
+                if entry.is_file():
+                    add(Path(entry.path), project_dir.name, _kind_for(entry.name))
+                elif entry.is_dir() and not entry.name.startswith("."):
+                    # Outputs published per job: <project_id>/<job_id>/
+                    for output in os.scandir(entry.path):
+                        if output.is_file():
+                            add(Path(output.path), project_dir.name, _kind_for(output.name))
+    db.commit()
+    return added
+
+
+def schedule_retention(reschedule: bool = False) -> bool:
+    """
+    Enqueue the next enforce_retention run RETENTION_INTERVAL_MINUTES from now.
+
+    At most one run is scheduled at a time (workers call this on start-up);
+    the running task passes reschedule=True to queue its successor.
+    Needs a worker started with the RQ scheduler. Returns whether a run was queued.
+    """
+    if not settings.RETENTION_ENABLED:
+        return False
+    interval = timedelta(minutes=settings.RETENTION_INTERVAL_MINUTES)
+    redis = get_redis()
+    if reschedule:
+        redis.delete(SCHEDULE_KEY)
+    if not redis.set(SCHEDULE_KEY, 1, nx=True, ex=int(interval.total_seconds()) + 300):
+        return False
+    get_queue().enqueue_in(interval, TASK, result_ttl=0)
+    return True
@@ -0,0 +1,154 @@
+"""
+Compact shape descriptors for similarity search.
+
+A descriptor is a fixed-length float32 vector built with vectorized NumPy
+from a triangle mesh:
+
+- D2 shape distribution: histogram of distances between random surface
+  point pairs, scaled by the largest sampled distance (sqrt, so L2 between
+  descriptors approximates the Hellinger distance)
+- normalized bounding-box ratios (middle/longest, shortest/longest)
+- sphericity (36*pi*V^2)^(1/3) / A and bounding-box fill V / (x*y*z)
+
+Descriptors are scale- and translation-invariant and roughly
+rotation-invariant. Sampling is seeded, so the same mesh always gives the
+same vector. Reads binary/ASCII STL and OBJ.
+"""
+from pathlib import PurePath
+import numpy as np
+from app.core.compression import STORED_SUFFIXES
+from app.core.config import settings
+from app.core.queue import get_queue
+from app.core.stl import BINARY_FACET, BINARY_HEADER_SIZE, BINARY_COUNT
+
+DESCRIPTOR_VERSION = 1
+D2_BINS = 32
+SURFACE_SAMPLES = 2048
+D2_PAIRS = 16384
+SHAPE_FEATURE_WEIGHT = 0.5
+DESCRIPTOR_DIMS = D2_BINS + 4
+
+SUPPORTED_EXTENSIONS = (".stl", ".obj")
+
+STL_FACET_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attr", "<u2"),
+])
+assert STL_FACET_DTYPE.itemsize == BINARY_FACET.size
+
+
+class UnsupportedMeshFormat(ValueError):
+    """The file is not a mesh format descriptors can be computed from"""
+
+
+def _stl_triangles(data: bytes) -> np.ndarray:
+    header_size = BINARY_HEADER_SIZE + BINARY_COUNT.size
+    if len(data) >= header_size:
+        (count,) = BINARY_COUNT.unpack_from(data, BINARY_HEADER_SIZE)
+        if len(data) == header_size + count * STL_FACET_DTYPE.itemsize:
+            facets = np.frombuffer(data, dtype=STL_FACET_DTYPE, count=count, offset=header_size)
+            return facets["vertices"].astype(np.float64)
+    
+    # ASCII STL: every "vertex x y z" line, three per facet
+    coords = [
+        line.split()[1:4]
+        for line in data.decode("utf-8", errors="replace").splitlines()
+        if line.lstrip().startswith("vertex")
+    ]
+    vertices = np.asarray(coords, dtype=np.float64)
+    return vertices[: len(vertices) // 3 * 3].reshape(-1, 3, 3)
+
+
+def _obj_triangles(data: bytes) -> np.ndarray:
+    vertices = []
+    faces = []
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        if line.startswith("v "):
+            vertices.append(line.split()[1:4])
+        elif line.startswith("f "):
+            # "f 1/1/1 2/2/2 3/3/3 ..." -> vertex indices, fan-triangulated
+            idx = [int(p.split("/")[0]) for p in line.split()[1:]]
+            faces.extend((idx[0], idx[i], idx[i + 1]) for i in range(1, len(idx) - 1))
+    if not vertices or not faces:
+        return np.zeros((0, 3, 3))
+    verts = np.asarray(vertices, dtype=np.float64)
+    face_idx = np.asarray(faces, dtype=np.int64)
+    # OBJ indices are 1-based; negative ones count from the end
+    face_idx = np.where(face_idx > 0, face_idx - 1, face_idx + len(verts))
+    return verts[face_idx]
+
+
+def load_triangles(data: bytes, filename: str) -> np.ndarray:
+    """(N, 3, 3) triangle array from mesh bytes, dispatched on filename extension"""
+    # Stored artifacts may carry a compression marker (model.stl+zst)
+    for marker in STORED_SUFFIXES.values():
+        filename = filename.removesuffix(marker)
+    suffixes = [s.lower() for s in PurePath(filename).suffixes]
+    ext = next((s for s in reversed(suffixes) if s in SUPPORTED_EXTENSIONS), None)
+    if ext == ".stl":
+        return _stl_triangles(data)
+    if ext == ".obj":
+        return _obj_triangles(data)
+    raise UnsupportedMeshFormat(f"Cannot compute shape descriptors for {filename}")
+
+
+def _sample_surface(triangles: np.ndarray, areas: np.ndarray, n: int, rng) -> np.ndarray:
+    """Area-weighted uniform samples on the mesh surface"""
+    chosen = rng.choice(len(triangles), size=n, p=areas / areas.sum())
+    a, b, c = (triangles[chosen, i] for i in range(3))
+    r1 = np.sqrt(rng.random((n, 1)))
+    r2 = rng.random((n, 1))
+    return (1 - r1) * a + r1 * (1 - r2) * b + r1 * r2 * c
+
+
+def describe(triangles: np.ndarray) -> np.ndarray:
+    """Shape descriptor (float32, DESCRIPTOR_DIMS) of a triangle mesh"""
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    cross = np.cross(b - a, c - a)
+    areas = 0.5 * np.linalg.norm(cross, axis=1)
+    total_area = areas.sum()
+    if len(triangles) == 0 or not np.isfinite(total_area) or total_area <= 0:
+        raise ValueError("Mesh has no surface area")
+    
+    rng = np.random.default_rng(0)
+    points = _sample_surface(triangles, areas, SURFACE_SAMPLES, rng)
+    i = rng.integers(0, SURFACE_SAMPLES, D2_PAIRS)
+    j = rng.integers(0, SURFACE_SAMPLES, D2_PAIRS)
+    distances = np.linalg.norm(points[i] - points[j], axis=1)
+    scale = distances.max()
+    hist, _ = np.histogram(distances / scale if scale > 0 else distances, bins=D2_BINS, range=(0.0, 1.0))
+    d2 = np.sqrt(hist / hist.sum())
+    
+    vertices = triangles.reshape(-1, 3)
+    extents = np.sort(vertices.max(axis=0) - vertices.min(axis=0))[::-1]
+    longest = extents[0] if extents[0] > 0 else 1.0
+    # Signed tetrahedron volumes; exact for closed meshes, an estimate otherwise
+    volume = abs(np.einsum("ij,ij->i", a, np.cross(b, c)).sum()) / 6.0
+    sphericity = (36 * np.pi * volume ** 2) ** (1 / 3) / total_area
+    box = float(np.prod(extents))
+    fill = volume / box if box > 0 else 0.0
+    
+    shape = np.array([
+        extents[1] / longest,
+        extents[2] / longest,
+        min(sphericity, 1.0),
+        min(fill, 1.0),
+    ])
+    return np.concatenate([d2, SHAPE_FEATURE_WEIGHT * shape]).astype(np.float32)
+
+
+def describe_bytes(data: bytes, filename: str) -> np.ndarray:
+    return describe(load_triangles(data, filename))
+
+
+def enqueue_descriptor(subject_type: str, subject_id) -> None:
+    """Compute a subject's descriptor in a worker (no-op if SHAPE_DESCRIPTORS_ENABLED is off)"""
+    if not settings.SHAPE_DESCRIPTORS_ENABLED:
+        return
+    get_queue().enqueue("app.workers.tasks.compute_shape_descriptor", subject_type, str(subject_id))
+
+
+def is_mesh_file(filename: str) -> bool:
+    return any(s.lower() in SUPPORTED_EXTENSIONS for s in PurePath(filename).suffixes)
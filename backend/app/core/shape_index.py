@@ -0,0 +1,272 @@
+"""
+Approximate nearest-neighbour index over shape descriptors.
+
+All descriptors live in one contiguous float32 matrix. Small libraries are
+searched exhaustively with a single matrix-vector product. From
+SHAPE_INDEX_IVF_MIN_SIZE descriptors on, the matrix is clustered with
+k-means (sqrt(n) lists) and physically reordered so each list is a
+contiguous slice. A query then scans only the SHAPE_INDEX_NPROBE closest
+lists plus the not-yet-clustered tail, which is retrained once it grows
+past 10%.
+
+Descriptors are persisted in the shape_descriptors table. Each process keeps
+one index and pulls new rows incrementally by id; loading and searching it
+share one lock.
+"""
+from typing import Optional
+import math
+import threading
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.shape_descriptors import DESCRIPTOR_DIMS, DESCRIPTOR_VERSION, describe_bytes
+from app.core.storage import read_artifact
+from app.models.shape_descriptor import ShapeDescriptor
+
+Key = tuple[str, str]  # (subject_type, subject_id)
+
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_CHUNK_ROWS = 65536
+RETRAIN_TAIL_FRACTION = 0.1
+
+
+class ShapeIndex:
+    """Contiguous descriptor matrix with optional inverted-file (IVF) partitioning"""
+    
+    def __init__(self, dims: int = DESCRIPTOR_DIMS, ivf_min_size: int = 20000, nprobe: int = 8):
+        self.dims = dims
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self._vectors = np.empty((1024, dims), dtype=np.float32)
+        self._norms = np.empty(1024, dtype=np.float32)
+        self._live = np.zeros(1024, dtype=bool)
+        self._size = 0
+        self._keys: list[Key] = []
+        self._rows: dict[Key, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._clustered = 0  # rows [0, _clustered) are grouped by list
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __contains__(self, key: Key) -> bool:
+        return key in self._rows
+    
+    def vector(self, key: Key) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        return None if row is None else self._vectors[row].copy()
+    
+    def add(self, key: Key, vector: np.ndarray) -> None:
+        """Insert or replace the descriptor for key"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(self.dims)
+        old = self._rows.get(key)
+        if old is not None:
+            # Rows never move outside a retrain: retire the old one, append the new
+            self._live[old] = False
+        
+        if self._size == len(self._vectors):
+            capacity = len(self._vectors) * 2
+            self._vectors = np.resize(self._vectors, (capacity, self.dims))
+            self._norms = np.resize(self._norms, capacity)
+            live = np.zeros(capacity, dtype=bool)
+            live[: self._size] = self._live[: self._size]
+            self._live = live
+        
+        row = self._size
+        self._vectors[row] = vector
+        self._norms[row] = float(vector @ vector)
+        self._live[row] = True
+        self._keys.append(key)
+        self._rows[key] = row
+        self._size += 1
+    
+    def maybe_train(self) -> None:
+        """(Re)cluster once the library is large enough or the unclustered tail is too long"""
+        live = len(self._rows)
+        if live < self.ivf_min_size:
+            return
+        tail = self._size - self._clustered
+        if self._centroids is None or tail > RETRAIN_TAIL_FRACTION * max(self._clustered, 1):
+            self.train()
+    
+    def train(self, seed: int = 0) -> None:
+        """k-means over the live rows, then regroup the matrix list by list"""
+        self._compact()
+        n = self._size
+        n_lists = max(1, int(math.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        vectors = self._vectors[:n]
+        
+        sample_size = min(n, n_lists * KMEANS_SAMPLE_PER_LIST)
+        sample = vectors[rng.choice(n, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assign = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=n_lists)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        
+        assign = self._nearest(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        self._vectors[:n] = vectors[order]
+        self._norms[:n] = self._norms[:n][order]
+        self._keys = [self._keys[i] for i in order]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        self._centroids = centroids
+        self._offsets = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        self._clustered = n
+    
+    def search(self, vector: np.ndarray, k: int = 10, exclude: Optional[Key] = None) -> list[tuple[Key, float]]:
+        """k nearest keys by L2 distance, closest first"""
+        if not self._rows:
+            return []
+        query = np.asarray(vector, dtype=np.float32).reshape(self.dims)
+        rows = self._candidates(query)
+        rows = rows[self._live[rows]]
+        if exclude is not None and exclude in self._rows:
+            rows = rows[rows != self._rows[exclude]]
+        if len(rows) == 0:
+            return []
+        
+        # ||v - q||^2 = ||v||^2 - 2 v.q + ||q||^2, one matrix-vector product
+        dist = self._norms[rows] - 2.0 * (self._vectors[rows] @ query) + float(query @ query)
+        k = min(k, len(rows))
+        top = np.argpartition(dist, k - 1)[:k]
+        top = top[np.argsort(dist[top])]
+        return [(self._keys[rows[i]], float(math.sqrt(max(dist[i], 0.0)))) for i in top]
+    
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.arange(self._size)
+        nprobe = min(self.nprobe, len(self._centroids))
+        centroid_dist = ((self._centroids - query) ** 2).sum(axis=1)
+        probe = np.argpartition(centroid_dist, nprobe - 1)[:nprobe]
+        slices = [np.arange(self._offsets[p], self._offsets[p + 1]) for p in probe]
+        slices.append(np.arange(self._clustered, self._size))
+        return np.concatenate(slices)
+    
+    def _compact(self) -> None:
+        """Drop retired rows so the matrix holds live descriptors only"""
+        keep = np.flatnonzero(self._live[: self._size])
+        if len(keep) == self._size:
+            return
+        n = len(keep)
+        self._vectors[:n] = self._vectors[keep]
+        self._norms[:n] = self._norms[keep]
+        self._live[:] = False
+        self._live[:n] = True
+        self._keys = [self._keys[i] for i in keep]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        self._size = n
+    
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        c_norms = (centroids ** 2).sum(axis=1)
+        out = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), ASSIGN_CHUNK_ROWS):
+            chunk = vectors[start:start + ASSIGN_CHUNK_ROWS]
+            out[start:start + len(chunk)] = np.argmin(c_norms - 2.0 * (chunk @ centroids.T), axis=1)
+        return out
+
+
+_index: Optional[ShapeIndex] = None
+_loaded_id = 0
+_lock = threading.Lock()
+
+
+def get_shape_index(db: Session, batch_size: int = 10000) -> ShapeIndex:
+    """Process-wide index, topped up with descriptor rows added since the last call"""
+    global _index, _loaded_id
+    with _lock:
+        if _index is None:
+            _index = ShapeIndex(
+                ivf_min_size=settings.SHAPE_INDEX_IVF_MIN_SIZE,
+                nprobe=settings.SHAPE_INDEX_NPROBE,
+            )
+        while True:
+            rows = (
+                db.query(ShapeDescriptor.id, ShapeDescriptor.subject_type, ShapeDescriptor.subject_id, ShapeDescriptor.vector)
+                .filter(ShapeDescriptor.id > _loaded_id, ShapeDescriptor.version == DESCRIPTOR_VERSION)
+                .order_by(ShapeDescriptor.id)
+                .limit(batch_size)
+                .all()
+            )
+            for row in rows:
+                _index.add((row.subject_type, str(row.subject_id)), np.frombuffer(row.vector, dtype="<f4"))
+            if rows:
+                _loaded_id = rows[-1].id
+            if len(rows) < batch_size:
+                break
+        _index.maybe_train()
+        return _index
+
+
+def _subject_file(db: Session, subject_type: str, subject_id: str) -> Optional[tuple[str, str]]:
+    """(storage location, filename) of the mesh behind a subject, or None if it has none"""
+    if subject_type == "asset":
+        from app.models.asset import Asset
+        
+        asset = db.query(Asset).filter(Asset.id == subject_id).first()
+        if asset is None or asset.asset_type != "model3d":
+            return None
+        return asset.storage_path, asset.filename
+    if subject_type == "model":
+        from app.models.model import Model
+        
+        model = db.query(Model).filter(Model.id == int(subject_id)).first()
+        if model is None or not model.file_path:
+            return None
+        return model.file_path, model.file_path
+    raise ValueError(f"Unknown subject type: {subject_type}")
+
+
+def compute_descriptor(db: Session, subject_type: str, subject_id: str) -> Optional[np.ndarray]:
+    """
+    Compute and store the descriptor of a model or model3d asset.
+
+    Returns None if the subject has no mesh file. Raises
+    UnsupportedMeshFormat for formats descriptors can't be computed from.
+    """
+    found = _subject_file(db, subject_type, str(subject_id))
+    if found is None:
+        return None
+    location, filename = found
+    vector = describe_bytes(read_artifact(location), filename)
+    
+    # Replace rather than update so other processes pick the change up by id
+    db.query(ShapeDescriptor).filter(
+        ShapeDescriptor.subject_type == subject_type,
+        ShapeDescriptor.subject_id == str(subject_id),
+    ).delete(synchronize_session=False)
+    db.add(ShapeDescriptor(
+        subject_type=subject_type,
+        subject_id=str(subject_id),
+        version=DESCRIPTOR_VERSION,
+        vector=vector.astype("<f4").tobytes(),
+    ))
+    db.commit()
+    return vector
+
+
+def find_similar(db: Session, subject_type: str, subject_id: str, k: int = 10) -> Optional[list[tuple[Key, float]]]:
+    """
+    Nearest shapes to a subject; computes its descriptor on demand.
+
+    Returns None if the subject has no mesh to describe.
+    """
+    key = (subject_type, str(subject_id))
+    index = get_shape_index(db)
+    with _lock:
+        vector = index.vector(key)
+    if vector is None:
+        vector = compute_descriptor(db, subject_type, subject_id)
+        if vector is None:
+            return None
+        index = get_shape_index(db)
+    # add() reallocates and train() reorders the matrix in place; search a consistent one
+    with _lock:
+        return index.search(vector, k=k, exclude=key)
@@ -0,0 +1,93 @@
+"""STL helpers: detect ASCII STL and rewrite it as binary STL"""
+from pathlib import Path
+import os
+import struct
+import tempfile
+
+BINARY_HEADER_SIZE = 80
+BINARY_FACET = struct.Struct("<12fH")
+BINARY_COUNT = struct.Struct("<I")
+
+
+def is_ascii_stl(file_obj) -> bool:
+    """
+    Check a seekable STL stream (position is restored).
+
+    Binary files may also start with "solid", so the size implied by the
+    facet count decides.
+    """
+    start = file_obj.tell()
+    try:
+        head = file_obj.read(BINARY_HEADER_SIZE + BINARY_COUNT.size)
+        if not head.lstrip().startswith(b"solid"):
+            return False
+        file_obj.seek(0, os.SEEK_END)
+        size = file_obj.tell() - start
+        if len(head) == BINARY_HEADER_SIZE + BINARY_COUNT.size:
+            (count,) = BINARY_COUNT.unpack_from(head, BINARY_HEADER_SIZE)
+            if size == BINARY_HEADER_SIZE + BINARY_COUNT.size + count * BINARY_FACET.size:
+                return False
+        return True
+    finally:
+        file_obj.seek(start)
+
+
+def ascii_to_binary(src, dest) -> int:
+    """Convert an ASCII STL stream into binary STL on a seekable dest; returns facet count"""
+    header = b"binary STL normalized by mcp-3d-backend"
+    dest.write(header.ljust(BINARY_HEADER_SIZE, b"\0"))
+    count_pos = dest.tell()
+    dest.write(BINARY_COUNT.pack(0))
+    
+    count = 0
+    normal = (0.0, 0.0, 0.0)
+    vertices: list[float] = []
+    for raw in src:
+        parts = raw.split()
+        if not parts:
+            continue
+        keyword = parts[0].lower()
+        if keyword == b"facet":
+            normal = tuple(float(v) for v in parts[2:5]) if len(parts) >= 5 else (0.0, 0.0, 0.0)
+            vertices = []
+        elif keyword == b"vertex":
+            vertices.extend(float(v) for v in parts[1:4])
+        elif keyword == b"endfacet":
+            if len(vertices) != 9:
+                raise ValueError(f"Malformed ASCII STL facet #{count + 1}")
+            dest.write(BINARY_FACET.pack(*normal, *vertices, 0))
+            count += 1
+    
+    end = dest.tell()
+    dest.seek(count_pos)
+    dest.write(BINARY_COUNT.pack(count))
+    dest.seek(end)
+    return count
+
+
+def normalize_stl_file(path: Path) -> bool:
+    """Rewrite an ASCII STL file as binary in place; returns True if converted"""
+    path = Path(path)
+    with path.open("rb") as f:
+        if not is_ascii_stl(f):
+            return False
+    
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".stl.tmp")
+    try:
+        with path.open("rb") as src, os.fdopen(fd, "wb") as dest:
+            ascii_to_binary(src, dest)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return True
+
+
+def normalize_stl_stream(file_obj):
+    """Binary-STL version of an uploaded stream (the stream itself if already binary)"""
+    if not is_ascii_stl(file_obj):
+        return file_obj
+    out = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    ascii_to_binary(file_obj, out)
+    out.seek(0)
+    return out
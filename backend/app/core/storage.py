@@ -1,8 +1,36 @@
-"""File storage utilities"""
+"""
+File storage utilities.
+
+Artifacts (uploads, Blender outputs) go through a StorageBackend chosen by
+STORAGE_MODE:
+
+- local: files under LOCAL_UPLOAD_DIR / BLENDER_WORKDIR, storage_path is a
+  filesystem path
+- s3: any S3-compatible object store (AWS, MinIO), storage_path is
+  s3://bucket/key (see app.core.storage_s3)
+
+Text-like artifacts (STL, scripts, logs) can be stored compressed; see
+app.core.compression.
+
+Readers resolve the backend from the stored location with storage_for(),
+so assets written before a STORAGE_MODE switch stay readable.
+"""
 from pathlib import Path
+from typing import Iterator, Optional
+import errno
+import os
+import re
 import shutil
 import uuid
 from app.core.config import settings
+from app.core.compression import (
+    STORED_SUFFIXES, compress_file, compress_stream, decompress_chunks, should_compress, stored_encoding
+)
+from app.core.stl import normalize_stl_file, normalize_stl_stream
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+OUTPUT_PREFIX = "outputs/"
+_UNSAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]")
 
 
 def get_upload_dir() -> Path:
@@ -19,24 +47,243 @@ def get_output_dir() -> Path:
     return output_dir
 
 
-def save_upload_file(file_obj, filename: str) -> tuple[str, int]:
+class StorageBackend:
+    """Interface every storage backend implements"""
+    
+    #: True if storage_path values are plain local filesystem paths
+    is_local = False
+    
+    def save_upload(
+        self, file_obj, filename: str, content_type: Optional[str] = None, content_encoding: Optional[str] = None
+    ) -> tuple[str, int]:
+        """Store an uploaded stream; returns (storage_path, stored size_bytes)"""
+        raise NotImplementedError
+    
+    def publish_file(
+        self, local_path: Path, key: str, content_type: Optional[str] = None, content_encoding: Optional[str] = None
+    ) -> tuple[str, int]:
+        """Store a file produced by a worker under key; returns (storage_path, stored size_bytes)"""
+        raise NotImplementedError
+    
+    def open_stream(self, location: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the stored bytes in chunks"""
+        raise NotImplementedError
+    
+    def exists(self, location: str) -> bool:
+        raise NotImplementedError
+    
+    def delete(self, location: str) -> None:
+        raise NotImplementedError
+    
+    def local_path(self, location: str) -> Optional[Path]:
+        """Filesystem path for location, if the backend has one"""
+        return None
+    
+    def presigned_url(self, location: str, filename: Optional[str] = None, inline: bool = False) -> Optional[str]:
+        """Time-limited direct download URL, if the backend supports it"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Files on the local (or shared) filesystem"""
+    
+    is_local = True
+    
+    def save_upload(
+        self, file_obj, filename: str, content_type: Optional[str] = None, content_encoding: Optional[str] = None
+    ) -> tuple[str, int]:
+        upload_dir = get_upload_dir()
+        asset_id = uuid.uuid4().hex
+        safe_name = f"{asset_id}_{filename}"
+        dest = upload_dir / safe_name
+        
+        with dest.open("wb") as f:
+            shutil.copyfileobj(file_obj, f)
+        
+        size = dest.stat().st_size
+        return str(dest), size
+    
+    def publish_file(
+        self, local_path: Path, key: str, content_type: Optional[str] = None, content_encoding: Optional[str] = None
+    ) -> tuple[str, int]:
+        # Keys map to paths under BLENDER_WORKDIR; files already there stay where they are
+        local_path = Path(local_path)
+        dest = Path(settings.BLENDER_WORKDIR) / key.removeprefix(OUTPUT_PREFIX)
+        if local_path.resolve() != dest.resolve():
+            _move_into_place(local_path, dest)
+        return str(dest), dest.stat().st_size
+    
+    def open_stream(self, location: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        with open(location, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
+    def exists(self, location: str) -> bool:
+        return Path(location).exists()
+    
+    def delete(self, location: str) -> None:
+        Path(location).unlink(missing_ok=True)
+    
+    def local_path(self, location: str) -> Optional[Path]:
+        return Path(location)
+
+
+_backends: dict = {}
+
+
+def _backend(mode: str) -> StorageBackend:
+    backend = _backends.get(mode)
+    if backend is None:
+        if mode == "local":
+            backend = LocalStorage()
+        elif mode == "s3":
+            # boto3 is only needed (and imported) when S3 storage is used
+            from app.core.storage_s3 import S3Storage
+            
+            backend = S3Storage()
+        else:
+            raise ValueError(f"Unknown STORAGE_MODE: {mode}")
+        _backends[mode] = backend
+    return backend
+
+
+def get_storage() -> StorageBackend:
+    """Backend new artifacts are written to (STORAGE_MODE)"""
+    return _backend(settings.STORAGE_MODE)
+
+
+def storage_for(location: str) -> StorageBackend:
+    """Backend that holds an existing storage_path"""
+    if location.startswith("s3://"):
+        return _backend("s3")
+    return _backend("local")
+
+
+def output_key(project_id: str, filename: str, job_id: Optional[str] = None) -> str:
+    """Object key for a worker output (under the job's own prefix when job_id is given)"""
+    if job_id is None:
+        return f"{OUTPUT_PREFIX}{project_id}/{filename}"
+    return f"{OUTPUT_PREFIX}{project_id}/{job_id}/{filename}"
+
+
+def _move_into_place(src: Path, dest: Path) -> None:
+    """Rename src to dest atomically; across filesystems (tmpfs scratch) via a temp file next to dest"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(src, dest)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    src.unlink()
+
+
+def storage_name(filename: str) -> str:
+    """
+    A user-supplied filename made safe for storage keys.
+    
+    Only [A-Za-z0-9._-] is kept, so the name can never carry the "+codec"
+    marker compressed artifacts are recognized by. The original name stays
+    on the asset for downloads.
+    """
+    return _UNSAFE_NAME_RE.sub("_", filename) or "file"
+
+
+def read_artifact(location: str) -> bytes:
+    """Whole (decompressed) content of a stored artifact"""
+    chunks = storage_for(location).open_stream(location)
+    encoding = stored_encoding(location)
+    if encoding:
+        chunks = decompress_chunks(chunks, encoding)
+    return b"".join(chunks)
+
+
+def save_upload_file(file_obj, filename: str, content_type: Optional[str] = None) -> tuple[str, int]:
     """
     Save uploaded file and return (storage_path, size_bytes)
     
+    ASCII STL uploads are rewritten as binary when STL_NORMALIZE_BINARY is
+    set, and eligible types are compressed (STORAGE_COMPRESSION).
+    
     Args:
         file_obj: File-like object
         filename: Original filename
-        
+        content_type: MIME type stored with the object (S3)
+    
     Returns:
-        tuple: (storage_path as str, size_bytes as int)
+        tuple: (storage_path as str, uncompressed size_bytes as int)
     """
-    upload_dir = get_upload_dir()
-    asset_id = uuid.uuid4().hex
-    safe_name = f"{asset_id}_{filename}"
-    dest = upload_dir / safe_name
+    if settings.STL_NORMALIZE_BINARY and filename.lower().endswith(".stl"):
+        file_obj = normalize_stl_stream(file_obj)
+    
+    storage = get_storage()
+    name = storage_name(filename)
+    encoding = should_compress(content_type)
+    if encoding is None:
+        return storage.save_upload(file_obj, name, content_type)
+    
+    compressed, size = compress_stream(file_obj, encoding)
+    with compressed:
+        location, _ = storage.save_upload(compressed, name + STORED_SUFFIXES[encoding], content_type, encoding)
+    return location, size
+
+
+def _prepare_output(path: Path, content_type: str) -> tuple[Path, int, Optional[str]]:
+    """Normalize/compress a worker output; returns (file to publish, size, encoding)"""
+    if settings.STL_NORMALIZE_BINARY and path.suffix.lower() == ".stl":
+        normalize_stl_file(path)
+    size = path.stat().st_size
     
-    with dest.open("wb") as f:
-        shutil.copyfileobj(file_obj, f)
+    encoding = should_compress(content_type)
+    if encoding is None:
+        return path, size, None
+    
+    compressed = compress_file(path, encoding, STORED_SUFFIXES[encoding])
+    path.unlink()
+    return compressed, size, encoding
+
+
+def publish_outputs(
+    project_id: str, files: list[tuple[Path, str]], job_id: Optional[str] = None
+) -> list[tuple[str, int]]:
+    """
+    Publish worker outputs [(local_path, content_type), ...] to storage.
+    
+    Outputs are normalized/compressed first (see save_upload_file). With
+    job_id they are stored under that job's own prefix, so concurrent jobs
+    of a project never overwrite each other's files. Local storage moves
+    each file into place with an atomic rename (readers see the whole file
+    or nothing); remote backends upload the files concurrently (each one
+    multipart and parallel above the configured threshold; an object only
+    appears once complete) and remove the local copies.
+    Returns [(storage_path, uncompressed size_bytes), ...] in the same order.
+    """
+    storage = get_storage()
+    prepared = [(_prepare_output(Path(path), ctype), ctype) for path, ctype in files]
+    
+    def _publish(item):
+        (path, size, encoding), ctype = item
+        location, _ = storage.publish_file(path, output_key(project_id, path.name, job_id), ctype, encoding)
+        return location, size
+    
+    if storage.is_local or len(prepared) <= 1:
+        results = [_publish(item) for item in prepared]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=len(prepared)) as pool:
+            results = list(pool.map(_publish, prepared))
     
-    size = dest.stat().st_size
-    return str(dest), size
+    if not storage.is_local:
+        for (path, _, _), _ in prepared:
+            path.unlink(missing_ok=True)
+    return results
@@ -0,0 +1,133 @@
+"""S3-compatible object storage backend (AWS S3, MinIO, moto)"""
+from pathlib import Path
+from typing import Iterator, Optional
+import uuid
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from app.core.config import settings
+from app.core.storage import DEFAULT_CHUNK_SIZE, StorageBackend
+
+MB = 1024 * 1024
+
+
+def parse_s3_uri(location: str) -> tuple[str, str]:
+    """Split s3://bucket/key into (bucket, key)"""
+    if not location.startswith("s3://"):
+        raise ValueError(f"Not an s3:// location: {location}")
+    bucket, _, key = location[len("s3://"):].partition("/")
+    return bucket, key
+
+
+class _CountingReader:
+    """Wraps a stream and counts bytes read (upload size without a second pass)"""
+    
+    def __init__(self, file_obj):
+        self._file_obj = file_obj
+        self.bytes_read = 0
+    
+    def read(self, size=-1):
+        data = self._file_obj.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _extra_args(content_type: Optional[str], content_encoding: Optional[str]) -> Optional[dict]:
+    # Content-Encoding is served as-is by presigned GETs
+    extra = {}
+    if content_type:
+        extra["ContentType"] = content_type
+    if content_encoding:
+        extra["ContentEncoding"] = content_encoding
+    return extra or None
+
+
+class S3Storage(StorageBackend):
+    """Objects in S3_BUCKET under S3_PREFIX"""
+    
+    def __init__(self):
+        if not settings.S3_BUCKET:
+            raise ValueError("STORAGE_MODE=s3 requires S3_BUCKET")
+        
+        self.bucket = settings.S3_BUCKET
+        self.prefix = settings.S3_PREFIX.strip("/")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            region_name=settings.S3_REGION or None,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+            config=Config(
+                signature_version="s3v4",
+                s3={"addressing_style": settings.S3_ADDRESSING_STYLE},
+                # Enough connections for every multipart thread of parallel uploads
+                max_pool_connections=max(10, settings.S3_MAX_CONCURRENCY * 4),
+            ),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * MB,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_MB * MB,
+            max_concurrency=settings.S3_MAX_CONCURRENCY,
+            use_threads=True,
+        )
+    
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+    
+    def _location(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+    
+    def save_upload(
+        self, file_obj, filename: str, content_type: Optional[str] = None, content_encoding: Optional[str] = None
+    ) -> tuple[str, int]:
+        key = self._key(f"uploads/{uuid.uuid4().hex}_{filename}")
+        reader = _CountingReader(file_obj)
+        extra = _extra_args(content_type, content_encoding)
+        self.client.upload_fileobj(reader, self.bucket, key, ExtraArgs=extra, Config=self.transfer_config)
+        return self._location(key), reader.bytes_read
+    
+    def publish_file(
+        self, local_path: Path, key: str, content_type: Optional[str] = None, content_encoding: Optional[str] = None
+    ) -> tuple[str, int]:
+        local_path = Path(local_path)
+        key = self._key(key)
+        extra = _extra_args(content_type, content_encoding)
+        self.client.upload_file(str(local_path), self.bucket, key, ExtraArgs=extra, Config=self.transfer_config)
+        return self._location(key), local_path.stat().st_size
+    
+    def open_stream(self, location: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        bucket, key = parse_s3_uri(location)
+        body = self.client.get_object(Bucket=bucket, Key=key)["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+    
+    def exists(self, location: str) -> bool:
+        bucket, key = parse_s3_uri(location)
+        try:
+            self.client.head_object(Bucket=bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+    
+    def delete(self, location: str) -> None:
+        bucket, key = parse_s3_uri(location)
+        self.client.delete_object(Bucket=bucket, Key=key)
+    
+    def presigned_url(self, location: str, filename: Optional[str] = None, inline: bool = False) -> Optional[str]:
+        if not settings.S3_PRESIGN_DOWNLOADS:
+            return None
+        bucket, key = parse_s3_uri(location)
+        params = {"Bucket": bucket, "Key": key}
+        if filename:
+            disposition = "inline" if inline else "attachment"
+            params["ResponseContentDisposition"] = f'{disposition}; filename="{filename}"'
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params=params,
+            ExpiresIn=settings.S3_PRESIGN_EXPIRES_SECONDS,
+        )
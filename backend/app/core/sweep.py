@@ -0,0 +1,378 @@
+"""
+Design-space sweeps over the base-plate template.
+
+A sweep samples parameter combinations (grid, random or Latin hypercube)
+from explicit ranges and/or a Model's ModelParameter constraints. It
+evaluates every variant and writes one row per variant to a Parquet file.
+Rows hold the parameters plus volume, surface area, bounding box, mass
+estimate, run time and success. Nothing per variant goes to the database.
+
+Evaluators:
+- analytic: closed-form geometry of the plate (microseconds per variant)
+- blender: builds and runs the Blender script per variant and measures the
+  exported STL
+
+Parquet/Arrow support needs the optional `pyarrow` package.
+"""
+from typing import Any, Iterable, Optional
+import itertools
+import math
+import re
+import numpy as np
+from app.core.config import settings
+
+# Base-plate template parameters (see app.workers.tasks.build_blender_script)
+TEMPLATE_PARAMETERS = ("L", "W", "T", "hole_d", "hole_count", "ring_radius", "fillet_radius")
+INT_PARAMETERS = frozenset({"hole_count"})
+# Descriptive names (as Model parameters tend to use) for template parameters; a _mm suffix is ignored
+PARAMETER_ALIASES = {
+    "length": "L",
+    "width": "W",
+    "thickness": "T",
+    "hole_diameter": "hole_d",
+    "holes": "hole_count",
+}
+
+METRIC_COLUMNS = (
+    "success", "error", "volume_mm3", "surface_area_mm2",
+    "bbox_x_mm", "bbox_y_mm", "bbox_z_mm", "mass_g", "run_time_s",
+)
+
+RESULTS_CONTENT_TYPE = "application/vnd.apache.parquet"
+
+FILTER_RE = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(==|!=|<=|>=|<|>)\s*(.+?)\s*$")
+
+
+class SweepError(ValueError):
+    """Invalid sweep definition or results query"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Sweep results require the 'pyarrow' package") from e
+    return pyarrow
+
+
+# ===== Parameter space =====
+
+def template_name(name: str) -> str:
+    """Template parameter a swept or fixed parameter name stands for"""
+    if name in TEMPLATE_PARAMETERS:
+        return name
+    key = name.strip().lower().removesuffix("_mm")
+    key = PARAMETER_ALIASES.get(key, key)
+    if key not in TEMPLATE_PARAMETERS:
+        raise SweepError(
+            f"Unknown parameter {name!r}; the template takes {', '.join(TEMPLATE_PARAMETERS)} "
+            f"(or {', '.join(PARAMETER_ALIASES)})"
+        )
+    return key
+
+
+def _by_template_name(items: dict) -> dict:
+    renamed = {}
+    for name, value in items.items():
+        key = template_name(name)
+        if key in renamed:
+            raise SweepError(f"Parameter {key!r} is given more than once")
+        renamed[key] = value
+    return renamed
+
+
+def fixed_parameters(fixed: dict) -> dict:
+    """Fixed values keyed by template parameter"""
+    return _by_template_name(fixed)
+
+
+def space_from_spec(parameters: dict) -> dict[str, dict]:
+    """Normalize SweepParameter dicts to {template name: {kind, min, max, values}}"""
+    space = {}
+    for name, p in _by_template_name(parameters).items():
+        if p.get("values"):
+            space[name] = {"kind": "categorical", "values": list(p["values"])}
+        else:
+            kind = "int" if p.get("type") == "int" or name in INT_PARAMETERS else "float"
+            space[name] = {"kind": kind, "min": float(p["min"]), "max": float(p["max"])}
+    return space
+
+
+def space_from_model(model) -> dict[str, dict]:
+    """Sweepable parameters of a Model: allowed_values or numeric min/max constraints"""
+    space = {}
+    for param in model.model_parameters:
+        if param.allowed_values:
+            space[param.parameter_name] = {"kind": "categorical", "values": list(param.allowed_values)}
+        elif param.parameter_type in ("float", "int") and param.min_value is not None and param.max_value is not None:
+            space[param.parameter_name] = {
+                "kind": param.parameter_type,
+                "min": float(param.min_value),
+                "max": float(param.max_value),
+            }
+    return _by_template_name(space)
+
+
+def sweep_space(parameters: dict, fixed: dict, model=None) -> dict[str, dict]:
+    """
+    Swept dimensions of a sweep: the model's constraints, overridden by
+    explicit ranges, minus fixed parameters. Every name must map to a
+    template parameter (template_name); SweepError otherwise.
+    """
+    space = space_from_model(model) if model is not None else {}
+    space.update(space_from_spec(parameters))
+    for name in fixed_parameters(fixed):
+        space.pop(name, None)
+    return space
+
+
+def _grid_axis(dim: dict, levels: int) -> list:
+    if dim["kind"] == "categorical":
+        return dim["values"]
+    points = np.linspace(dim["min"], dim["max"], levels)
+    if dim["kind"] == "int":
+        return sorted({int(round(v)) for v in points})
+    return [float(v) for v in points]
+
+
+def _scale(dim: dict, u: np.ndarray) -> list:
+    """Map unit-interval samples onto a dimension"""
+    if dim["kind"] == "categorical":
+        values = dim["values"]
+        idx = np.minimum((u * len(values)).astype(int), len(values) - 1)
+        return [values[i] for i in idx]
+    if dim["kind"] == "int":
+        lo, hi = int(math.ceil(dim["min"])), int(math.floor(dim["max"]))
+        return [int(v) for v in np.minimum(lo + np.floor(u * (hi - lo + 1)), hi)]
+    return [float(v) for v in dim["min"] + u * (dim["max"] - dim["min"])]
+
+
+def variant_count(space: dict[str, dict], plan: dict) -> int:
+    if plan["method"] == "grid":
+        return math.prod(len(_grid_axis(dim, plan["levels"])) for dim in space.values())
+    return plan["samples"]
+
+
+def sample(space: dict[str, dict], plan: dict) -> list[dict[str, Any]]:
+    """Variants (parameter dicts) drawn from space according to plan"""
+    names = sorted(space)
+    if not names:
+        raise SweepError("Nothing to sweep: no parameter has a range or allowed values")
+    count = variant_count(space, plan)
+    if count > settings.SWEEP_MAX_VARIANTS:
+        raise SweepError(f"Sweep has {count} variants, more than SWEEP_MAX_VARIANTS={settings.SWEEP_MAX_VARIANTS}")
+    
+    method = plan["method"]
+    if method == "grid":
+        axes = [_grid_axis(space[name], plan["levels"]) for name in names]
+        return [dict(zip(names, combo)) for combo in itertools.product(*axes)]
+    
+    rng = np.random.default_rng(plan.get("seed"))
+    n = plan["samples"]
+    if method == "random":
+        unit = rng.random((n, len(names)))
+    elif method == "lhs":
+        # One sample per stratum in every dimension, strata shuffled independently
+        strata = np.stack([rng.permutation(n) for _ in names], axis=1)
+        unit = (strata + rng.random((n, len(names)))) / n
+    else:
+        raise SweepError(f"Unknown sampling method: {method}")
+    
+    columns = {name: _scale(space[name], unit[:, i]) for i, name in enumerate(names)}
+    return [{name: columns[name][row] for name in names} for row in range(n)]
+
+
+# ===== Evaluation =====
+
+def template_params(values: dict) -> dict:
+    """Complete base-plate parameters, deriving missing ones like generate_script_db does"""
+    L = float(values.get("L", 120.0))
+    W = float(values.get("W", L * 0.45))
+    T = float(values.get("T", 5.0))
+    return {
+        "L": L,
+        "W": W,
+        "T": T,
+        "hole_d": float(values.get("hole_d", L * 0.08)),
+        "hole_count": int(round(float(values.get("hole_count", 8)))),
+        "ring_radius": float(values.get("ring_radius", min(L, W) * 0.35)),
+        "fillet_radius": float(values.get("fillet_radius", L * 0.02)),
+    }
+
+
+def _empty_metrics() -> dict:
+    return {column: None for column in METRIC_COLUMNS}
+
+
+def check_geometry(p: dict) -> Optional[str]:
+    """Why a base-plate variant can't be built, or None if it can"""
+    if min(p["L"], p["W"], p["T"]) <= 0:
+        return "L, W and T must be positive"
+    if p["hole_count"] < 0 or p["hole_d"] < 0 or p["ring_radius"] < 0 or p["fillet_radius"] < 0:
+        return "negative hole or fillet dimension"
+    r = p["hole_d"] / 2
+    if p["hole_count"] > 0 and r > 0:
+        if p["ring_radius"] + r > min(p["L"], p["W"]) / 2:
+            return "holes extend past the plate edge"
+        if p["hole_count"] > 1 and 2 * p["ring_radius"] * math.sin(math.pi / p["hole_count"]) <= 2 * r:
+            return "holes overlap"
+    if 2 * p["fillet_radius"] >= min(p["L"], p["W"], p["T"]):
+        return "fillet radius too large for the plate"
+    return None
+
+
+def evaluate_analytic(values: dict, density_g_cm3: float) -> dict:
+    """Closed-form metrics of a base-plate variant (fillets approximated as quarter-round edges)"""
+    p = template_params(values)
+    metrics = _empty_metrics()
+    metrics["run_time_s"] = 0.0
+    error = check_geometry(p)
+    if error:
+        metrics.update(success=False, error=error)
+        return metrics
+    
+    L, W, T = p["L"], p["W"], p["T"]
+    n = p["hole_count"] if p["hole_d"] > 0 else 0
+    r = p["hole_d"] / 2
+    f = p["fillet_radius"]
+    edge_length = 4 * (L + W + T)
+    volume = L * W * T - n * math.pi * r * r * T - (1 - math.pi / 4) * f * f * edge_length
+    area = 2 * (L * W + L * T + W * T) + n * (2 * math.pi * r * T - 2 * math.pi * r * r) - (2 - math.pi / 2) * f * edge_length
+    metrics.update(
+        success=True,
+        volume_mm3=volume,
+        surface_area_mm2=area,
+        bbox_x_mm=L,
+        bbox_y_mm=W,
+        bbox_z_mm=T,
+        mass_g=volume / 1000.0 * density_g_cm3,
+    )
+    return metrics
+
+
+def mesh_metrics(triangles: np.ndarray, density_g_cm3: float) -> dict:
+    """Metrics measured on an exported triangle mesh"""
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    area = 0.5 * np.linalg.norm(np.cross(b - a, c - a), axis=1).sum()
+    volume = abs(np.einsum("ij,ij->i", a, np.cross(b, c)).sum()) / 6.0
+    vertices = triangles.reshape(-1, 3)
+    extents = vertices.max(axis=0) - vertices.min(axis=0)
+    return {
+        "volume_mm3": float(volume),
+        "surface_area_mm2": float(area),
+        "bbox_x_mm": float(extents[0]),
+        "bbox_y_mm": float(extents[1]),
+        "bbox_z_mm": float(extents[2]),
+        "mass_g": float(volume) / 1000.0 * density_g_cm3,
+    }
+
+
+# ===== Columnar results =====
+
+def result_key(job_id: str, name: str) -> str:
+    """Storage key for sweep files (parts and the merged results)"""
+    return f"sweeps/{job_id}/{name}"
+
+
+def write_part(rows: list[dict], path) -> None:
+    """Write evaluated variants as one Parquet file"""
+    pa = _pyarrow()
+    pa.parquet.write_table(pa.Table.from_pylist(rows), str(path), compression="zstd")
+
+
+def merge_parts(parts: Iterable[bytes], path) -> int:
+    """Concatenate Parquet parts into one file (one row group per part); returns row count"""
+    pa = _pyarrow()
+    tables = [pa.parquet.read_table(pa.BufferReader(data)) for data in parts]
+    tables = [t for t in tables if t.num_rows]
+    if not tables:
+        pa.parquet.write_table(pa.table({"variant": pa.array([], pa.int64())}), str(path))
+        return 0
+    table = pa.concat_tables(tables, promote_options="default") if len(tables) > 1 else tables[0]
+    table = table.sort_by("variant")
+    pa.parquet.write_table(table, str(path), compression="zstd", row_group_size=64 * 1024)
+    return table.num_rows
+
+
+def load_results(data: bytes):
+    pa = _pyarrow()
+    return pa.parquet.read_table(pa.BufferReader(data))
+
+
+def summarize(table) -> dict:
+    """min/mean/max of each numeric metric over the valid variants"""
+    pa = _pyarrow()
+    pc = pa.compute
+    if not table.num_rows or "success" not in table.column_names:
+        return {}
+    valid = table.filter(pc.fill_null(table.column("success"), False))
+    summary = {}
+    for name in METRIC_COLUMNS:
+        if name in ("success", "error") or name not in valid.column_names or not valid.num_rows:
+            continue
+        column = valid.column(name)
+        if not pa.types.is_floating(column.type) and not pa.types.is_integer(column.type):
+            continue
+        bounds = pc.min_max(column)
+        summary[name] = {
+            "min": bounds["min"].as_py(),
+            "mean": pc.mean(column).as_py(),
+            "max": bounds["max"].as_py(),
+        }
+    return summary
+
+
+def _coerce(name: str, value: str, arrow_type):
+    pa = _pyarrow()
+    text = value.strip().strip("'\"")
+    if pa.types.is_boolean(arrow_type):
+        if text.lower() not in ("true", "false", "1", "0"):
+            raise SweepError(f"Expected true/false for {name}, got {value!r}")
+        return text.lower() in ("true", "1")
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+        try:
+            number = float(text)
+            return int(number) if pa.types.is_integer(arrow_type) else number
+        except (ValueError, OverflowError):
+            raise SweepError(f"Expected a number for {name}, got {value!r}") from None
+    return text
+
+
+def query_results(table, where: list[str] = (), columns: Optional[list[str]] = None,
+                  order_by: Optional[str] = None, limit: int = 100, offset: int = 0):
+    """
+    Filter/sort/project a results table.
+
+    where items look like "mass_g<50" or "success==true"; order_by is a
+    column name, prefixed with "-" for descending. Returns (matched, rows).
+    """
+    pa = _pyarrow()
+    pc = pa.compute
+    ops = {"==": pc.equal, "!=": pc.not_equal, "<": pc.less, "<=": pc.less_equal, ">": pc.greater, ">=": pc.greater_equal}
+    
+    for clause in where or ():
+        match = FILTER_RE.match(clause)
+        if not match:
+            raise SweepError(f"Bad filter {clause!r}; expected <column><op><value>")
+        name, op, value = match.groups()
+        if name not in table.column_names:
+            raise SweepError(f"Unknown column {name!r}")
+        column = table.column(name)
+        mask = ops[op](column, pa.scalar(_coerce(name, value, column.type), type=column.type))
+        table = table.filter(pc.fill_null(mask, False))
+    
+    if order_by:
+        name = order_by.lstrip("-")
+        if name not in table.column_names:
+            raise SweepError(f"Unknown column {name!r}")
+        table = table.sort_by([(name, "descending" if order_by.startswith("-") else "ascending")])
+    
+    if columns:
+        unknown = [c for c in columns if c not in table.column_names]
+        if unknown:
+            raise SweepError(f"Unknown columns: {', '.join(unknown)}")
+        table = table.select(columns)
+    
+    return table.num_rows, table.slice(offset, limit).to_pylist()
@@ -0,0 +1,26 @@
+"""
+Stored artifact index: one row per file the retention manager may evict
+"""
+
+from sqlalchemy import Column, String, BigInteger, Boolean, DateTime, Index, func
+from .base import BaseModel
+
+
+class StoredArtifact(BaseModel):
+    """Size and last access of an upload, script or Blender output (see app.core.retention)"""
+    
+    __tablename__ = "stored_artifacts"
+    __table_args__ = (
+        Index("ix_stored_artifacts_project_access", "project_id", "last_accessed_at"),
+        Index("ix_stored_artifacts_access", "last_accessed_at"),
+    )
+    
+    location = Column(String(1024), nullable=False, unique=True)  # storage_path / local path
+    project_id = Column(String(36), nullable=True)
+    kind = Column(String(20), nullable=False)  # upload, script, output, render, blend, sweep
+    size_bytes = Column(BigInteger, nullable=False, default=0)  # bytes on disk (compressed)
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    pinned = Column(Boolean, nullable=False, default=False)
+    
+    def __repr__(self):
+        return f"<StoredArtifact(id={self.id}, location='{self.location}', size={self.size_bytes})>"
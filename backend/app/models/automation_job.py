@@ -84,15 +84,41 @@ class AutomationJob(BaseModel):
             execution_time = self.completed_at - self.started_at
             self.execution_time_seconds = int(execution_time.total_seconds())
     
+    @property
+    def log_key(self) -> str:
+        """Key of this job's append-only log (app.core.job_logs)"""
+        return f"automation-{self.id}"
+    
     def add_log_entry(self, message: str):
-        """Add an entry to the execution log"""
-        timestamp = datetime.utcnow().isoformat()
-        log_entry = f"[{timestamp}] {message}\n"
+        """
+        Add an entry to the execution log.
+        
+        Entries go to the job's segmented log file, so appending doesn't
+        rewrite the log or the row. execution_log only holds entries added
+        before the job had an id, and logs written by older versions.
+        """
+        if self.id is None:
+            timestamp = datetime.utcnow().isoformat()
+            self.execution_log = (self.execution_log or "") + f"[{timestamp}] {message}\n"
+            return
+        
+        from app.core.job_logs import open_log
+        
+        log = open_log(self.log_key)
+        try:
+            log.line(message)
+        finally:
+            log.close(seal=False)
+    
+    def read_log(self) -> str:
+        """Full execution log text (execution_log column first, then the segmented log)"""
+        from app.core.job_logs import read_log
         
-        if self.execution_log:
-            self.execution_log += log_entry
-        else:
-            self.execution_log = log_entry
+        legacy = self.execution_log or ""
+        if self.id is None:
+            return legacy
+        data, _, _ = read_log(self.log_key)
+        return legacy + data.decode("utf-8", errors="replace")
     
     def get_duration(self):
         """Get job duration in seconds"""
@@ -0,0 +1,30 @@
+"""
+Archived job model: finished jobs moved out of the hot jobs/automation_jobs tables
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary, Index, UniqueConstraint
+from .base import BaseModel
+
+
+class ArchivedJob(BaseModel):
+    """One finished Job or AutomationJob; the full row is kept as compressed JSON (see app.core.job_archive)"""
+    
+    __tablename__ = "archived_jobs"
+    __table_args__ = (
+        UniqueConstraint("source", "job_id", name="uq_archived_jobs_source_job"),
+        Index("ix_archived_jobs_project_created", "source", "project_id", "job_created_at"),
+        Index("ix_archived_jobs_status_created", "source", "status", "job_created_at"),
+    )
+    
+    source = Column(String(20), nullable=False)  # jobs, automation
+    job_id = Column(String(36), nullable=False)  # Job.id, or AutomationJob.id as a string
+    project_id = Column(String(36), nullable=True)
+    user_id = Column(Integer, nullable=True)
+    job_type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)
+    job_created_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    payload = Column(LargeBinary, nullable=False)  # gzip-compressed JSON of every column
+    
+    def __repr__(self):
+        return f"<ArchivedJob(id={self.id}, job='{self.source}:{self.job_id}', status='{self.status}')>"
@@ -4,12 +4,16 @@
 
 from sqlalchemy import (
     Column, String, Text, Integer, Float, Boolean, BigInteger, 
-    ForeignKey, JSON, CheckConstraint
+    ForeignKey, JSON, CheckConstraint, Index, UniqueConstraint, event, inspect
 )
 from sqlalchemy.dialects.postgresql import ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, object_session, relationship, selectinload
+from sqlalchemy.orm.attributes import NO_VALUE, set_committed_value
 from .base import BaseModel
 
+# Models per IN (...) query when loading parameters in bulk
+PARAMETER_LOAD_BATCH = 500
+
 
 class Model(BaseModel):
     """3D Model metadata and information"""
@@ -64,24 +68,82 @@ class Model(BaseModel):
         
         return data
     
+    @staticmethod
+    def with_parameters():
+        """Query option loading model_parameters for a whole result set in one extra query"""
+        return selectinload(Model.model_parameters)
+    
+    @classmethod
+    def load_parameters(cls, session, models):
+        """Populate model_parameters of already-loaded models (one query per 500 models)"""
+        pending = [m for m in models if "model_parameters" in inspect(m).unloaded]
+        for start in range(0, len(pending), PARAMETER_LOAD_BATCH):
+            batch = pending[start:start + PARAMETER_LOAD_BATCH]
+            by_model = {m.id: [] for m in batch}
+            params = (
+                session.query(ModelParameter)
+                .filter(ModelParameter.model_id.in_(list(by_model)))
+                .order_by(ModelParameter.model_id, ModelParameter.id)
+                .all()
+            )
+            for param in params:
+                by_model[param.model_id].append(param)
+            for m in batch:
+                # Loaded state, not a change: nothing is flushed
+                set_committed_value(m, "model_parameters", by_model[m.id])
+    
+    @classmethod
+    def bulk_to_dict(cls, session, models, include_parameters=True):
+        """to_dict for many models without a lazy load per model"""
+        models = list(models)
+        if include_parameters:
+            cls.load_parameters(session, models)
+        return [m.to_dict(include_parameters=include_parameters) for m in models]
+    
+    @property
+    def parameter_index(self):
+        """{parameter_name: ModelParameter}, rebuilt only when model_parameters changes"""
+        params = self.model_parameters
+        cached = self.__dict__.get("_parameter_index")
+        if cached is None or cached[0] is not params:
+            cached = (params, {p.parameter_name: p for p in params})
+            self.__dict__["_parameter_index"] = cached
+        return cached[1]
+    
     def get_parameter_by_name(self, parameter_name: str):
         """Get a specific parameter by name"""
-        for param in self.model_parameters:
-            if param.parameter_name == parameter_name:
-                return param
-        return None
+        return self.parameter_index.get(parameter_name)
+    
+    def validate_parameters(self, values=None):
+        """
+        Validate parameters in one pass with ModelParameter.validate_value.
+        
+        values ({name: value}) overrides the stored values; names that are
+        not parameters of this model are reported as unknown.
+        Returns {name: (is_valid, message)}.
+        """
+        index = self.parameter_index
+        values = values or {}
+        results = {
+            name: param.validate_value(values.get(name))
+            for name, param in index.items()
+        }
+        for name in values:
+            if name not in index:
+                results[name] = (False, f"Unknown parameter '{name}'")
+        return results
     
     def add_tag(self, tag: str):
         """Add a tag to the model"""
-        if self.tags is None:
-            self.tags = []
-        if tag not in self.tags:
-            self.tags.append(tag)
+        tags = list(self.tags or [])
+        if tag not in tags:
+            # Reassign so the JSON change is flushed (and model_tags resynced)
+            self.tags = tags + [tag]
     
     def remove_tag(self, tag: str):
         """Remove a tag from the model"""
         if self.tags and tag in self.tags:
-            self.tags.remove(tag)
+            self.tags = [t for t in self.tags if t != tag]
     
     def get_file_extension(self):
         """Get file extension from file_path"""
@@ -181,4 +243,117 @@ class ModelParameter(BaseModel):
         """Convert to dictionary with computed value"""
         data = super().to_dict()
         data['value'] = self.get_value()
-        return data
\ No newline at end of file
+        return data
+
+
+class ModelTag(BaseModel):
+    """Normalized (model, tag) rows mirroring Model.tags, so tag filters and facets use an index"""
+    
+    __tablename__ = "model_tags"
+    __table_args__ = (
+        UniqueConstraint("model_id", "tag", name="uq_model_tags_model_tag"),
+        Index("ix_model_tags_tag_model", "tag", "model_id"),
+    )
+    
+    model_id = Column(Integer, ForeignKey("models.id", ondelete="CASCADE"), nullable=False)
+    tag = Column(String(100), nullable=False)
+    
+    def __repr__(self):
+        return f"<ModelTag(model_id={self.model_id}, tag='{self.tag}')>"
+
+
+class ModelSearchTerm(BaseModel):
+    """Inverted index for model search: one row per (term, model) with a field-weighted score"""
+    
+    __tablename__ = "model_search_terms"
+    __table_args__ = (
+        UniqueConstraint("term", "model_id", name="uq_model_search_terms_term_model"),
+        Index("ix_model_search_terms_model", "model_id"),
+    )
+    
+    model_id = Column(Integer, ForeignKey("models.id", ondelete="CASCADE"), nullable=False)
+    term = Column(String(64), nullable=False)
+    weight = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<ModelSearchTerm(term='{self.term}', model_id={self.model_id}, weight={self.weight})>"
+
+
+@event.listens_for(Model, "after_insert")
+@event.listens_for(Model, "after_update")
+def _reindex_model(mapper, connection, target):
+    """Keep model_tags / model_search_terms in step with every flushed Model"""
+    from app.core.model_search import INDEXED_FIELDS, index_model
+    
+    state = inspect(target)
+    # Updates that leave every indexed field alone (command history, timestamps) keep their rows
+    if state.pending or any(getattr(state.attrs, field).history.has_changes() for field in INDEXED_FIELDS):
+        index_model(connection, target)
+    
+    # New mesh file: recompute the shape descriptor once the row is committed
+    if target.file_path and state.attrs.file_path.history.has_changes():
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("shape_descriptor_pending", set()).add(target.id)
+    
+    # Command history feeds this process's autocomplete index once committed
+    if state.attrs.mcp_command_history.history.has_changes():
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("command_history_pending", {})[target.id] = target.mcp_command_history
+
+
+@event.listens_for(Model, "after_delete")
+def _unindex_commands(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.mcp_command_history:
+        session.info.setdefault("command_history_pending", {})[target.id] = None
+
+
+@event.listens_for(Model.model_parameters, "append")
+@event.listens_for(Model.model_parameters, "remove")
+def _drop_parameter_index(target, value, initiator):
+    target.__dict__.pop("_parameter_index", None)
+
+
+@event.listens_for(ModelParameter.parameter_name, "set")
+def _rename_parameter(target, value, oldvalue, initiator):
+    state = inspect(target)
+    if oldvalue is None or (oldvalue is NO_VALUE and state.key is None):
+        # First assignment of a new parameter: not in any index yet (append handles that)
+        return
+    # Only a loaded owner can hold a cached index; one that isn't loaded builds it fresh
+    model = target.__dict__.get("model")
+    if model is None and state.session is not None:
+        model = state.session.identity_map.get(inspect(Model).identity_key_from_primary_key((target.model_id,)))
+    if model is not None:
+        model.__dict__.pop("_parameter_index", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_shape_descriptors(session):
+    pending = session.info.pop("shape_descriptor_pending", None)
+    if pending:
+        from app.core.shape_descriptors import enqueue_descriptor
+        
+        for model_id in pending:
+            enqueue_descriptor("model", model_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_shape_descriptors(session):
+    session.info.pop("shape_descriptor_pending", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_command_history(session):
+    pending = session.info.pop("command_history_pending", None)
+    if pending:
+        from app.core.command_index import apply_committed
+        
+        apply_committed(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_command_history(session):
+    session.info.pop("command_history_pending", None)
@@ -0,0 +1,23 @@
+"""
+Shape descriptor model: one geometric fingerprint per model or model3d asset
+"""
+
+from sqlalchemy import Column, String, Integer, LargeBinary, UniqueConstraint
+from .base import BaseModel
+
+
+class ShapeDescriptor(BaseModel):
+    """Float32 shape descriptor (see app.core.shape_descriptors) for similarity search"""
+    
+    __tablename__ = "shape_descriptors"
+    __table_args__ = (
+        UniqueConstraint("subject_type", "subject_id", name="uq_shape_descriptors_subject"),
+    )
+    
+    subject_type = Column(String(10), nullable=False)  # model, asset
+    subject_id = Column(String(36), nullable=False)     # Model.id or Asset.id
+    version = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)        # float32 little-endian
+    
+    def __repr__(self):
+        return f"<ShapeDescriptor(id={self.id}, subject='{self.subject_type}:{self.subject_id}')>"
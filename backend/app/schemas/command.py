@@ -0,0 +1,16 @@
+"""Command autocomplete schemas"""
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class CommandSuggestion(BaseModel):
+    """Command from MCP command history"""
+    command: str
+    count: int  # occurrences across model histories
+    tool: Optional[str] = None
+
+
+class CommandSuggestionsOut(BaseModel):
+    """Suggestions for a prefix, most frequent first"""
+    prefix: str
+    suggestions: List[CommandSuggestion]
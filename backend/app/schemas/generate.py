@@ -0,0 +1,38 @@
+"""Prompt-to-model generation schemas"""
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.schemas.job import JobOut
+
+
+class TemplateParameters(BaseModel):
+    """Base-plate template parameters (mm), named like generate_script job params"""
+    length: Optional[float] = Field(default=None, gt=0, le=10000)
+    width: Optional[float] = Field(default=None, gt=0, le=10000)
+    thickness: Optional[float] = Field(default=None, gt=0, le=1000)
+    hole_diameter: Optional[float] = Field(default=None, gt=0, le=1000)
+    hole_count: Optional[int] = Field(default=None, ge=0, le=4096)
+    hole_ring_radius: Optional[float] = Field(default=None, ge=0, le=10000)
+    fillet_radius: Optional[float] = Field(default=None, ge=0, le=1000)
+
+
+class GenerateIn(BaseModel):
+    """Generate a model from a text prompt"""
+    prompt: str = Field(..., min_length=1, max_length=2000)
+    project_id: Optional[str] = Field(default=None, description="Add to this project instead of creating one")
+    project_name: Optional[str] = Field(default=None, max_length=120)
+    parameters: TemplateParameters = Field(
+        default_factory=TemplateParameters,
+        description="Override interpreted values",
+    )
+    formats: Optional[List[str]] = None
+    run_blender: bool = Field(default=True, description="Run Blender once the script is generated")
+
+
+class GenerateOut(BaseModel):
+    """Interpreted parameters and the generate_script job"""
+    project_id: str
+    prompt_key: str
+    interpreter: str
+    cached: bool
+    parameters: TemplateParameters
+    job: JobOut
@@ -1,11 +1,11 @@
 """Job schemas"""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Literal, Optional, Dict, Any
 from datetime import datetime
 
 
-JobType = Literal["extract", "generate_script", "run_blender"]
-JobStatus = Literal["queued", "running", "succeeded", "failed"]
+JobType = Literal["extract", "generate_script", "run_blender", "export", "measure", "sweep"]
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
 
 
 class JobCreate(BaseModel):
@@ -13,6 +13,11 @@ class JobCreate(BaseModel):
     project_id: str
     job_type: JobType
     params: Dict[str, Any] = {}
+    idempotency_key: Optional[str] = Field(
+        default=None,
+        max_length=255,
+        description="Client-chosen key; retries with the same key return the original job",
+    )
 
 
 class JobOut(BaseModel):
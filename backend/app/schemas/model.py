@@ -0,0 +1,80 @@
+"""Model library schemas"""
+from pydantic import BaseModel
+from typing import Any, Literal, Optional
+
+
+class ModelSummaryOut(BaseModel):
+    """Model as listed in search results"""
+    id: int
+    name: str
+    description: Optional[str] = None
+    category: Optional[str] = None
+    style: Optional[str] = None
+    complexity_level: Optional[int] = None
+    tags: Optional[list[str]] = None
+    thumbnail_path: Optional[str] = None
+    file_format: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ModelParameterOut(BaseModel):
+    """Parameter with its typed value and constraints"""
+    id: int
+    parameter_name: str
+    parameter_type: Optional[str] = None
+    value: Any = None
+    unit: Optional[str] = None
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    allowed_values: Optional[list[Any]] = None
+    is_required: bool = False
+    display_order: Optional[int] = None
+    description: Optional[str] = None
+
+
+class ModelOut(ModelSummaryOut):
+    """Model with (optionally) its parameters and their validation problems"""
+    parameters: Optional[list[ModelParameterOut]] = None
+    invalid_parameters: Optional[dict[str, str]] = None
+
+
+class ModelListOut(BaseModel):
+    """Page of models ordered by id"""
+    items: list[ModelOut]
+    next_after_id: Optional[int] = None
+
+
+class ModelSearchHit(BaseModel):
+    """Search result with its rank score"""
+    model: ModelSummaryOut
+    score: int
+
+
+class FacetCount(BaseModel):
+    """Number of matching models with a facet value"""
+    value: str
+    count: int
+
+
+class ModelSearchOut(BaseModel):
+    """Search response page"""
+    items: list[ModelSearchHit]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None  # first page only
+    facets: Optional[dict[str, list[FacetCount]]] = None  # first page only
+
+
+class SimilarShape(BaseModel):
+    """A model or asset close to the query shape"""
+    subject_type: Literal["model", "asset"]
+    subject_id: str
+    distance: float
+
+
+class SimilarShapesOut(BaseModel):
+    """Nearest shapes to the query subject, closest first"""
+    subject_type: Literal["model", "asset"]
+    subject_id: str
+    results: list[SimilarShape]
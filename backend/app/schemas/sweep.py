@@ -0,0 +1,58 @@
+"""Design-space sweep schemas"""
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, List, Literal, Optional
+
+
+class SweepParameter(BaseModel):
+    """Range (min/max) or explicit values for one swept parameter"""
+    min: Optional[float] = None
+    max: Optional[float] = None
+    values: Optional[List[Any]] = None
+    type: Literal["float", "int"] = "float"
+    
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.values:
+            return self
+        if self.min is None or self.max is None:
+            raise ValueError("give either values or both min and max")
+        if self.min > self.max:
+            raise ValueError("min must not exceed max")
+        return self
+
+
+class SweepPlan(BaseModel):
+    """How variants are drawn from the parameter space"""
+    method: Literal["grid", "random", "lhs"] = "lhs"
+    samples: int = Field(default=100, ge=1, description="Variants for random/lhs")
+    levels: int = Field(default=5, ge=2, le=100, description="Grid points per continuous parameter")
+    seed: Optional[int] = None
+
+
+class SweepSpec(BaseModel):
+    """params of a 'sweep' job"""
+    model_id: Optional[int] = Field(
+        default=None,
+        description="Take parameter ranges from this model's ModelParameter constraints",
+    )
+    parameters: Dict[str, SweepParameter] = {}
+    fixed: Dict[str, Any] = {}
+    plan: SweepPlan = SweepPlan()
+    evaluator: Literal["analytic", "blender"] = "analytic"
+    density_g_cm3: float = Field(default=2.70, gt=0, description="Material density for mass estimates")
+    chunk_size: Optional[int] = Field(default=None, ge=1, le=10000)
+    
+    @model_validator(mode="after")
+    def check_space(self):
+        if self.model_id is None and not self.parameters:
+            raise ValueError("give model_id or at least one parameter to sweep")
+        return self
+
+
+class SweepResultsOut(BaseModel):
+    """Page of sweep result rows"""
+    job_id: str
+    total_variants: int
+    matched: int
+    columns: List[str]
+    rows: List[Dict[str, Any]]
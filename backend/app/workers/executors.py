@@ -0,0 +1,334 @@
+"""
+CAD executors and cost-based routing.
+
+An executor carries out one CAD operation of a job: prepare() stages the
+inputs in the job's workdir, run() executes the operation, collect()
+returns the output files that exist, and execute() wraps the three and
+reports what the run used (wall and CPU seconds, peak RSS). Operations:
+
+- build: run a generated build script, exporting task.formats
+- export: write task.formats from geometry a run already stored
+- measure: volume, surface area, bounding box and mass of a stored mesh
+
+Executors (enabled with CAD_EXECUTORS):
+
+- blender: a headless Blender process (BLENDER_EXEC_MODE=server_headless);
+  builds, and exports any format from the stored .blend
+- local: NumPy inside the worker; exports STL/OBJ from an STL/OBJ the run
+  already produced and measures meshes. It launches no CAD tool, so it
+  also works where Blender isn't installed (tests, development)
+
+route() picks, among the enabled executors able to do a task, the one with
+the lowest mean wall time recorded for that operation (the last
+COST_SAMPLES runs, kept in Redis; default_cost_seconds until there are
+some). A task naming a tool (Job params.tool, AutomationJob.target_tool)
+only considers that executor.
+"""
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+import statistics
+import sys
+import time
+import numpy as np
+from app.core.compression import stored_encoding
+from app.core.config import settings
+from app.core.queue import get_redis
+from app.core.shape_descriptors import STL_FACET_DTYPE, load_triangles
+from app.core.storage import read_artifact, storage_for
+from app.workers.process import run_cancellable
+
+try:
+    import resource
+except ImportError:  # Windows: no rusage, wall time only
+    resource = None
+
+OPERATIONS = ("build", "export", "measure")
+COST_SAMPLES = 50
+# Stored formats the local executor reads, most preferred first
+MESH_SOURCES = ("stl", "obj")
+
+
+class NoExecutorAvailable(RuntimeError):
+    """No enabled executor can carry out the task"""
+
+
+@dataclass
+class CadTask:
+    """One operation of one job; prepare() fills inputs and temp_files"""
+    job_id: str
+    operation: str  # one of OPERATIONS
+    workdir: Path
+    formats: list[str] = field(default_factory=list)
+    outputs: dict[str, Path] = field(default_factory=dict)  # format -> file to write
+    script_path: Optional[Path] = None  # build
+    script_args: list[str] = field(default_factory=list)
+    sources: dict[str, str] = field(default_factory=dict)  # stored geometry: "blend"/format -> location
+    params: dict = field(default_factory=dict)  # operation options (measure: density_g_cm3)
+    timeout: float = 0  # 0 = BLENDER_TIMEOUT_SECONDS
+    on_output: Optional[Callable[[str], None]] = None
+    inputs: dict[str, Path] = field(default_factory=dict)
+    temp_files: list[Path] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class ResourceUsage:
+    wall_seconds: float
+    cpu_seconds: Optional[float] = None
+    max_rss_mb: Optional[float] = None  # peak of the process(es) the executor ran in
+
+
+@dataclass
+class ExecutionResult:
+    executor: str
+    returncode: int
+    outputs: dict[str, Path]
+    usage: ResourceUsage
+    stdout: Optional[str] = None
+    stderr: Optional[str] = None
+    metrics: Optional[dict] = None  # measure
+    
+    def usage_dict(self) -> dict:
+        return {"executor": self.executor, **asdict(self.usage)}
+
+
+def _rusage(scope: str):
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN if scope == "children" else resource.RUSAGE_SELF)
+
+
+def _usage(scope: str, before, started: float) -> ResourceUsage:
+    wall = round(time.perf_counter() - started, 3)
+    after = _rusage(scope)
+    if before is None or after is None:
+        return ResourceUsage(wall)
+    cpu = (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = after.ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else after.ru_maxrss / 1024
+    return ResourceUsage(wall, round(cpu, 3), round(rss, 1))
+
+
+def _cost_key(executor: str, operation: str) -> str:
+    return f"executor:runtimes:{executor}:{operation}"
+
+
+def record_cost(executor: str, operation: str, seconds: float) -> None:
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.lpush(_cost_key(executor, operation), round(seconds, 3))
+    pipe.ltrim(_cost_key(executor, operation), 0, COST_SAMPLES - 1)
+    pipe.execute()
+
+
+def _materialize(task: CadTask, location: str, suffix: str) -> Path:
+    """Local plain file of a stored artifact (copied into the workdir when remote or compressed)"""
+    path = storage_for(location).local_path(location)
+    if path is None or stored_encoding(location) is not None:
+        path = task.workdir / f"source_{task.job_id}{suffix}"
+        path.write_bytes(read_artifact(location))
+        task.temp_files.append(path)
+    return Path(path)
+
+
+class CadExecutor:
+    """Base executor; subclasses set name, operations and default_cost_seconds and implement run()"""
+    name = ""
+    operations: frozenset = frozenset()
+    default_cost_seconds = 1.0  # assumed until runs are recorded
+    usage_scope = "self"  # "children": the work happens in subprocesses
+    
+    def available(self) -> bool:
+        return True
+    
+    def supports(self, task: CadTask) -> bool:
+        return task.operation in self.operations
+    
+    def describe(self, task: CadTask) -> str:
+        return f"{self.name} {task.operation}"
+    
+    def prepare(self, task: CadTask) -> None:
+        task.workdir.mkdir(parents=True, exist_ok=True)
+    
+    def run(self, task: CadTask) -> tuple[int, Optional[str], Optional[str], Optional[dict]]:
+        """(returncode, stdout, stderr, metrics); may raise JobCancelled or subprocess.TimeoutExpired"""
+        raise NotImplementedError
+    
+    def collect(self, task: CadTask) -> dict[str, Path]:
+        return {fmt: path for fmt, path in task.outputs.items() if path.exists()}
+    
+    def cleanup(self, task: CadTask) -> None:
+        for path in task.temp_files:
+            path.unlink(missing_ok=True)
+        task.temp_files.clear()
+    
+    def execute(self, task: CadTask) -> ExecutionResult:
+        """prepare, run and collect; the wall time of a completed run becomes a cost sample"""
+        started = time.perf_counter()
+        before = _rusage(self.usage_scope)
+        try:
+            self.prepare(task)
+            returncode, stdout, stderr, metrics = self.run(task)
+            outputs = self.collect(task)
+        finally:
+            self.cleanup(task)
+        usage = _usage(self.usage_scope, before, started)
+        if returncode == 0:
+            # Failed runs often stop early and would make an executor look cheap
+            record_cost(self.name, task.operation, usage.wall_seconds)
+        return ExecutionResult(self.name, returncode, outputs, usage, stdout, stderr, metrics)
+
+
+class BlenderExecutor(CadExecutor):
+    name = "blender"
+    operations = frozenset({"build", "export"})
+    default_cost_seconds = 10.0
+    usage_scope = "children"
+    
+    def available(self) -> bool:
+        return settings.BLENDER_EXEC_MODE == "server_headless"
+    
+    def supports(self, task: CadTask) -> bool:
+        if task.operation == "build":
+            return task.script_path is not None
+        return task.operation == "export" and "blend" in task.sources
+    
+    def command(self, task: CadTask) -> list[str]:
+        if task.operation == "build":
+            return [settings.BLENDER_PATH, "-b", "-P", str(task.script_path), "--", *task.script_args]
+        return [settings.BLENDER_PATH, "-b", str(task.inputs["blend"]), "-P", str(task.inputs["script"])]
+    
+    def describe(self, task: CadTask) -> str:
+        if task.operation == "build":
+            return " ".join(self.command(task))
+        return f"{settings.BLENDER_PATH} -b <stored .blend> -P export_{task.job_id}.py"
+    
+    def prepare(self, task: CadTask) -> None:
+        super().prepare(task)
+        if task.operation != "export":
+            return
+        # Imported here: the script templates live with the tasks that use them
+        from app.workers.tasks import build_export_script
+        
+        task.inputs["blend"] = _materialize(task, task.sources["blend"], ".blend")
+        script = task.workdir / f"export_{task.job_id}.py"
+        script.write_text(
+            build_export_script({fmt: str(path) for fmt, path in task.outputs.items()}), encoding="utf-8"
+        )
+        task.inputs["script"] = script
+        task.temp_files.append(script)
+    
+    def run(self, task: CadTask):
+        proc = run_cancellable(
+            self.command(task),
+            cwd=str(task.workdir),
+            timeout=task.timeout or settings.BLENDER_TIMEOUT_SECONDS,
+            job_id=task.job_id,
+            on_output=task.on_output,
+        )
+        return proc.returncode, proc.stdout, proc.stderr, None
+
+
+class LocalExecutor(CadExecutor):
+    """Mesh-only operations in the worker process: no CAD tool is started"""
+    name = "local"
+    operations = frozenset({"export", "measure"})
+    default_cost_seconds = 0.5
+    formats = frozenset(MESH_SOURCES)
+    
+    def _source(self, task: CadTask) -> Optional[str]:
+        return next((fmt for fmt in MESH_SOURCES if fmt in task.sources), None)
+    
+    def supports(self, task: CadTask) -> bool:
+        if task.operation not in self.operations or self._source(task) is None:
+            return False
+        return task.operation == "measure" or set(task.formats) <= self.formats
+    
+    def describe(self, task: CadTask) -> str:
+        target = ",".join(task.formats) if task.operation == "export" else "metrics"
+        return f"local {task.operation} {self._source(task)} -> {target}"
+    
+    def prepare(self, task: CadTask) -> None:
+        super().prepare(task)
+        fmt = self._source(task)
+        task.inputs["mesh"] = _materialize(task, task.sources[fmt], f".{fmt}")
+    
+    def run(self, task: CadTask):
+        mesh = task.inputs["mesh"]
+        triangles = load_triangles(mesh.read_bytes(), mesh.name)
+        if len(triangles) == 0:
+            return 1, None, f"No triangles in {mesh.name}", None
+        if task.operation == "measure":
+            # Imported here: the sweep module is only needed for measurements
+            from app.core.sweep import mesh_metrics
+            
+            metrics = mesh_metrics(triangles, float(task.params.get("density_g_cm3", 2.70)))
+            return 0, None, None, {"triangles": int(len(triangles)), **metrics}
+        for fmt in task.formats:
+            if fmt == "stl":
+                write_stl(triangles, task.outputs[fmt])
+            else:
+                write_obj(triangles, task.outputs[fmt])
+            if task.on_output is not None:
+                task.on_output(f"Wrote {fmt.upper()} to {task.outputs[fmt]}\n")
+        return 0, None, None, None
+
+
+def write_stl(triangles: np.ndarray, path: Path) -> None:
+    """Binary STL of an (N, 3, 3) triangle array"""
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    normals = np.cross(b - a, c - a)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    facets = np.zeros(len(triangles), dtype=STL_FACET_DTYPE)
+    facets["normal"] = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    facets["vertices"] = triangles
+    with open(path, "wb") as f:
+        f.write(b"Exported by MCP 3D Automation".ljust(80, b" "))
+        f.write(np.uint32(len(triangles)).tobytes())
+        f.write(facets.tobytes())
+
+
+def write_obj(triangles: np.ndarray, path: Path) -> None:
+    """OBJ of an (N, 3, 3) triangle array with shared vertices"""
+    vertices, index = np.unique(triangles.reshape(-1, 3), axis=0, return_inverse=True)
+    faces = index.reshape(-1, 3) + 1
+    with open(path, "w", encoding="utf-8") as f:
+        np.savetxt(f, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(f, faces, fmt="f %d %d %d")
+
+
+EXECUTORS: dict[str, CadExecutor] = {e.name: e for e in (BlenderExecutor(), LocalExecutor())}
+
+
+def enabled_executors() -> list[CadExecutor]:
+    names = [n.strip().lower() for n in settings.CAD_EXECUTORS.split(",") if n.strip()]
+    return [EXECUTORS[n] for n in names if n in EXECUTORS and EXECUTORS[n].available()]
+
+
+def mean_cost(executor: CadExecutor, operation: str) -> float:
+    """Mean recorded wall seconds of the operation on this executor"""
+    samples = get_redis().lrange(_cost_key(executor.name, operation), 0, -1)
+    if not samples:
+        return executor.default_cost_seconds
+    return statistics.fmean(float(s) for s in samples)
+
+
+def route(task: CadTask, tool: Optional[str] = None) -> CadExecutor:
+    """
+    Cheapest enabled executor able to carry out the task.
+
+    Raises:
+        NoExecutorAvailable: none is enabled and capable (or the named tool isn't)
+    """
+    candidates = [e for e in enabled_executors() if e.supports(task)]
+    if tool:
+        candidates = [e for e in candidates if e.name == tool.lower()]
+    if not candidates:
+        what = f"'{tool}' executor" if tool else "executor"
+        formats = f" ({', '.join(task.formats)})" if task.formats else ""
+        raise NoExecutorAvailable(
+            f"No enabled {what} can {task.operation}{formats} "
+            f"(CAD_EXECUTORS={settings.CAD_EXECUTORS}, BLENDER_EXEC_MODE={settings.BLENDER_EXEC_MODE})"
+        )
+    if len(candidates) == 1:
+        return candidates[0]
+    return min(candidates, key=lambda e: mean_cost(e, task.operation))
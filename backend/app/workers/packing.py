@@ -0,0 +1,184 @@
+"""
+Run several generated Blender scripts in one Blender process.
+
+Blender startup costs more than modeling a typical base plate, so
+run_blender_db packs other queued run_blender jobs into its own
+invocation (BLENDER_PACK_SIZE). A runner script resets to an empty
+scene before each job's script, runs it from that job's scratch dir with its
+own command-line arguments and records a per-job outcome, so a failing
+script only fails its own job. Every packed job's cancel flag is polled:
+a cancelled job still waiting is skipped, and the process is killed only
+when the script running is the cancelled one.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+import json
+import shutil
+import subprocess
+import threading
+from app.core.cancellation import is_cancel_requested
+from app.workers.process import run_cancellable
+
+MARKER = "@@mcp-pack"
+
+RUNNER = '''"""MCP 3D Automation - packed run of several generated scripts"""
+import json
+import os
+import sys
+import time
+import traceback
+
+import bpy
+
+manifest_path = sys.argv[sys.argv.index("--") + 1]
+with open(manifest_path, encoding="utf-8") as f:
+    manifest = json.load(f)
+marker = manifest["marker"]
+blender = sys.argv[0]
+# Python errors go to stdout so they stay in order with their job's output
+sys.stderr = sys.stdout
+
+for item in manifest["jobs"]:
+    if os.path.exists(manifest["skip"] + item["job_id"]):
+        # Cancelled while waiting for its turn
+        continue
+    print(f"{marker} begin {item['job_id']}", flush=True)
+    started = time.perf_counter()
+    error = None
+    try:
+        # Fresh empty scene: nothing from the previous job leaks into this one
+        bpy.ops.wm.read_homefile(use_empty=True)
+        os.chdir(item["cwd"])
+        sys.argv = [blender, "-b", "-P", item["script"], "--"] + item["args"]
+        with open(item["script"], encoding="utf-8") as f:
+            code = compile(f.read(), item["script"], "exec")
+        exec(code, {"__name__": "__main__", "__file__": item["script"]})
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            error = f"Script exited with {e.code}"
+    except Exception:
+        error = traceback.format_exc()
+        print(error, flush=True)
+    outcome = {"job_id": item["job_id"], "ok": error is None, "error": error, "seconds": time.perf_counter() - started}
+    with open(manifest["status"], "a", encoding="utf-8") as f:
+        f.write(json.dumps(outcome) + "\\n")
+    print(f"{marker} end {item['job_id']}", flush=True)
+'''
+
+
+@dataclass
+class PackItem:
+    job_id: str
+    script: Path
+    cwd: Path
+    args: list[str]
+    on_output: Callable[[str], None]
+    output: list[str] = field(default_factory=list)  # this job's stdout/stderr lines
+
+
+@dataclass(frozen=True)
+class PackOutcome:
+    job_id: str
+    ok: bool
+    error: Optional[str]
+    seconds: float
+
+
+class BlenderPack:
+    """One Blender invocation running several jobs' scripts in order"""
+    
+    def __init__(self, items: list[PackItem], pack_dir: Path):
+        self.items = items
+        self.pack_dir = pack_dir
+        self.started: list[str] = []  # job ids whose script began, in order
+        self.cancelled: set[str] = set()  # job ids seen cancelled during the run
+        self.returncode: Optional[int] = None
+        self._by_id = {item.job_id: item for item in items}
+        self._current = items[0]  # Blender's start-up output goes to the first job
+        self._running: Optional[str] = None  # job id between its begin and end markers
+        self._lock = threading.Lock()
+    
+    @property
+    def status_path(self) -> Path:
+        return self.pack_dir / "status.jsonl"
+    
+    def _route(self, line: str) -> None:
+        """Send an output line to the job whose script is running"""
+        with self._lock:
+            if line.startswith(MARKER):
+                parts = line.split()
+                if len(parts) == 3 and parts[1] == "begin" and parts[2] in self._by_id:
+                    self._current = self._by_id[parts[2]]
+                    self._running = parts[2]
+                    self.started.append(parts[2])
+                elif len(parts) == 3 and parts[1] == "end":
+                    self._running = None
+                return
+            self._current.output.append(line)
+            self._current.on_output(line)
+    
+    def _skip_path(self, job_id: str) -> Path:
+        return self.pack_dir / f"skip-{job_id}"
+    
+    def _poll_cancels(self) -> bool:
+        """Mark newly cancelled jobs to be skipped; True if the script running now is one of them"""
+        for item in self.items:
+            if item.job_id not in self.cancelled and is_cancel_requested(item.job_id):
+                self.cancelled.add(item.job_id)
+                self._skip_path(item.job_id).touch()
+        with self._lock:
+            return self._running in self.cancelled
+    
+    def run(self, blender: str, timeout: float) -> subprocess.CompletedProcess:
+        """
+        Run every item's script, skipping jobs cancelled before their turn.
+
+        Cancelling the job whose script is running kills the process.
+        Raises JobCancelled / subprocess.TimeoutExpired like run_cancellable;
+        outcomes() still reports the scripts that finished before that.
+        """
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        self.status_path.unlink(missing_ok=True)
+        runner = self.pack_dir / "runner.py"
+        runner.write_text(RUNNER, encoding="utf-8")
+        manifest = self.pack_dir / "manifest.json"
+        manifest.write_text(json.dumps({
+            "marker": MARKER,
+            "status": str(self.status_path.resolve()),
+            "skip": str(self._skip_path("").resolve()),
+            "jobs": [
+                {"job_id": item.job_id, "script": str(item.script.resolve()), "cwd": str(item.cwd.resolve()), "args": item.args}
+                for item in self.items
+            ],
+        }), encoding="utf-8")
+        
+        proc = run_cancellable(
+            [blender, "-b", "-P", str(runner), "--", str(manifest)],
+            cwd=str(self.pack_dir),
+            timeout=timeout,
+            job_id=self.items[0].job_id,
+            on_output=self._route,
+            cancelled=self._poll_cancels,
+        )
+        self.returncode = proc.returncode
+        return proc
+    
+    def outcomes(self) -> dict[str, PackOutcome]:
+        """Outcomes recorded so far, by job id"""
+        outcomes = {}
+        try:
+            lines = self.status_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return outcomes
+        for line in lines:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                # Killed while writing the last line
+                continue
+            outcomes[data["job_id"]] = PackOutcome(data["job_id"], data["ok"], data["error"], data["seconds"])
+        return outcomes
+    
+    def cleanup(self) -> None:
+        shutil.rmtree(self.pack_dir, ignore_errors=True)
@@ -0,0 +1,166 @@
+"""Cancellable subprocess execution for worker tasks (Blender runs) and their scratch directories"""
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+from app.core.cancellation import JobCancelled, is_cancel_requested
+from app.core.config import settings
+
+# How often a running subprocess checks for cancellation
+CANCEL_POLL_SECONDS = 0.5
+# Grace period between SIGTERM and SIGKILL
+TERMINATE_GRACE_SECONDS = 5
+
+
+def _popen_kwargs() -> dict:
+    """Start the child in its own process group so the whole tree can be killed"""
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def terminate_process_group(proc: subprocess.Popen) -> None:
+    """Terminate proc and every process it spawned, escalating to SIGKILL"""
+    if proc.poll() is not None:
+        return
+    
+    if sys.platform == "win32":
+        proc.kill()
+        proc.wait()
+        return
+    
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=TERMINATE_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+
+def _pump(stream, chunks: list, on_output: Callable[[str], None]) -> None:
+    for line in iter(stream.readline, ""):
+        chunks.append(line)
+        on_output(line)
+    stream.close()
+
+
+def run_cancellable(
+    cmd: list[str], cwd: str, timeout: float, job_id: str,
+    on_output: Optional[Callable[[str], None]] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> subprocess.CompletedProcess:
+    """
+    Run cmd like subprocess.run(capture_output=True, text=True) but abort
+    as soon as job_id is cancelled.
+    
+    on_output, if given, receives stdout/stderr lines as they are produced
+    (from reader threads), e.g. to append them to the job log. cancelled,
+    if given, replaces the check of job_id's cancel flag (a process shared
+    by several jobs).
+
+    Raises:
+        JobCancelled: the job was cancelled; the process group has been killed
+        subprocess.TimeoutExpired: timeout elapsed; the process group has been killed
+    """
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        **_popen_kwargs(),
+    )
+    
+    pumps = []
+    out_chunks: list[str] = []
+    err_chunks: list[str] = []
+    if on_output is not None:
+        pumps = [
+            threading.Thread(target=_pump, args=(proc.stdout, out_chunks, on_output), daemon=True),
+            threading.Thread(target=_pump, args=(proc.stderr, err_chunks, on_output), daemon=True),
+        ]
+        for pump in pumps:
+            pump.start()
+    
+    def finish() -> tuple[str, str]:
+        if not pumps:
+            return proc.communicate()
+        proc.wait()
+        for pump in pumps:
+            pump.join()
+        return "".join(out_chunks), "".join(err_chunks)
+    
+    waited = 0.0
+    try:
+        while True:
+            try:
+                if pumps:
+                    proc.wait(timeout=CANCEL_POLL_SECONDS)
+                    stdout, stderr = finish()
+                else:
+                    stdout, stderr = proc.communicate(timeout=CANCEL_POLL_SECONDS)
+                return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+            except subprocess.TimeoutExpired:
+                waited += CANCEL_POLL_SECONDS
+            
+            if cancelled() if cancelled is not None else is_cancel_requested(job_id):
+                terminate_process_group(proc)
+                finish()
+                raise JobCancelled(job_id)
+            
+            if waited >= timeout:
+                terminate_process_group(proc)
+                stdout, stderr = finish()
+                raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+    finally:
+        # Never leave an orphaned Blender behind, whatever happened above
+        terminate_process_group(proc)
+
+
+def scratch_root() -> Path:
+    """BLENDER_SCRATCH_DIR, or .scratch under BLENDER_WORKDIR"""
+    if settings.BLENDER_SCRATCH_DIR:
+        return Path(settings.BLENDER_SCRATCH_DIR)
+    return Path(settings.BLENDER_WORKDIR) / ".scratch"
+
+
+def make_scratch_dir(job_id: str, stage_cache: Optional[Path] = None) -> Path:
+    """
+    Fresh private directory (absolute) for one job's CAD process.
+    
+    Leftovers of an earlier attempt of the same job are removed first. With
+    stage_cache, .stage_cache inside links to that shared directory, so
+    stage checkpoints still carry over between a project's runs.
+    """
+    scratch = (scratch_root() / job_id).resolve()
+    shutil.rmtree(scratch, ignore_errors=True)
+    scratch.mkdir(parents=True)
+    if stage_cache is not None:
+        stage_cache.mkdir(parents=True, exist_ok=True)
+        try:
+            (scratch / ".stage_cache").symlink_to(stage_cache.resolve(), target_is_directory=True)
+        except OSError:
+            # No symlinks (Windows without the privilege): checkpoints stay private to this run
+            pass
+    return scratch
+
+
+def remove_scratch_dir(scratch: Optional[Path]) -> list[str]:
+    """Delete a scratch directory; returns the files that were left in it (partial outputs)"""
+    if scratch is None or not scratch.exists():
+        return []
+    # os.walk doesn't follow the .stage_cache link, and rmtree only unlinks it
+    removed = [
+        os.path.join(root, name)
+        for root, _, names in os.walk(scratch)
+        for name in names
+        if not os.path.islink(os.path.join(root, name))
+    ]
+    shutil.rmtree(scratch, ignore_errors=True)
+    return removed
@@ -0,0 +1,362 @@
+"""
+Worker tasks for design-space sweeps (see app.core.sweep).
+
+run_sweep_db fans a sweep out as chunk jobs. Every chunk either publishes
+a Parquet part or is recorded as failed: by itself when it raises, by
+RQ's on_failure callback when it times out or its worker dies, and by the
+deadline check for chunks still missing SWEEP_DEADLINE_SECONDS after the
+start. Whichever chunk (or check) accounts for the last one merges the
+parts; a sweep with failed chunks finishes with the rows it has.
+"""
+from datetime import timedelta
+from pathlib import Path
+import shutil
+import subprocess
+import time
+from rq import Callback
+from sqlalchemy.orm import Session
+from app.core.cancellation import JobCancelled, is_cancel_requested
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.queue import get_queue, get_redis
+from app.core.retention import register_artifact
+from app.core.shape_descriptors import load_triangles
+from app.core.storage import get_storage, read_artifact
+from app.core import sweep
+from app.models.job import Job
+from app.models.model import Model
+from app.schemas.sweep import SweepSpec
+from app.workers.process import run_cancellable
+from app.workers.tasks import _cancelled, build_blender_script
+
+# Chunk bookkeeping lives in Redis only while the sweep runs
+SWEEP_STATE_TTL_SECONDS = 7 * 86400
+
+
+def _parts_key(job_id: str) -> str:
+    return f"sweeps:{job_id}:parts"  # chunk index -> part location
+
+
+def _failed_key(job_id: str) -> str:
+    return f"sweeps:{job_id}:failed"  # chunk index -> error
+
+
+def _deadline_key(job_id: str) -> str:
+    return f"sweeps:{job_id}:deadline"
+
+
+def _settled_key(job_id: str) -> str:
+    return f"sweeps:{job_id}:settled"  # set by the one caller that merges the parts
+
+
+def _chunk_cancelled(db: Session, job: Job) -> bool:
+    """
+    tasks._cancelled for chunks: the cancel flag is left in place.
+    
+    Every chunk of the sweep polls the same flag, so it expires with its TTL
+    instead of being cleared by whichever chunk notices it first.
+    """
+    if job.status != "cancelled" and not is_cancel_requested(job.id):
+        return False
+    db.rollback()
+    if job.status != "cancelled":
+        job.status = "cancelled"
+        job.message = "Job cancelled"
+        db.commit()
+    return True
+
+
+def _workdir(job_id: str) -> Path:
+    workdir = Path(settings.BLENDER_WORKDIR) / "sweeps" / job_id
+    workdir.mkdir(parents=True, exist_ok=True)
+    return workdir
+
+
+def _publish(job_id: str, path: Path, content_type: str) -> str:
+    storage = get_storage()
+    location, _ = storage.publish_file(path, sweep.result_key(job_id, path.name), content_type)
+    if not storage.is_local:
+        path.unlink(missing_ok=True)
+    return location
+
+
+def _fail(db: Session, job: Job, message: str) -> None:
+    job.status = "failed"
+    job.message = message
+    db.commit()
+
+
+def run_sweep_db(job_id: str, project_id: str, params: dict):
+    """Sample a sweep's variants and fan them out as chunk jobs"""
+    db: Session = SessionLocal()
+    job = None
+    try:
+        job = db.query(Job).filter(Job.id == job_id).one()
+        if _cancelled(db, job):
+            return
+        job.status = "running"
+        job.progress = 0
+        db.commit()
+        
+        spec = SweepSpec.model_validate(params)
+        model = None
+        if spec.model_id is not None:
+            model = db.query(Model).options(Model.with_parameters()).filter(Model.id == spec.model_id).first()
+            if model is None:
+                return _fail(db, job, f"Model {spec.model_id} not found")
+        
+        try:
+            space = sweep.sweep_space({k: v.model_dump() for k, v in spec.parameters.items()}, spec.fixed, model)
+            variants = sweep.sample(space, spec.plan.model_dump())
+        except sweep.SweepError as e:
+            return _fail(db, job, str(e))
+        
+        chunk_size = spec.chunk_size or settings.SWEEP_CHUNK_SIZE
+        chunks = [variants[i:i + chunk_size] for i in range(0, len(variants), chunk_size)]
+        
+        redis = get_redis()
+        redis.delete(_parts_key(job_id), _failed_key(job_id), _settled_key(job_id))
+        redis.set(_deadline_key(job_id), time.time() + settings.SWEEP_DEADLINE_SECONDS, ex=SWEEP_STATE_TTL_SECONDS)
+        job.progress = 5
+        job.message = f"Evaluating {len(variants)} variants in {len(chunks)} chunks"
+        job.result = {"total_variants": len(variants), "chunks": len(chunks), "parameters": sorted(space)}
+        db.commit()
+        
+        if spec.evaluator == "blender":
+            timeout = chunk_size * settings.SWEEP_VARIANT_TIMEOUT_SECONDS + 60
+        else:
+            timeout = 600
+        queue = get_queue()
+        for index, chunk in enumerate(chunks):
+            queue.enqueue(
+                "app.workers.sweep.run_sweep_chunk",
+                job_id, project_id, index, index * chunk_size, chunk, len(chunks), spec.model_dump(),
+                job_timeout=timeout,
+                on_failure=Callback(on_chunk_failure),
+            )
+        queue.enqueue_in(
+            timedelta(seconds=settings.SWEEP_DEADLINE_SECONDS),
+            "app.workers.sweep.check_sweep_deadline",
+            job_id, len(chunks),
+            result_ttl=0,
+        )
+    except Exception as e:
+        if job and job.status != "cancelled":
+            _fail(db, job, str(e))
+        raise
+    finally:
+        db.close()
+
+
+def _evaluate_blender(job_id: str, workdir: Path, values: dict, spec: SweepSpec) -> dict:
+    """Build one variant in Blender (no render) and measure the exported STL"""
+    metrics = {column: None for column in sweep.METRIC_COLUMNS}
+    p = sweep.template_params(values)
+    error = sweep.check_geometry(p)
+    if error:
+        metrics.update(success=False, error=error, run_time_s=0.0)
+        return metrics
+    
+    tag = f"{job_id}_{time.monotonic_ns()}"
+    script_path = workdir / f"variant_{tag}.py"
+    output_file = workdir / f"output_{tag}.stl"
+    script_path.write_text(
+        build_blender_script(
+            p["L"], p["W"], p["T"], p["hole_d"], p["hole_count"], p["ring_radius"], p["fillet_radius"],
+            project_id=tag, render=False, checkpoint=False, formats=["stl"], save_blend=False,
+        ),
+        encoding="utf-8",
+    )
+    started = time.perf_counter()
+    try:
+        proc = run_cancellable(
+            [settings.BLENDER_PATH, "-b", "-P", str(script_path)],
+            cwd=str(workdir),
+            timeout=settings.SWEEP_VARIANT_TIMEOUT_SECONDS,
+            job_id=job_id,
+        )
+        metrics["run_time_s"] = time.perf_counter() - started
+        if proc.returncode != 0 or not output_file.exists():
+            metrics.update(success=False, error=(proc.stderr or "")[-500:] or f"Blender exited with {proc.returncode}")
+            return metrics
+        triangles = load_triangles(output_file.read_bytes(), output_file.name)
+        metrics.update(sweep.mesh_metrics(triangles, spec.density_g_cm3), success=True)
+        return metrics
+    except subprocess.TimeoutExpired:
+        metrics.update(success=False, error="Blender timed out", run_time_s=time.perf_counter() - started)
+        return metrics
+    finally:
+        script_path.unlink(missing_ok=True)
+        output_file.unlink(missing_ok=True)
+
+
+def run_sweep_chunk(
+    job_id: str, project_id: str, index: int, first_variant: int,
+    variants: list[dict], chunk_count: int, spec_data: dict,
+):
+    """Evaluate one chunk of variants into a Parquet part; the last chunk accounted for merges all parts"""
+    db: Session = SessionLocal()
+    job = None
+    try:
+        job = db.query(Job).filter(Job.id == job_id).one()
+        if _chunk_cancelled(db, job) or job.status != "running":
+            return
+        redis = get_redis()
+        deadline = redis.get(_deadline_key(job_id))
+        if deadline is not None and time.time() > float(deadline):
+            _record_failure(job_id, index, "sweep deadline passed before the chunk started")
+            return _settle(db, job, chunk_count)
+        spec = SweepSpec.model_validate(spec_data)
+        fixed = sweep.fixed_parameters(spec.fixed)
+        workdir = _workdir(job_id)
+        
+        rows = []
+        for offset, values in enumerate(variants):
+            values = {**fixed, **values}
+            if spec.evaluator == "blender":
+                # Blender variants take seconds each; analytic chunks finish before a check would matter
+                if is_cancel_requested(job_id):
+                    raise JobCancelled()
+                metrics = _evaluate_blender(job_id, workdir, values, spec)
+            else:
+                metrics = sweep.evaluate_analytic(values, spec.density_g_cm3)
+            rows.append({"variant": first_variant + offset, **values, **metrics})
+        
+        if redis.exists(_settled_key(job_id)):
+            # Finished without this chunk (deadline); its rows are no longer wanted
+            return
+        part = workdir / f"part-{index:05d}.parquet"
+        sweep.write_part(rows, part)
+        location = _publish(job_id, part, sweep.RESULTS_CONTENT_TYPE)
+        redis.hset(_parts_key(job_id), index, location)
+        redis.expire(_parts_key(job_id), SWEEP_STATE_TTL_SECONDS)
+        
+        db.refresh(job)
+        if _chunk_cancelled(db, job):
+            return
+        _settle(db, job, chunk_count)
+    except JobCancelled:
+        db.rollback()
+        if job.status != "cancelled":
+            job.status = "cancelled"
+            job.message = "Job cancelled. Blender process terminated."
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        if job and job.status == "running":
+            _record_failure(job_id, index, f"{type(e).__name__}: {e}")
+            _settle(db, job, chunk_count)
+        raise
+    finally:
+        db.close()
+
+
+def on_chunk_failure(rq_job, connection, exc_type, exc_value, traceback):
+    """RQ on_failure callback of chunk jobs (exceptions, timeouts, dead workers)"""
+    job_id, _, index, _, _, chunk_count, _ = rq_job.args
+    _record_failure(job_id, index, f"{exc_type.__name__}: {exc_value}" if exc_type else "chunk job failed")
+    _settle_sweep(job_id, chunk_count)
+
+
+def check_sweep_deadline(job_id: str, chunk_count: int):
+    """Scheduled at SWEEP_DEADLINE_SECONDS: count chunks still missing as failed and finish the sweep"""
+    accounted = _accounted(job_id)
+    for index in range(chunk_count):
+        if str(index) not in accounted:
+            _record_failure(job_id, index, "sweep deadline passed")
+    _settle_sweep(job_id, chunk_count)
+
+
+def _record_failure(job_id: str, index: int, error: str) -> None:
+    # First error wins: the chunk itself, its failure callback and the deadline check may all report it
+    redis = get_redis()
+    redis.hsetnx(_failed_key(job_id), index, error[:500])
+    redis.expire(_failed_key(job_id), SWEEP_STATE_TTL_SECONDS)
+
+
+def _accounted(job_id: str) -> set[str]:
+    """Indexes of chunks that published a part or failed"""
+    redis = get_redis()
+    keys = set(redis.hkeys(_parts_key(job_id))) | set(redis.hkeys(_failed_key(job_id)))
+    return {k.decode() for k in keys}
+
+
+def _settle_sweep(job_id: str, chunk_count: int) -> None:
+    db: Session = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job is not None and job.status == "running":
+            _settle(db, job, chunk_count)
+    finally:
+        db.close()
+
+
+def _settle(db: Session, job: Job, chunk_count: int) -> None:
+    """Report progress, or finish the sweep once every chunk is accounted for (exactly one caller does)"""
+    redis = get_redis()
+    done = len(_accounted(job.id))
+    if done < chunk_count:
+        # Conditional so a late progress update never overwrites the finished sweep
+        db.query(Job).filter(Job.id == job.id, Job.status == "running").update(
+            {
+                Job.progress: 5 + int(90 * done / chunk_count),
+                Job.message: f"Evaluated {done}/{chunk_count} chunks",
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        return
+    if not redis.set(_settled_key(job.id), 1, nx=True, ex=SWEEP_STATE_TTL_SECONDS):
+        return
+    try:
+        _finish(db, job, _workdir(job.id), chunk_count)
+    except Exception as e:
+        db.rollback()
+        _fail(db, job, f"Merging sweep results failed: {e}")
+        raise
+
+
+def _finish(db: Session, job: Job, workdir: Path, chunk_count: int) -> None:
+    """Merge the chunk parts into results.parquet and record the summary"""
+    redis = get_redis()
+    parts = {int(k): v.decode() for k, v in redis.hgetall(_parts_key(job.id)).items()}
+    failed = {int(k): v.decode() for k, v in redis.hgetall(_failed_key(job.id)).items() if int(k) not in parts}
+    redis.delete(_parts_key(job.id), _failed_key(job.id), _deadline_key(job.id))
+    failed_chunks = {str(i): failed[i] for i in sorted(failed)}
+    if not parts:
+        job.status = "failed"
+        job.message = f"All {chunk_count} sweep chunks failed: {next(iter(failed_chunks.values()), 'unknown error')}"
+        job.result = {**(job.result or {}), "failed_chunks": failed_chunks}
+        db.commit()
+        return
+    locations = [parts[i] for i in sorted(parts)]
+    
+    results = workdir / "results.parquet"
+    total = sweep.merge_parts((read_artifact(loc) for loc in locations), results)
+    table = sweep.load_results(results.read_bytes())
+    location = _publish(job.id, results, sweep.RESULTS_CONTENT_TYPE)
+    
+    storage = get_storage()
+    for loc in locations:
+        storage.delete(loc)
+    if not storage.is_local:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    succeeded = table.column("success").to_pylist().count(True) if total else 0
+    register_artifact(db, location, job.project_id, "sweep")
+    job.status = "succeeded"
+    job.progress = 100
+    job.message = f"Sweep completed: {succeeded}/{total} variants valid"
+    if failed_chunks:
+        job.message += f"; {len(failed_chunks)} of {chunk_count} chunks failed"
+    job.result = {
+        **(job.result or {}),
+        "results_path": location,
+        "total_variants": total,
+        "succeeded": succeeded,
+        "failed": total - succeeded,
+        "partial": bool(failed_chunks),
+        "failed_chunks": failed_chunks,
+        "summary": sweep.summarize(table),
+    }
+    db.commit()
@@ -1,16 +1,59 @@
 """Worker tasks for background processing - Blender integration"""
+from dataclasses import dataclass
+from datetime import timedelta
+from rq.exceptions import NoSuchJobError
+from rq.job import Job as RQJob, JobStatus
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.core.config import settings
+from app.core.cancellation import JobCancelled, clear_cancel, is_cancel_requested
+from app.core.export_formats import (
+    BLEND_CONTENT_TYPE, EXPORT_FORMATS, blend_filename, export_filename, resolve_formats,
+)
+from app.core.job_logs import JobLogWriter, open_log
+from app.core.queue import get_queue, get_redis, job_timeout
+from app.core.response_cache import invalidate_project
+from app.core.retention import register_artifact
+from app.core.shape_descriptors import UnsupportedMeshFormat, enqueue_descriptor, is_mesh_file
+from app.core.storage import publish_outputs, storage_for
+from app.schemas.generate import TemplateParameters
 from app.models.scale_reference import ScaleReference
 from app.models.extraction_result import ExtractionResult
 from app.models.script_version import ScriptVersion
 from app.models.job import Job
 from app.models.asset import Asset
+from app.workers.executors import CadExecutor, CadTask, NoExecutorAvailable, route
+from app.workers.packing import BlenderPack, PackItem
+from app.workers.process import make_scratch_dir, remove_scratch_dir
 from pathlib import Path
+from typing import Optional
+import hashlib
+import os
 import subprocess
 import math
 
+# Margin past a pack lead's RQ timeout before its claimed jobs count as stranded
+PACK_REAP_GRACE_SECONDS = 120
+
+
+def _cancelled(db: Session, job: Job) -> bool:
+    """
+    Check whether the job was cancelled while queued or running.
+    
+    Discards any uncommitted work and makes sure the job stays 'cancelled'
+    so a late worker never overwrites the user's decision.
+    """
+    if job.status != "cancelled" and not is_cancel_requested(job.id):
+        return False
+    
+    db.rollback()
+    if job.status != "cancelled":
+        job.status = "cancelled"
+        job.message = "Job cancelled"
+        db.commit()
+    clear_cancel(job.id)
+    return True
+
 
 def run_extraction_db(job_id: str, project_id: str, params: dict):
     """Extract dimensions from scale reference - DB stored"""
@@ -18,6 +61,8 @@ def run_extraction_db(job_id: str, project_id: str, params: dict):
     job = None
     try:
         job = db.query(Job).filter(Job.id == job_id).one()
+        if _cancelled(db, job):
+            return
         job.status = "running"
         job.progress = 10
         db.commit()
@@ -108,10 +153,13 @@ def run_extraction_db(job_id: str, project_id: str, params: dict):
             "dimensions_count": len(dims),
         }
         job.message = f"Extraction completed. Version {next_ver} created."
+        if _cancelled(db, job):
+            return
         db.commit()
+        invalidate_project(project_id)
         
     except Exception as e:
-        if job:
+        if job and job.status != "cancelled":
             job.status = "failed"
             job.message = str(e)
             db.commit()
@@ -126,6 +174,8 @@ def generate_script_db(job_id: str, project_id: str, params: dict):
     job = None
     try:
         job = db.query(Job).filter(Job.id == job_id).one()
+        if _cancelled(db, job):
+            return
         job.status = "running"
         job.progress = 10
         db.commit()
@@ -138,20 +188,21 @@ def generate_script_db(job_id: str, project_id: str, params: dict):
             .first()
         )
         
-        if not extraction:
+        # Prompt jobs (POST /generate) and jobs given dimensions can do without an extraction
+        if not extraction and not params.get("prompt") and not params.keys() & TemplateParameters.model_fields.keys():
             job.status = "failed"
             job.message = "No extraction result found. Run extraction first."
             db.commit()
             return
         
         # Build dimension map
-        dim_map = {d["name"]: float(d["value"]) for d in extraction.dimensions}
+        dim_map = {d["name"]: float(d["value"]) for d in extraction.dimensions} if extraction else {}
         
         # Extract parameters
-        L = dim_map.get("overall_length_mm") or dim_map.get("overall_length") or 120.0
-        W = dim_map.get("overall_width") or L * 0.45
+        L = float(params.get("length") or dim_map.get("overall_length_mm") or dim_map.get("overall_length") or 120.0)
+        W = float(params.get("width") or dim_map.get("overall_width") or L * 0.45)
         T = float(params.get("thickness", dim_map.get("overall_height", 5.0)))
-        hole_d = dim_map.get("hole_diameter") or L * 0.08
+        hole_d = float(params.get("hole_diameter") or dim_map.get("hole_diameter") or L * 0.08)
         hole_count = int(params.get("hole_count", 8))
         ring_radius = float(params.get("hole_ring_radius", min(L, W) * 0.35))
         fillet_radius = float(params.get("fillet_radius", L * 0.02))
@@ -166,7 +217,11 @@ def generate_script_db(job_id: str, project_id: str, params: dict):
             hole_count=hole_count,
             ring_radius=ring_radius,
             fillet_radius=fillet_radius,
-            project_id=project_id
+            project_id=project_id,
+            checkpoint=settings.BLENDER_STAGE_CACHE,
+            formats=resolve_formats(params.get("formats")),
+            boolean_solver=params.get("boolean_solver", "auto"),
+            hole_segments=params.get("hole_segments", DEFAULT_HOLE_SEGMENTS),
         )
         
         # Calculate next version
@@ -187,6 +242,8 @@ def generate_script_db(job_id: str, project_id: str, params: dict):
         db.add(script)
         db.flush()  # Ensure script.id is available
         
+        follow_up = _add_follow_up(db, job, params.get("then"))
+        
         job.status = "succeeded"
         job.progress = 100
         job.result = {
@@ -194,11 +251,21 @@ def generate_script_db(job_id: str, project_id: str, params: dict):
             "version": next_ver,
             "script_length": len(script_text),
         }
+        if follow_up is not None:
+            job.result["next_job_id"] = follow_up.id
         job.message = f"Script version {next_ver} generated successfully."
+        if _cancelled(db, job):
+            return
         db.commit()
-        
+        invalidate_project(project_id)
+        if follow_up is not None:
+            get_queue().enqueue(
+                "app.workers.tasks.run_blender_db", follow_up.id, project_id, follow_up.params,
+                job_id=follow_up.id, job_timeout=job_timeout("run_blender"),
+            )
+            
     except Exception as e:
-        if job:
+        if job and job.status != "cancelled":
             job.status = "failed"
             job.message = str(e)
             db.commit()
@@ -207,141 +274,892 @@ def generate_script_db(job_id: str, project_id: str, params: dict):
         db.close()
 
 
+def _add_follow_up(db: Session, job: Job, then: Optional[dict]) -> Optional[Job]:
+    """
+    Queued Job row for the follow-up requested with a job (params["then"]).
+    
+    Committed with the job's result and enqueued after it, so the follow-up
+    never runs ahead of the output it needs.
+    """
+    if not then:
+        return None
+    if then.get("job_type") != "run_blender":
+        raise ValueError(f"Unsupported follow-up job type: {then.get('job_type')}")
+    follow_up = Job(
+        project_id=job.project_id,
+        job_type="run_blender",
+        status="queued",
+        progress=0,
+        params=then.get("params") or {},
+    )
+    db.add(follow_up)
+    db.flush()
+    return follow_up
+
+
+@dataclass
+class _BlenderRun:
+    """A claimed run_blender job ready for Blender (alone or in a pack)"""
+    job: Job
+    workdir: Path  # the project's: script versions and the shared stage cache
+    scratch: Path  # the job's own: Blender runs here and writes its outputs here
+    script_path: Path
+    script_version: int
+    formats: list[str]
+    log: JobLogWriter
+
+
+def _fail_job(db: Session, job: Job, message: str) -> None:
+    job.status = "failed"
+    job.message = message
+    db.commit()
+
+
+def _claim_queued(db: Session, job: Job) -> bool:
+    """queued -> running, unless a cancel or another worker's pack got there first"""
+    claimed = (
+        db.query(Job)
+        .filter(Job.id == job.id, Job.status == "queued")
+        .update({Job.status: "running", Job.progress: 10}, synchronize_session=False)
+    )
+    db.commit()
+    db.refresh(job)
+    return bool(claimed)
+
+
+def _claim_pack(db: Session, lead: Job) -> list[Job]:
+    """Claim up to BLENDER_PACK_SIZE - 1 other queued run_blender jobs (each runs in its own scratch dir)"""
+    room = settings.BLENDER_PACK_SIZE - 1
+    if room <= 0:
+        return []
+    candidates = (
+        db.query(Job)
+        .filter(Job.job_type == "run_blender", Job.status == "queued", Job.id != lead.id)
+        .order_by(Job.created_at)
+        .limit(room * 4)
+        .all()
+    )
+    claimed = []
+    for job in candidates:
+        if len(claimed) >= room:
+            break
+        # Jobs asking for another executor are routed by their own run_blender_db
+        if (job.params or {}).get("tool") not in (None, "", "blender"):
+            continue
+        if is_cancel_requested(job.id):
+            continue
+        if _claim_queued(db, job):
+            claimed.append(job)
+    return claimed
+
+
+def _requeue(db: Session, job: Job, message: str = "Requeued: the packed Blender run stopped before this job ran") -> None:
+    """Give a claimed job back to the queue (its pack stopped before running it, or it can't join the pack)"""
+    job.status = "queued"
+    job.progress = 0
+    job.message = message
+    db.commit()
+    try:
+        if RQJob.fetch(job.id, connection=get_redis()).get_status() == JobStatus.QUEUED:
+            # The original entry hasn't been dequeued yet and will run the job
+            return
+    except NoSuchJobError:
+        pass
+    # Same RQ id as submit_job uses, so cancel_job still finds the entry
+    get_queue().enqueue(
+        "app.workers.tasks.run_blender_db", job.id, job.project_id, job.params or {},
+        job_id=job.id, job_timeout=job_timeout("run_blender"),
+    )
+
+
+def requeue_stranded(job_ids: list[str]):
+    """
+    Scheduled when a pack claims jobs: requeue any still 'running' for nobody.
+    
+    Runs after the lead's RQ timeout, so a member still running then was
+    claimed by a worker that died (OOM, hard timeout) before settling it.
+    Members a worker is running under their own RQ entry are left alone.
+    """
+    db: Session = SessionLocal()
+    try:
+        for job in db.query(Job).filter(Job.id.in_(job_ids), Job.status == "running").all():
+            try:
+                if RQJob.fetch(job.id, connection=get_redis()).get_status() == JobStatus.STARTED:
+                    continue
+            except NoSuchJobError:
+                pass
+            _requeue(db, job, "Requeued: the worker running its packed Blender run stopped")
+    finally:
+        db.close()
+
+
+def _prepare_blender_run(db: Session, job: Job) -> Optional[_BlenderRun]:
+    """Write the project's latest script to its workdir and make the job's scratch dir; fails the job if there is no script"""
+    log = open_log(job.id)
+    
+    # Get latest script
+    script = (
+        db.query(ScriptVersion)
+        .filter(ScriptVersion.project_id == job.project_id)
+        .order_by(ScriptVersion.version.desc())
+        .first()
+    )
+    
+    if not script:
+        log.close()
+        _fail_job(db, job, "No script found. Generate script first.")
+        return None
+    
+    # Create work directory
+    workdir = Path(settings.BLENDER_WORKDIR) / job.project_id
+    workdir.mkdir(parents=True, exist_ok=True)
+    
+    # Save script file (concurrent runs of the same version may be writing it too)
+    script_path = workdir / f"script_v{script.version}.py"
+    tmp = script_path.with_name(f".{script_path.name}.{job.id}.tmp")
+    tmp.write_text(script.script_text, encoding="utf-8")
+    os.replace(tmp, script_path)
+    scratch = make_scratch_dir(job.id, stage_cache=workdir / ".stage_cache")
+    
+    job.progress = 30
+    job.message = "Running Blender headless..."
+    db.commit()
+    return _BlenderRun(
+        job=job,
+        workdir=workdir,
+        scratch=scratch,
+        script_path=script_path,
+        script_version=script.version,
+        formats=resolve_formats((job.params or {}).get("formats")),
+        log=log,
+    )
+
+
 def run_blender_db(job_id: str, project_id: str, params: dict):
-    """Run Blender headless - DB stored results"""
+    """
+    Run Blender headless - DB stored results.
+    
+    Up to BLENDER_PACK_SIZE - 1 other queued run_blender jobs are claimed
+    and run in the same Blender process (see app.workers.packing); each one
+    still gets its own scratch dir, outputs, log and outcome, so jobs of
+    the same project can run at once. A job already run by another
+    worker's pack is a no-op here.
+    """
     db: Session = SessionLocal()
     job = None
+    runs: list[_BlenderRun] = []
     try:
         job = db.query(Job).filter(Job.id == job_id).one()
-        job.status = "running"
-        job.progress = 10
-        db.commit()
+        if _cancelled(db, job):
+            return
+        if not _claim_queued(db, job):
+            return
         
         if settings.BLENDER_EXEC_MODE != "server_headless":
-            job.status = "failed"
-            job.message = f"Blender execution mode is '{settings.BLENDER_EXEC_MODE}', not 'server_headless'"
-            db.commit()
+            _fail_job(db, job, f"Blender execution mode is '{settings.BLENDER_EXEC_MODE}', not 'server_headless'")
             return
         
-        # Get latest script
-        script = (
-            db.query(ScriptVersion)
-            .filter(ScriptVersion.project_id == project_id)
-            .order_by(ScriptVersion.version.desc())
-            .first()
-        )
-        
-        if not script:
-            job.status = "failed"
-            job.message = "No script found. Generate script first."
-            db.commit()
+        run = _prepare_blender_run(db, job)
+        if run is None:
             return
+        runs.append(run)
+        try:
+            executor = route(_build_task(run), (job.params or {}).get("tool"))
+        except NoExecutorAvailable as e:
+            _fail_job(db, job, str(e))
+            return
+        # Only Blender runs can share a process
+        members = _claim_pack(db, job) if executor.name == "blender" else []
+        if members:
+            # Nothing else gives the members back if this worker dies mid-pack
+            get_queue().enqueue_in(
+                timedelta(seconds=job_timeout("run_blender") + PACK_REAP_GRACE_SECONDS),
+                "app.workers.tasks.requeue_stranded", [member.id for member in members],
+                result_ttl=0,
+            )
+        for member in members:
+            try:
+                member_run = _prepare_blender_run(db, member)
+            except Exception as e:
+                db.rollback()
+                _fail_job(db, member, str(e))
+                continue
+            if member_run is None:
+                continue
+            try:
+                member_executor = route(_build_task(member_run), (member.params or {}).get("tool"))
+            except NoExecutorAvailable:
+                member_executor = None
+            if member_executor is not executor:
+                # Routed elsewhere (or nowhere): its own run_blender_db handles it
+                member_run.log.close()
+                remove_scratch_dir(member_run.scratch)
+                _requeue(db, member, "Requeued: routed to another executor than the packed Blender run")
+                continue
+            runs.append(member_run)
         
-        # Create work directory
-        workdir = Path(settings.BLENDER_WORKDIR) / project_id
-        workdir.mkdir(parents=True, exist_ok=True)
-        
-        # Save script file
-        script_path = workdir / f"script_v{script.version}.py"
-        script_path.write_text(script.script_text, encoding="utf-8")
-        
-        job.progress = 30
-        job.message = "Running Blender headless..."
-        db.commit()
-        
-        # Run Blender
-        cmd = [settings.BLENDER_PATH, "-b", "-P", str(script_path)]
-        proc = subprocess.run(
-            cmd,
-            cwd=str(workdir),
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
-        
-        job.progress = 80
-        db.commit()
-        
-        # Check output files
-        output_file = workdir / f"output_{project_id}.stl"
-        render_file = workdir / f"render_{project_id}.png"
-        
-        success = (proc.returncode == 0 and output_file.exists())
-        
+        if len(runs) == 1:
+            _run_single(db, run, executor)
+        else:
+            _run_packed(db, runs)
+            
+    except Exception as e:
+        db.rollback()
+        for failed in [job] + [r.job for r in runs[1:]]:
+            if failed is not None and failed.status == "running":
+                _fail_job(db, failed, str(e))
+        raise
+    finally:
+        for run in runs:
+            run.log.close()
+            remove_scratch_dir(run.scratch)
+        db.close()
+
+
+def _build_task(run: _BlenderRun) -> CadTask:
+    return CadTask(
+        job_id=run.job.id,
+        operation="build",
+        workdir=run.scratch,
+        formats=run.formats,
+        outputs={fmt: run.scratch / export_filename(run.job.project_id, fmt) for fmt in run.formats},
+        script_path=run.script_path.resolve(),
+        script_args=["--formats", ",".join(run.formats)],
+        on_output=run.log.write,  # full output goes to the job log
+    )
+
+
+def _run_single(db: Session, run: _BlenderRun, executor: CadExecutor) -> None:
+    task = _build_task(run)
+    # Blender runs in its own process group so cancel/timeout kill it cleanly
+    run.log.line(f"Running {executor.describe(task)} (script v{run.script_version})")
+    try:
+        result = executor.execute(task)
+    except JobCancelled:
+        _cancel_run(db, run)
+        return
+    except subprocess.TimeoutExpired:
+        _timeout_run(db, run)
+        return
+    run.log.line(f"{executor.name} exited with return code {result.returncode} after {result.usage.wall_seconds:.2f}s")
+    _finish_blender_run(db, run, result.returncode, result.stdout, result.stderr, usage=result.usage_dict())
+
+
+def _run_packed(db: Session, runs: list[_BlenderRun]) -> None:
+    """Run several jobs in one Blender process and settle each one on its own outcome"""
+    lead = runs[0]
+    items = [
+        PackItem(run.job.id, run.script_path.resolve(), run.scratch, ["--formats", ",".join(run.formats)], run.log.write)
+        for run in runs
+    ]
+    for run in runs:
+        run.job.message = f"Running Blender headless (packed with {len(runs) - 1} other jobs)..."
+    db.commit()
+    
+    pack = BlenderPack(items, Path(settings.BLENDER_WORKDIR) / "packs" / lead.job.id)
+    lead.log.line(f"Running {len(runs)} jobs in one Blender process: {', '.join(item.job_id for item in items)}")
+    interrupted = None
+    try:
+        pack.run(settings.BLENDER_PATH, timeout=settings.BLENDER_TIMEOUT_SECONDS * len(runs))
+    except (JobCancelled, subprocess.TimeoutExpired) as e:
+        # Cancelling the job whose script is running or the pack timeout stops every script still to run
+        interrupted = e
+    outcomes = pack.outcomes()
+    pack.cleanup()
+    
+    for run, item in zip(runs, items):
+        outcome = outcomes.get(run.job.id)
+        try:
+            if outcome is not None:
+                run.log.line(f"Script finished in {outcome.seconds:.2f}s ({'ok' if outcome.ok else 'failed'})")
+                _finish_blender_run(db, run, 0 if outcome.ok else 1, "".join(item.output), outcome.error)
+            elif run.job.id in pack.cancelled or _cancelled(db, run.job):
+                # Killed while running, or skipped before its turn
+                _cancel_run(db, run)
+            elif run.job.id not in pack.started or isinstance(interrupted, JobCancelled):
+                remove_scratch_dir(run.scratch)
+                _requeue(db, run.job)
+            elif isinstance(interrupted, subprocess.TimeoutExpired):
+                _timeout_run(db, run)
+            else:
+                _fail_job(db, run.job, f"Blender exited with return code {pack.returncode} during this job's script")
+        except Exception as e:
+            # One job's publishing error must not affect the rest of the pack
+            db.rollback()
+            _fail_job(db, run.job, str(e))
+
+
+def _cancel_run(db: Session, run: _BlenderRun) -> None:
+    db.rollback()
+    removed = remove_scratch_dir(run.scratch)
+    run.job.status = "cancelled"
+    run.job.message = "Job cancelled. Blender process terminated."
+    run.job.result = {"removed_files": removed}
+    db.commit()
+    clear_cancel(run.job.id)
+
+
+def _timeout_run(db: Session, run: _BlenderRun) -> None:
+    message = f"Blender execution timed out (>{settings.BLENDER_TIMEOUT_SECONDS}s)"
+    run.log.line(message)
+    _fail_job(db, run.job, message)
+
+
+def _finish_blender_run(
+    db: Session, run: _BlenderRun, returncode: int, stdout: Optional[str], stderr: Optional[str],
+    usage: Optional[dict] = None,
+) -> None:
+    """
+    Publish and register one job's outputs, or fail it (usage: executor resources, single runs only).
+    
+    Every output is published from the job's scratch directory under
+    job-unique names before any Asset row is added; if the job then doesn't
+    commit, the published files are deleted again.
+    """
+    job, scratch, project_id, formats = run.job, run.scratch, run.job.project_id, run.formats
+    job.progress = 80
+    db.commit()
+    
+    # Check output files (scripts generated before multi-format export only write STL)
+    export_files = {fmt: scratch / export_filename(project_id, fmt) for fmt in formats}
+    produced = {fmt: path for fmt, path in export_files.items() if path.exists()}
+    blend_file = scratch / blend_filename(project_id)
+    render_file = scratch / f"render_{project_id}.png"
+    
+    success = returncode == 0 and bool(produced)
+    results = []
+    
+    try:
         if success:
-            # Register result as Asset
-            result_asset = Asset(
-                project_id=project_id,
-                asset_type="model3d",
-                filename=output_file.name,
-                content_type="model/stl",
-                size_bytes=output_file.stat().st_size,
-                storage_path=str(output_file),
-            )
-            db.add(result_asset)
-            db.flush()  # Ensure result_asset.id is available
+            # Publish outputs to storage (atomic renames locally, parallel multipart upload on S3)
+            has_render = render_file.exists()
+            has_blend = blend_file.exists()
+            outputs = [(path, EXPORT_FORMATS[fmt].content_type) for fmt, path in produced.items()]
+            if has_render:
+                outputs.append((render_file, "image/png"))
+            if has_blend:
+                outputs.append((blend_file, BLEND_CONTENT_TYPE))
+            results = publish_outputs(project_id, outputs, job.id)
+            published = iter(results)
+            
+            # Register each exported format as an Asset
+            exports = _register_exports(db, project_id, produced, published)
+            primary = exports[next(iter(produced))]
+            register_artifact(db, str(run.script_path), project_id, "script")
             
             # Register render if exists
             render_asset_id = None
-            if render_file.exists():
+            render_location = None
+            if has_render:
+                render_location, render_size = next(published)
                 render_asset = Asset(
                     project_id=project_id,
                     asset_type="image",
                     filename=render_file.name,
                     content_type="image/png",
-                    size_bytes=render_file.stat().st_size,
-                    storage_path=str(render_file),
+                    size_bytes=render_size,
+                    storage_path=render_location,
                 )
                 db.add(render_asset)
+                register_artifact(db, render_location, project_id, "render", render_size)
                 db.flush()
                 render_asset_id = render_asset.id
             
+            # The .blend is kept for export jobs, not listed as an asset
+            blend_location = None
+            if has_blend:
+                blend_location, blend_size = next(published)
+                register_artifact(db, blend_location, project_id, "blend", blend_size)
+            
             job.status = "succeeded"
             job.progress = 100
             job.result = {
-                "returncode": proc.returncode,
-                "output_file": str(output_file),
-                "render_file": str(render_file) if render_file.exists() else None,
-                "result_asset_id": result_asset.id,
+                "returncode": returncode,
+                "output_file": primary["file"],
+                "render_file": render_location,
+                "blend_file": blend_location,
+                "exports": exports,
+                "missing_formats": [fmt for fmt in formats if fmt not in produced],
+                "result_asset_id": primary["asset_id"],
                 "render_asset_id": render_asset_id,
-                "stdout": proc.stdout[-2000:] if proc.stdout else None,
-                "stderr": proc.stderr[-2000:] if proc.stderr else None,
+                "stdout": stdout[-2000:] if stdout else None,
+                "stderr": stderr[-2000:] if stderr else None,
+                "log_bytes": run.log.offset,
+                "usage": usage,
             }
             job.message = "Blender execution completed successfully."
         else:
             job.status = "failed"
-            job.message = f"Blender failed with return code {proc.returncode}"
+            job.message = f"Blender failed with return code {returncode}"
             job.result = {
-                "returncode": proc.returncode,
-                "stdout": proc.stdout[-2000:] if proc.stdout else None,
-                "stderr": proc.stderr[-2000:] if proc.stderr else None,
+                "returncode": returncode,
+                "stdout": stdout[-2000:] if stdout else None,
+                "stderr": stderr[-2000:] if stderr else None,
+                "log_bytes": run.log.offset,
+                "usage": usage,
             }
         
+        if _cancelled(db, job):
+            _discard_published(results)
+            return
+        db.commit()
+    except Exception:
+        db.rollback()
+        _discard_published(results)
+        raise
+    
+    if success:
+        _enqueue_descriptors(exports)
+
+
+def _discard_published(results: list[tuple[str, int]]) -> None:
+    """Delete published outputs that no committed row refers to"""
+    for location, _ in results:
+        try:
+            storage_for(location).delete(location)
+        except Exception:
+            # An unreferenced file only wastes space; nothing serves it
+            pass
+
+
+def _latest_blender_run(db: Session, project_id: str, source_job_id: Optional[str]) -> Optional[Job]:
+    query = db.query(Job).filter(
+        Job.project_id == project_id, Job.job_type == "run_blender", Job.status == "succeeded"
+    )
+    if source_job_id:
+        return query.filter(Job.id == source_job_id).first()
+    for run in query.order_by(Job.created_at.desc()).limit(20):
+        if (run.result or {}).get("blend_file"):
+            return run
+    return None
+
+
+def run_export_db(job_id: str, project_id: str, params: dict):
+    """
+    Export more formats of an existing geometry from its stored .blend.
+    
+    Formats the source run (or an earlier export job) already produced are
+    returned as they are; only the missing ones are exported, in one
+    executor run that skips the geometry stages entirely. The router
+    (app.workers.executors) sends STL/OBJ-only exports of a run that
+    already has a mesh to the local executor instead of starting Blender.
+    """
+    db: Session = SessionLocal()
+    job = None
+    log = None
+    scratch = None
+    try:
+        job = db.query(Job).filter(Job.id == job_id).one()
+        if _cancelled(db, job):
+            return
+        job.status = "running"
+        job.progress = 10
+        db.commit()
+        log = open_log(job_id)
+        
+        formats = resolve_formats(params.get("formats"))
+        source = _latest_blender_run(db, project_id, params.get("source_job_id"))
+        if source is None or not (source.result or {}).get("blend_file"):
+            job.status = "failed"
+            job.message = "No Blender run with a stored .blend found. Run Blender first."
+            db.commit()
+            return
+        
+        known = dict(source.result.get("exports") or {})
+        missing = [fmt for fmt in formats if fmt not in known]
+        exports = {fmt: {**known[fmt], "reused": True} for fmt in formats if fmt in known}
+        
+        usage = None
+        if missing:
+            scratch = make_scratch_dir(job_id)
+            # Tagged with the source run so the files are told apart from that run's outputs
+            tag = source.id[:8]
+            files = {fmt: scratch / export_filename(project_id, fmt, tag) for fmt in missing}
+            task = CadTask(
+                job_id=job_id,
+                operation="export",
+                workdir=scratch,
+                formats=missing,
+                outputs=files,
+                # The stored .blend, or a mesh the run exported (enough for STL/OBJ)
+                sources={"blend": source.result["blend_file"], **{fmt: e["file"] for fmt, e in known.items()}},
+                on_output=log.write,
+            )
+            try:
+                executor = route(task, params.get("tool"))
+            except NoExecutorAvailable as e:
+                job.status = "failed"
+                job.message = str(e)
+                db.commit()
+                return
+            
+            job.progress = 30
+            job.message = f"Exporting {', '.join(missing)} from stored geometry ({executor.name})..."
+            db.commit()
+            
+            log.line(f"Running {executor.describe(task)} (source job {source.id})")
+            result = executor.execute(task)
+            usage = result.usage_dict()
+            log.line(f"{executor.name} exited with return code {result.returncode} after {result.usage.wall_seconds:.2f}s")
+            
+            produced = result.outputs
+            if result.returncode != 0 or len(produced) != len(files):
+                job.status = "failed"
+                job.message = f"Export failed with return code {result.returncode}"
+                job.result = {
+                    "returncode": result.returncode,
+                    "stderr": result.stderr[-2000:] if result.stderr else None,
+                    "log_bytes": log.offset,
+                    "usage": usage,
+                }
+                db.commit()
+                return
+            
+            results = publish_outputs(
+                project_id, [(path, EXPORT_FORMATS[fmt].content_type) for fmt, path in produced.items()], job_id
+            )
+            try:
+                new_exports = _register_exports(db, project_id, produced, iter(results))
+            except Exception:
+                db.rollback()
+                _discard_published(results)
+                raise
+            exports.update(new_exports)
+            # Later requests for these formats are served from the source run
+            source.result = {**source.result, "exports": {**known, **new_exports}}
+        
+        job.status = "succeeded"
+        job.progress = 100
+        job.message = f"Exported {', '.join(formats)}" + (f" ({', '.join(missing)} new)" if missing else " (all reused)")
+        job.result = {
+            "source_job_id": source.id,
+            "exports": {fmt: exports[fmt] for fmt in formats},
+            "log_bytes": log.offset,
+            "usage": usage,
+        }
+        if _cancelled(db, job):
+            if missing:
+                _discard_published(results)
+            return
         db.commit()
         
+        if missing:
+            _enqueue_descriptors({fmt: exports[fmt] for fmt in missing})
+            
+    except JobCancelled:
+        db.rollback()
+        removed = remove_scratch_dir(scratch)
+        scratch = None
+        job.status = "cancelled"
+        job.message = "Job cancelled. Blender process terminated."
+        job.result = {"removed_files": removed}
+        db.commit()
+        clear_cancel(job_id)
     except subprocess.TimeoutExpired:
+        if log:
+            log.line(f"Blender export timed out (>{settings.BLENDER_TIMEOUT_SECONDS}s)")
         if job:
             job.status = "failed"
-            job.message = "Blender execution timed out (>5min)"
+            job.message = f"Blender export timed out (>{settings.BLENDER_TIMEOUT_SECONDS}s)"
             db.commit()
     except Exception as e:
-        if job:
+        if job and job.status != "cancelled":
             job.status = "failed"
             job.message = str(e)
             db.commit()
         raise
+    finally:
+        if log:
+            log.close()
+        remove_scratch_dir(scratch)
+        db.close()
+
+
+def run_measure_db(job_id: str, project_id: str, params: dict):
+    """
+    Measure a Blender run's exported mesh: triangles, volume, surface area,
+    bounding box and mass (params.density_g_cm3, default 2.70).
+    
+    Needs no CAD tool; the router sends it to the local executor.
+    """
+    db: Session = SessionLocal()
+    job = None
+    scratch = None
+    try:
+        job = db.query(Job).filter(Job.id == job_id).one()
+        if _cancelled(db, job):
+            return
+        job.status = "running"
+        job.progress = 10
+        db.commit()
+        
+        source = _latest_blender_run(db, project_id, params.get("source_job_id"))
+        exports = ((source.result or {}).get("exports") or {}) if source else {}
+        if not exports:
+            _fail_job(db, job, "No Blender run with exported geometry found. Run Blender first.")
+            return
+        
+        scratch = make_scratch_dir(job_id)
+        task = CadTask(
+            job_id=job_id,
+            operation="measure",
+            workdir=scratch,
+            sources={fmt: e["file"] for fmt, e in exports.items()},
+            params={"density_g_cm3": float(params.get("density_g_cm3", 2.70))},
+        )
+        try:
+            executor = route(task, params.get("tool"))
+        except NoExecutorAvailable as e:
+            _fail_job(db, job, str(e))
+            return
+        result = executor.execute(task)
+        if result.returncode != 0:
+            _fail_job(db, job, f"Measurement failed: {result.stderr or result.returncode}")
+            return
+        
+        job.status = "succeeded"
+        job.progress = 100
+        job.message = f"Measured with the {executor.name} executor"
+        job.result = {"source_job_id": source.id, "metrics": result.metrics, "usage": result.usage_dict()}
+        if _cancelled(db, job):
+            return
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if job and job.status != "cancelled":
+            _fail_job(db, job, str(e))
+        raise
+    finally:
+        remove_scratch_dir(scratch)
+        db.close()
+
+
+def _register_exports(db: Session, project_id: str, files: dict, published) -> dict:
+    """Add an Asset per exported format; published yields (location, size) in files order"""
+    exports = {}
+    for fmt, path in files.items():
+        location, size = next(published)
+        asset = Asset(
+            project_id=project_id,
+            asset_type="model3d",
+            filename=path.name,
+            content_type=EXPORT_FORMATS[fmt].content_type,
+            size_bytes=size,
+            storage_path=location,
+        )
+        db.add(asset)
+        register_artifact(db, location, project_id, "output", size)
+        db.flush()  # Ensure asset.id is available
+        exports[fmt] = {"file": location, "asset_id": asset.id}
+    return exports
+
+
+def _enqueue_descriptors(exports: dict) -> None:
+    # One descriptor per geometry: the first format the descriptor code can read
+    for export in exports.values():
+        if is_mesh_file(export["file"]):
+            enqueue_descriptor("asset", export["asset_id"])
+            return
+
+
+def compute_shape_descriptor(subject_type: str, subject_id: str):
+    """Compute the similarity-search descriptor of a model or model3d asset"""
+    # Imported here: only this task needs the descriptor table
+    from app.core.shape_index import compute_descriptor
+    
+    db: Session = SessionLocal()
+    try:
+        compute_descriptor(db, subject_type, subject_id)
+    except UnsupportedMeshFormat:
+        # .blend/.3dm/... files have no descriptor; nothing to index
+        pass
+    finally:
+        db.close()
+
+
+def enforce_retention():
+    """Scheduled: evict least recently used artifacts over quota, then queue the next run"""
+    from app.core.retention import enforce_quotas, schedule_retention
+    
+    db: Session = SessionLocal()
+    try:
+        return enforce_quotas(db)
+    finally:
+        db.close()
+        schedule_retention(reschedule=True)
+
+
+def archive_jobs():
+    """Scheduled: move finished jobs past JOB_ARCHIVE_AFTER_DAYS to the archive, then queue the next run"""
+    from app.core.job_archive import archive_finished, schedule_archival
+    
+    db: Session = SessionLocal()
+    try:
+        return archive_finished(db)
     finally:
         db.close()
+        schedule_archival(reschedule=True)
+
+
+# Blender-side exporter shared by generated and export-only scripts
+BLENDER_EXPORTER = '''def export_format(fmt, path):
+    """Export the scene's meshes as fmt (stl/obj/glb/fbx) or save it as a .blend"""
+    if fmt == "stl":
+        if "stl_export" in dir(bpy.ops.wm):  # Blender 4.1+
+            bpy.ops.wm.stl_export(filepath=path)
+        else:
+            bpy.ops.export_mesh.stl(filepath=path, use_selection=False)
+    elif fmt == "obj":
+        if "obj_export" in dir(bpy.ops.wm):  # Blender 3.2+
+            bpy.ops.wm.obj_export(filepath=path)
+        else:
+            bpy.ops.export_scene.obj(filepath=path)
+    elif fmt == "glb":
+        bpy.ops.export_scene.gltf(filepath=path, export_format='GLB')
+    elif fmt == "fbx":
+        bpy.ops.export_scene.fbx(filepath=path)
+    elif fmt == "blend":
+        bpy.ops.wm.save_as_mainfile(filepath=path, copy=True)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+'''
+
+
+def build_export_script(outputs: dict) -> str:
+    """Script for `blender -b geometry.blend -P script.py`: export the open file to {format: path}"""
+    return f'''"""
+MCP 3D Automation - Export-only Blender Script
+"""
+
+import bpy
+
+{BLENDER_EXPORTER}
+OUTPUTS = {outputs!r}
+
+for fmt, path in OUTPUTS.items():
+    print(f"Exporting {{fmt.upper()}} to: {{path}}")
+    export_format(fmt, path)
+
+print("SUCCESS: Export completed")
+'''
+
+
+# Blender-side cutter geometry: N cylinders as one vertex/face array, built
+# from a single shared ring of `segments` points (numpy only, no bpy)
+HOLE_CUTTERS = '''def cutter_arrays(centers, radius, depth, z, segments):
+    """Vertices (N*2*segments, 3) and faces of one closed cylinder per (x, y) center"""
+    n = len(centers)
+    ang = 2 * np.pi * np.arange(segments) / segments
+    ring = np.stack([np.cos(ang), np.sin(ang)], axis=1) * radius
+    co = np.empty((n, 2, segments, 3))
+    co[..., :2] = centers[:, None, None, :] + ring
+    co[:, 0, :, 2] = z - depth / 2
+    co[:, 1, :, 2] = z + depth / 2
+    s = np.arange(segments)
+    base = (np.arange(n) * 2 * segments)[:, None]
+    sides = np.stack([base + s, base + (s + 1) % segments,
+                      base + segments + (s + 1) % segments, base + segments + s], axis=-1)
+    bottom = base + s[::-1]
+    top = base + segments + s
+    faces = sides.reshape(-1, 4).tolist() + bottom.tolist() + top.tolist()
+    return co.reshape(-1, 3), faces
+'''
+
+BOOLEAN_SOLVERS = ("fast", "exact")
+# "auto" switches to the fast solver above this many holes (exact gets slow)
+AUTO_FAST_SOLVER_HOLES = 64
+DEFAULT_HOLE_SEGMENTS = 32
+MAX_HOLE_SEGMENTS = 256
+
+
+def resolve_boolean_solver(solver: Optional[str], hole_count: int) -> str:
+    """Blender boolean solver name ('FAST'/'EXACT') for a job's boolean_solver param"""
+    solver = (solver or "auto").lower()
+    if solver == "auto":
+        return "FAST" if hole_count > AUTO_FAST_SOLVER_HOLES else "EXACT"
+    if solver not in BOOLEAN_SOLVERS:
+        raise ValueError(f"Unknown boolean_solver: {solver!r} (use fast, exact or auto)")
+    return solver.upper()
+
+
+def check_hole_segments(segments) -> int:
+    segments = int(segments)
+    if not 3 <= segments <= MAX_HOLE_SEGMENTS:
+        raise ValueError(f"hole_segments must be between 3 and {MAX_HOLE_SEGMENTS}")
+    return segments
+
+
+# Bump when the geometry code in build_blender_script changes so old checkpoints are ignored
+STAGE_CACHE_VERSION = 2
+RENDER_SETTINGS = ("BLENDER_EEVEE", 1920, 1080)
+
+
+def stage_keys(
+    L: float, W: float, T: float,
+    hole_d: float, hole_count: int,
+    ring_radius: float, fillet_radius: float,
+    hole_segments: int = DEFAULT_HOLE_SEGMENTS, boolean_solver: str = "EXACT",
+) -> dict:
+    """
+    Checkpoint key per script stage.
+    
+    Each key hashes the parameters of its stage and of every stage before
+    it, so changing fillet_radius keeps the base and holes checkpoints valid.
+    """
+    holes = (float(hole_d), int(hole_count), float(ring_radius), int(hole_segments), boolean_solver)
+    if hole_count <= 0 or hole_d <= 0:
+        # No holes are cut, so the hole parameters don't affect the mesh
+        holes = (0.0, 0, 0.0, 0, "")
+    stages = {
+        "base": (float(L), float(W), float(T)),
+        "holes": holes,
+        "bevel": (float(fillet_radius),),
+    }
+    keys = {}
+    chain = f"v{STAGE_CACHE_VERSION}"
+    for stage, params in stages.items():
+        chain += repr(params)
+        keys[stage] = hashlib.sha1(chain.encode()).hexdigest()[:16]
+    keys["export"] = keys["bevel"]
+    keys["render"] = hashlib.sha1((chain + repr(RENDER_SETTINGS)).encode()).hexdigest()[:16]
+    return keys
 
 
 def build_blender_script(
     L: float, W: float, T: float,
     hole_d: float, hole_count: int,
     ring_radius: float, fillet_radius: float,
-    project_id: str
+    project_id: str,
+    render: bool = True,
+    checkpoint: bool = True,
+    formats: Optional[list[str]] = None,
+    save_blend: bool = True,
+    boolean_solver: str = "auto",
+    hole_segments: int = DEFAULT_HOLE_SEGMENTS,
 ) -> str:
-    """Build Blender Python script from dimensions"""
-    return f'''#!/usr/bin/env blender --python
+    """
+    Build Blender Python script from dimensions.
+    
+    formats (default: BLENDER_EXPORT_FORMAT) are exported in the same session
+    once the geometry is built; `-- --formats stl,obj` on the Blender command
+    line overrides them. save_blend also writes geometry_<project>.blend for
+    later export-only jobs. Holes are cut by one boolean with boolean_solver
+    ("fast", "exact" or "auto": fast above AUTO_FAST_SOLVER_HOLES holes)
+    against a single cutter mesh of hole_segments-sided cylinders. render=False skips the preview render. With
+    checkpoint=True each stage (base, holes, bevel, export, render) is cached
+    under .stage_cache/ next to the script, keyed by stage_keys(), and a
+    re-run resumes from the deepest stage whose parameters are unchanged.
+    """
+    solver = resolve_boolean_solver(boolean_solver, hole_count)
+    hole_segments = check_hole_segments(hole_segments)
+    keys = stage_keys(
+        L, W, T, hole_d, hole_count, ring_radius, fillet_radius,
+        hole_segments=hole_segments, boolean_solver=solver,
+    )
+    formats = resolve_formats(formats)
+    extensions = {name: f.extension for name, f in EXPORT_FORMATS.items()}
+    engine, res_x, res_y = RENDER_SETTINGS
+    script = f'''#!/usr/bin/env blender --python
 """
 MCP 3D Automation - Generated Blender Script
 Project ID: {project_id}
@@ -359,6 +1177,11 @@ Parameters:
 
 import bpy
 import math
+import os
+import shutil
+import sys
+import time
+import numpy as np
 from mathutils import Vector
 
 print("="*60)
@@ -373,11 +1196,111 @@ hole_d = {hole_d}
 hole_r = hole_d / 2.0
 hole_count = {hole_count}
 ring_radius = {ring_radius}
+HOLE_SEGMENTS = {hole_segments}
+BOOLEAN_SOLVER = '{solver}'
 fillet_r = {fillet_radius}
+RENDER = {render}
+
+# Export formats; `blender -b -P script.py -- --formats stl,obj` overrides them
+EXPORT_FORMATS = {formats!r}
+EXTENSIONS = {extensions!r}
+SAVE_BLEND = {save_blend}
+ARGV = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+if "--formats" in ARGV:
+    EXPORT_FORMATS = [f for f in ARGV[ARGV.index("--formats") + 1].split(",") if f]
 
 print(f"Dimensions: L={{L}}, W={{W}}, T={{T}}")
 print(f"Holes: {{hole_count}}x ø{{hole_d}} at R={{ring_radius}}")
 
+{HOLE_CUTTERS}
+# ===== Stage checkpoints =====
+# Keys hash each stage's parameters plus those of the stages before it
+CHECKPOINTS = {checkpoint}
+STAGE_KEYS = {keys!r}
+CACHE_DIR = bpy.path.abspath("//.stage_cache")
+CACHE_KEEP = 8  # checkpoints kept per stage
+if CHECKPOINTS:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+def checkpoint_path(stage, ext):
+    return os.path.join(CACHE_DIR, f"{{stage}}_{{STAGE_KEYS[stage]}}.{{ext}}")
+
+def has_checkpoint(stage, ext):
+    return CHECKPOINTS and os.path.exists(checkpoint_path(stage, ext))
+
+def save_mesh_checkpoint(stage, obj):
+    """Store the evaluated mesh (modifiers already applied) as flat arrays"""
+    if not CHECKPOINTS:
+        return
+    me = obj.data
+    co = np.empty(len(me.vertices) * 3, dtype=np.float64)
+    me.vertices.foreach_get("co", co)
+    totals = np.empty(len(me.polygons), dtype=np.int32)
+    me.polygons.foreach_get("loop_total", totals)
+    loops = np.empty(len(me.loops), dtype=np.int32)
+    me.loops.foreach_get("vertex_index", loops)
+    final = checkpoint_path(stage, "npz")
+    tmp = f"{{final}}.{{os.getpid()}}.tmp.npz"
+    np.savez(tmp, co=co, totals=totals, loops=loops)
+    os.replace(tmp, final)
+
+def load_mesh_checkpoint(stage):
+    data = np.load(checkpoint_path(stage, "npz"))
+    faces = np.split(data["loops"], np.cumsum(data["totals"])[:-1])
+    me = bpy.data.meshes.new("BasePlate")
+    me.from_pydata(data["co"].reshape(-1, 3).tolist(), [], [f.tolist() for f in faces])
+    me.update()
+    obj = bpy.data.objects.new("BasePlate", me)
+    bpy.context.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+    obj.select_set(True)
+    os.utime(checkpoint_path(stage, "npz"))
+    return obj
+
+def save_file_checkpoint(stage, ext, src):
+    if not CHECKPOINTS:
+        return
+    final = checkpoint_path(stage, ext)
+    tmp = f"{{final}}.{{os.getpid()}}.tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, final)
+
+def restore_file_checkpoint(stage, ext, dest):
+    shutil.copyfile(checkpoint_path(stage, ext), dest)
+    os.utime(checkpoint_path(stage, ext))
+
+def prune_checkpoints():
+    """Keep the CACHE_KEEP most recently used checkpoints of each stage (and file type)"""
+    by_stage = {{}}
+    for name in os.listdir(CACHE_DIR):
+        if ".tmp" in name:
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            group = (name.split("_", 1)[0], os.path.splitext(name)[1])
+            by_stage.setdefault(group, []).append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            pass
+    for entries in by_stage.values():
+        entries.sort(reverse=True)
+        for _, path in entries[CACHE_KEEP:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def stage_done(stage, started):
+    print(f"Stage {{stage}}: {{time.perf_counter() - started:.2f}}s")
+
+{BLENDER_EXPORTER}
+# format -> (checkpoint extension, output path)
+outputs = {{fmt: (EXTENSIONS[fmt][1:], bpy.path.abspath(f"//output_{project_id}{{EXTENSIONS[fmt]}}")) for fmt in EXPORT_FORMATS}}
+if SAVE_BLEND:
+    outputs["blend"] = ("blend", bpy.path.abspath("//{blend_filename(project_id)}"))
+render_path = bpy.path.abspath("//render_{project_id}.png")
+export_cached = all(has_checkpoint("export", ext) for ext, _ in outputs.values())
+render_cached = not RENDER or has_checkpoint("render", "png")
+
 # ===== Clean Scene =====
 print("Cleaning scene...")
 bpy.ops.object.select_all(action='SELECT')
@@ -388,101 +1311,130 @@ for block in bpy.data.meshes:
     if block.users == 0:
         bpy.data.meshes.remove(block)
 
-# ===== Create Base Plate =====
-print("Creating base plate...")
-bpy.ops.mesh.primitive_cube_add(size=1, location=(0, 0, T/2))
-plate = bpy.context.active_object
-plate.name = "BasePlate"
-plate.scale = (L/2, W/2, T/2)
-bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
-
-# ===== Create Hole Pattern =====
-if hole_count > 0 and hole_r > 0:
-    print(f"Creating {{hole_count}} holes...")
-    
-    # Create first hole cutter
-    bpy.ops.mesh.primitive_cylinder_add(
-        radius=hole_r,
-        depth=T * 3,
-        location=(ring_radius, 0, T/2)
-    )
-    cutter = bpy.context.active_object
-    cutter.name = "HoleCutter_0"
-    
-    # Duplicate around circle
-    cutters = [cutter]
-    for i in range(1, hole_count):
-        ang = (2 * math.pi) * (i / hole_count)
-        x = math.cos(ang) * ring_radius
-        y = math.sin(ang) * ring_radius
-        
-        dup = cutter.copy()
-        dup.data = cutter.data.copy()
-        dup.location = (x, y, T/2)
-        dup.name = f"HoleCutter_{{i}}"
-        bpy.context.collection.objects.link(dup)
-        cutters.append(dup)
-    
-    # Join all cutters
-    for obj in cutters:
-        obj.select_set(True)
-    bpy.context.view_layer.objects.active = cutter
-    bpy.ops.object.join()
-    joined_cutter = bpy.context.active_object
-    joined_cutter.name = "JoinedCutters"
+plate = None
+resume = None
+if not (export_cached and render_cached):
+    # Resume from the deepest valid mesh checkpoint
+    for stage in ("bevel", "holes", "base"):
+        if has_checkpoint(stage, "npz"):
+            print(f"Resuming from checkpoint: {{stage}}")
+            plate = load_mesh_checkpoint(stage)
+            resume = stage
+            break
+
+    # ===== Create Base Plate =====
+    if resume is None:
+        started = time.perf_counter()
+        print("Creating base plate...")
+        bpy.ops.mesh.primitive_cube_add(size=1, location=(0, 0, T/2))
+        plate = bpy.context.active_object
+        plate.name = "BasePlate"
+        plate.scale = (L/2, W/2, T/2)
+        bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
+        save_mesh_checkpoint("base", plate)
+        stage_done("base", started)
+
+    # ===== Create Hole Pattern =====
+    if resume in (None, "base"):
+        started = time.perf_counter()
+        if hole_count > 0 and hole_r > 0:
+            print(f"Creating {{hole_count}} holes...")
+            
+            # One mesh holding every cutter, tiled from a shared cylinder ring
+            # (no per-hole objects, mesh copies or join)
+            angles = 2 * np.pi * np.arange(hole_count) / hole_count
+            centers = np.stack([np.cos(angles), np.sin(angles)], axis=1) * ring_radius
+            co, faces = cutter_arrays(centers, hole_r, T * 3, T/2, HOLE_SEGMENTS)
+            cutter_mesh = bpy.data.meshes.new("HoleCutters")
+            cutter_mesh.from_pydata(co.tolist(), [], faces)
+            cutter_mesh.update()
+            cutter = bpy.data.objects.new("HoleCutters", cutter_mesh)
+            bpy.context.collection.objects.link(cutter)
+            
+            # Boolean difference
+            print(f"Applying boolean difference ({{BOOLEAN_SOLVER}} solver, {{HOLE_SEGMENTS}} segments)...")
+            plate.select_set(True)
+            bpy.context.view_layer.objects.active = plate
+            mod = plate.modifiers.new(name="HoleBoolean", type='BOOLEAN')
+            mod.operation = 'DIFFERENCE'
+            mod.object = cutter
+            if hasattr(mod, "solver"):  # Blender 2.91+
+                mod.solver = BOOLEAN_SOLVER
+            
+            bpy.ops.object.modifier_apply(modifier=mod.name)
+            
+            # Delete cutter
+            bpy.data.objects.remove(cutter, do_unlink=True)
+            bpy.data.meshes.remove(cutter_mesh)
+        save_mesh_checkpoint("holes", plate)
+        stage_done("holes", started)
+
+    # ===== Add Bevel (Fillet) =====
+    if resume != "bevel":
+        started = time.perf_counter()
+        if fillet_r > 0:
+            print(f"Adding bevel (fillet) with radius {{fillet_r}}...")
+            bpy.context.view_layer.objects.active = plate
+            bevel_mod = plate.modifiers.new(name="Bevel", type='BEVEL')
+            bevel_mod.width = fillet_r
+            bevel_mod.segments = 3
+            bevel_mod.limit_method = 'ANGLE'
+            bpy.ops.object.modifier_apply(modifier=bevel_mod.name)
+        save_mesh_checkpoint("bevel", plate)
+        stage_done("bevel", started)
+
+# ===== Export =====
+# Every format comes from this one session; the .blend lets export jobs add more later
+started = time.perf_counter()
+for fmt, (ext, path) in outputs.items():
+    print(f"Exporting {{fmt.upper()}} to: {{path}}")
+    if has_checkpoint("export", ext):
+        restore_file_checkpoint("export", ext, path)
+        print(f"{{fmt.upper()}} restored from checkpoint")
+    else:
+        export_format(fmt, path)
+        save_file_checkpoint("export", ext, path)
+stage_done("export", started)
+'''
+    if not render:
+        return script + '''
+if CHECKPOINTS:
+    prune_checkpoints()
+print("SUCCESS: Export completed")
+'''
+    return script + f'''
+# ===== Optional: Render Preview =====
+print(f"Rendering preview to: {{render_path}}")
+if render_cached:
+    restore_file_checkpoint("render", "png", render_path)
+    print("Render restored from checkpoint")
+else:
+    started = time.perf_counter()
+    print("Setting up render...")
+    bpy.context.scene.render.engine = '{engine}'
+    bpy.context.scene.render.resolution_x = {res_x}
+    bpy.context.scene.render.resolution_y = {res_y}
+    bpy.context.scene.render.film_transparent = True
     
-    # Boolean difference
-    print("Applying boolean difference...")
-    plate.select_set(True)
-    bpy.context.view_layer.objects.active = plate
-    mod = plate.modifiers.new(name="HoleBoolean", type='BOOLEAN')
-    mod.operation = 'DIFFERENCE'
-    mod.object = joined_cutter
+    # Add camera
+    bpy.ops.object.camera_add(location=(L*1.5, -W*1.5, L*0.8))
+    camera = bpy.context.active_object
+    camera.rotation_euler = (math.radians(60), 0, math.radians(45))
+    bpy.context.scene.camera = camera
     
-    bpy.ops.object.modifier_apply(modifier=mod.name)
+    # Add light
+    bpy.ops.object.light_add(type='SUN', location=(L, -W, L*2))
+    light = bpy.context.active_object
+    light.data.energy = 3.0
     
-    # Delete cutter
-    joined_cutter.select_set(True)
-    bpy.ops.object.delete(use_global=False)
-
-# ===== Add Bevel (Fillet) =====
-if fillet_r > 0:
-    print(f"Adding bevel (fillet) with radius {{fillet_r}}...")
-    bpy.context.view_layer.objects.active = plate
-    bevel_mod = plate.modifiers.new(name="Bevel", type='BEVEL')
-    bevel_mod.width = fillet_r
-    bevel_mod.segments = 3
-    bevel_mod.limit_method = 'ANGLE'
-    bpy.ops.object.modifier_apply(modifier=bevel_mod.name)
-
-# ===== Export STL =====
-output_stl = bpy.path.abspath("//output_{project_id}.stl")
-print(f"Exporting STL to: {{output_stl}}")
-bpy.ops.export_mesh.stl(filepath=output_stl, use_selection=False)
+    # Render
+    bpy.context.scene.render.filepath = render_path
+    bpy.ops.render.render(write_still=True)
+    save_file_checkpoint("render", "png", render_path)
+    stage_done("render", started)
 
-# ===== Optional: Render Preview =====
-print("Setting up render...")
-bpy.context.scene.render.engine = 'BLENDER_EEVEE'
-bpy.context.scene.render.resolution_x = 1920
-bpy.context.scene.render.resolution_y = 1080
-bpy.context.scene.render.film_transparent = True
-
-# Add camera
-bpy.ops.object.camera_add(location=(L*1.5, -W*1.5, L*0.8))
-camera = bpy.context.active_object
-camera.rotation_euler = (math.radians(60), 0, math.radians(45))
-bpy.context.scene.camera = camera
-
-# Add light
-bpy.ops.object.light_add(type='SUN', location=(L, -W, L*2))
-light = bpy.context.active_object
-light.data.energy = 3.0
-
-# Render
-render_path = bpy.path.abspath("//render_{project_id}.png")
-print(f"Rendering preview to: {{render_path}}")
-bpy.context.scene.render.filepath = render_path
-bpy.ops.render.render(write_still=True)
+if CHECKPOINTS:
+    prune_checkpoints()
 
 print("="*60)
 print("SUCCESS: Export and render completed")
@@ -0,0 +1,260 @@
+"""
+RQ worker entry point.
+
+    python -m app.workers.worker [queue ...] [--burst]
+    python -m app.workers.worker --mode persistent --processes 4
+
+fork mode (default) is a regular RQ worker that forks a work horse per job.
+Task modules, ORM mappers, the DB engine/driver and the Redis connection are
+set up once in the parent. Every forked work horse inherits them instead of
+repeating the imports per job. The connection pool is disposed in the child
+after fork (see app.core.database), so no socket is shared between processes.
+
+persistent mode runs jobs inside long-lived processes (no fork per job), so
+the SQLAlchemy pool, imported modules and caches stay warm across jobs. Each
+process is recycled after WORKER_MAX_JOBS jobs or once its RSS exceeds
+WORKER_MAX_RSS_MB, and a supervisor restarts it. Per-job overhead (time
+spent outside the task function) is logged and stored in the RQ job meta.
+
+Both modes record each job's wall time for admission control
+(app.core.admission), which estimates queue waits from them.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from app.core.admission import record_run_time
+from app.core.config import settings
+from app.core.database import get_engine
+from app.core.job_archive import schedule_archival
+from app.core.queue import get_queue, get_redis
+from app.core.retention import schedule_retention
+
+logger = logging.getLogger(__name__)
+
+
+def preload() -> float:
+    """Warm everything a job needs before the first fork; returns seconds spent"""
+    start = time.perf_counter()
+    
+    # Task code and the models it touches
+    import app.workers.tasks  # noqa: F401
+    from sqlalchemy.orm import configure_mappers
+    
+    configure_mappers()
+    
+    # Loads the DB dialect/driver; connections are dropped again in children
+    get_engine()
+    get_redis().ping()
+    
+    return time.perf_counter() - start
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MiB (0.0 if unknown)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class JobOverheadStats:
+    """Running totals of job wall time vs time spent in the task itself"""
+    
+    def __init__(self):
+        self.jobs = 0
+        self.wall_seconds = 0.0
+        self.overhead_seconds = 0.0
+    
+    def record(self, wall: float, overhead: float):
+        self.jobs += 1
+        self.wall_seconds += wall
+        self.overhead_seconds += overhead
+    
+    def summary(self) -> str:
+        if not self.jobs:
+            return "no jobs run"
+        return (
+            f"{self.jobs} jobs, mean wall {self.wall_seconds / self.jobs * 1000:.1f}ms, "
+            f"mean overhead {self.overhead_seconds / self.jobs * 1000:.1f}ms"
+        )
+
+
+def _record_run_time(job, seconds: float) -> None:
+    try:
+        record_run_time(job.func_name, seconds)
+    except Exception:
+        # Admission estimates are best effort; never fail the worker over them
+        logger.debug("could not record run time of job %s", job.id, exc_info=True)
+
+
+def forking_worker_class():
+    """Build the regular forking worker class (rq is imported lazily)"""
+    from rq import Worker
+    
+    class TimedWorker(Worker):
+        """Forks a work horse per job and records how long each job kept it busy"""
+        
+        def execute_job(self, job, queue):
+            start = time.perf_counter()
+            result = super().execute_job(job, queue)
+            _record_run_time(job, time.perf_counter() - start)
+            return result
+    
+    return TimedWorker
+
+
+def persistent_worker_class():
+    """Build the non-forking worker class (rq is imported lazily)"""
+    from rq import SimpleWorker
+    
+    class PersistentWorker(SimpleWorker):
+        """Runs jobs in this process and keeps pools/modules warm between them"""
+        
+        max_rss_mb = 0
+        
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.overhead = JobOverheadStats()
+        
+        def execute_job(self, job, queue):
+            start = time.perf_counter()
+            result = super().execute_job(job, queue)
+            wall = time.perf_counter() - start
+            
+            run = wall
+            if job.started_at and job.ended_at:
+                run = (job.ended_at - job.started_at).total_seconds()
+            overhead = max(0.0, wall - run)
+            self.overhead.record(wall, overhead)
+            _record_run_time(job, wall)
+            logger.info(
+                "job %s (%s): wall %.1fms, overhead %.1fms",
+                job.id, job.func_name, wall * 1000, overhead * 1000,
+            )
+            try:
+                job.meta["worker_overhead_ms"] = round(overhead * 1000, 3)
+                job.meta["worker_pid"] = os.getpid()
+                job.save_meta()
+            except Exception:
+                # The job may already have expired from Redis; stats are best effort
+                pass
+            
+            rss = current_rss_mb()
+            if self.max_rss_mb and rss > self.max_rss_mb:
+                logger.warning("RSS %.0f MiB exceeds %d MiB, recycling worker", rss, self.max_rss_mb)
+                self._stop_requested = True
+            return result
+    
+    return PersistentWorker
+
+
+def run_persistent(queues: list[str], max_jobs: int, max_rss_mb: int, burst: bool, log_level: str) -> None:
+    """Run one long-lived, non-forking worker until recycled"""
+    worker_class = persistent_worker_class()
+    worker_class.max_rss_mb = max_rss_mb
+    worker = worker_class(
+        [get_queue(name) for name in queues],
+        connection=get_redis(),
+    )
+    try:
+        worker.work(burst=burst, max_jobs=max_jobs or None, logging_level=log_level, with_scheduler=True)
+    finally:
+        logger.info("worker %s exiting: %s", os.getpid(), worker.overhead.summary())
+
+
+def _persistent_child(queues, max_jobs, max_rss_mb, burst, log_level):
+    logging.basicConfig(level=log_level)
+    run_persistent(queues, max_jobs, max_rss_mb, burst, log_level)
+
+
+def supervise(processes: int, queues: list[str], max_jobs: int, max_rss_mb: int, burst: bool, log_level: str):
+    """Keep `processes` persistent workers alive, replacing each one that recycles"""
+    # Fork where available so children inherit the preloaded modules
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    ctx = multiprocessing.get_context(method)
+    args = (queues, max_jobs, max_rss_mb, burst, log_level)
+    children: list = [None] * processes
+    stopping = False
+    
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    
+    try:
+        while not stopping:
+            for i, child in enumerate(children):
+                if child is not None and child.is_alive():
+                    continue
+                if child is not None:
+                    child.join()
+                    if burst and not any(len(get_queue(name)) for name in queues):
+                        continue
+                    logger.info("worker %s exited (code %s), starting a replacement", child.pid, child.exitcode)
+                children[i] = ctx.Process(target=_persistent_child, args=args, daemon=False)
+                children[i].start()
+            if burst and all(c is not None and not c.is_alive() for c in children):
+                break
+            time.sleep(0.5)
+    finally:
+        for child in children:
+            if child is not None and child.is_alive():
+                # RQ treats SIGTERM as a warm shutdown: finish the current job
+                child.terminate()
+        for child in children:
+            if child is not None:
+                child.join()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run RQ workers with preloaded task code")
+    parser.add_argument("queues", nargs="*", default=[settings.RQ_QUEUE_NAME])
+    parser.add_argument("--burst", action="store_true", help="exit when the queues are empty")
+    parser.add_argument("--name", default=None, help="worker name (fork mode)")
+    parser.add_argument("--mode", choices=["fork", "persistent"], default=settings.WORKER_MODE)
+    parser.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES)
+    parser.add_argument("--max-jobs", type=int, default=settings.WORKER_MAX_JOBS)
+    parser.add_argument("--max-rss-mb", type=int, default=settings.WORKER_MAX_RSS_MB)
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=args.log_level)
+    elapsed = preload()
+    logger.info("Preloaded task code and connections in %.3fs", elapsed)
+    
+    # Periodic retention runs through the RQ scheduler the workers below start
+    if schedule_retention():
+        logger.info("Scheduled artifact retention every %d minutes", settings.RETENTION_INTERVAL_MINUTES)
+    if schedule_archival():
+        logger.info("Scheduled job archival every %d minutes", settings.JOB_ARCHIVE_INTERVAL_MINUTES)
+    
+    if args.mode == "persistent":
+        # Even a single process needs the supervisor to replace it when it recycles
+        supervise(max(1, args.processes), args.queues, args.max_jobs, args.max_rss_mb, args.burst, args.log_level)
+        return
+    
+    worker = forking_worker_class()(
+        [get_queue(name) for name in args.queues],
+        connection=get_redis(),
+        name=args.name,
+    )
+    worker.work(burst=args.burst, logging_level=args.log_level, with_scheduler=True)
+
+
+if __name__ == "__main__":
+    main()
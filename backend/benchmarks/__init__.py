@@ -0,0 +1 @@
+"""Benchmark suite: fake Blender, microbenchmarks and a job load generator"""
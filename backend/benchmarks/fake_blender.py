@@ -0,0 +1,150 @@
+"""
+Stand-in for the Blender executable used by the benchmark suite.
+
+Accepts the same command line the workers use (`blender -b -P script.py
+-- --formats stl,obj`), sleeps for a configurable startup and run time, and
+writes every `bpy.path.abspath("//...")` target the script references
+(one output per export format) so the worker finds the files it expects.
+Packed runs (app.workers.packing) pay the startup once and then run each
+job's script from its own directory, recording outcomes like the real
+runner.
+
+Environment:
+    FAKE_BLENDER_STARTUP_SECONDS   simulated process startup (default 0.3)
+    FAKE_BLENDER_RUN_SECONDS       simulated modeling time (default 0.2)
+    FAKE_BLENDER_SECONDS_PER_HOLE  extra time per hole in `hole_count = N` (default 0)
+    FAKE_BLENDER_FAIL_RATE         probability of exiting with code 1 (default 0)
+"""
+import json
+import os
+import random
+import re
+import struct
+import sys
+import time
+from pathlib import Path
+
+ABSPATH_RE = re.compile(r'bpy\.path\.abspath\(\s*f?["\']//([^"\']+)["\']\s*\)')
+HOLE_COUNT_RE = re.compile(r"^hole_count\s*=\s*(\d+)", re.MULTILINE)
+FORMATS_RE = re.compile(r"^EXPORT_FORMATS\s*=\s*\[([^\]]*)\]", re.MULTILINE)
+# f"//output_<project>{EXTENSIONS[fmt]}": one file per export format
+EXPORT_PATH_RE = re.compile(r'bpy\.path\.abspath\(\s*f["\']//([^"\'{]+)\{EXTENSIONS\[fmt\]\}["\']\s*\)')
+
+# 1x1 transparent PNG
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _cube_stl(size: float = 20.0) -> bytes:
+    """Binary STL of an axis-aligned cube (12 triangles)"""
+    s = size
+    v = [(0, 0, 0), (s, 0, 0), (s, s, 0), (0, s, 0), (0, 0, s), (s, 0, s), (s, s, s), (0, s, s)]
+    faces = [
+        (0, 2, 1), (0, 3, 2), (4, 5, 6), (4, 6, 7), (0, 1, 5), (0, 5, 4),
+        (1, 2, 6), (1, 6, 5), (2, 3, 7), (2, 7, 6), (3, 0, 4), (3, 4, 7),
+    ]
+    out = bytearray(b"fake blender benchmark mesh".ljust(80, b"\0"))
+    out += struct.pack("<I", len(faces))
+    for a, b, c in faces:
+        out += struct.pack("<3f", 0.0, 0.0, 0.0)
+        for idx in (a, b, c):
+            out += struct.pack("<3f", *v[idx])
+        out += struct.pack("<H", 0)
+    return bytes(out)
+
+
+def _write_output(path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = path.suffix.lower()
+    if suffix == ".stl":
+        path.write_bytes(_cube_stl())
+    elif suffix == ".png":
+        path.write_bytes(PNG_BYTES)
+    else:
+        path.write_text("fake blender output\n", encoding="utf-8")
+
+
+def _formats(script: str, args: list[str]) -> list[str]:
+    if "--formats" in args:
+        return [f for f in args[args.index("--formats") + 1].split(",") if f]
+    match = FORMATS_RE.search(script)
+    if match:
+        return [f.strip().strip("'\"") for f in match.group(1).split(",") if f.strip()]
+    return ["stl"]
+
+
+def run_script(script_path: Path, args: list[str]) -> int:
+    """Pretend to run one generated script from the current directory"""
+    script = script_path.read_text(encoding="utf-8")
+    
+    run_seconds = _env_float("FAKE_BLENDER_RUN_SECONDS", 0.2)
+    match = HOLE_COUNT_RE.search(script)
+    if match:
+        run_seconds += int(match.group(1)) * _env_float("FAKE_BLENDER_SECONDS_PER_HOLE", 0.0)
+    time.sleep(run_seconds)
+    
+    if random.random() < _env_float("FAKE_BLENDER_FAIL_RATE", 0.0):
+        print("Error: simulated Blender failure", file=sys.stderr)
+        return 1
+    
+    # Skip unresolved f-string placeholders and directories (.stage_cache)
+    targets = [rel for rel in ABSPATH_RE.findall(script) if "{" not in rel and Path(rel).suffix]
+    for stem in EXPORT_PATH_RE.findall(script):
+        targets.extend(f"{stem}.{fmt}" for fmt in _formats(script, args))
+    for rel in targets:
+        target = Path.cwd() / rel
+        _write_output(target)
+        print("OK_EXPORT:", target)
+    
+    print("SUCCESS: fake Blender run completed")
+    return 0
+
+
+def run_pack(manifest_path: Path) -> int:
+    """Packed run: every job's script in turn, outcomes appended to the status file"""
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    marker = manifest["marker"]
+    for item in manifest["jobs"]:
+        print(f"{marker} begin {item['job_id']}", flush=True)
+        started = time.perf_counter()
+        os.chdir(item["cwd"])
+        code = run_script(Path(item["script"]), item["args"])
+        outcome = {
+            "job_id": item["job_id"],
+            "ok": code == 0,
+            "error": None if code == 0 else "simulated Blender failure",
+            "seconds": time.perf_counter() - started,
+        }
+        with open(manifest["status"], "a", encoding="utf-8") as f:
+            f.write(json.dumps(outcome) + "\n")
+        print(f"{marker} end {item['job_id']}", flush=True)
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    if "--version" in argv:
+        print("Blender 4.2.0 (fake benchmark build)")
+        return 0
+    
+    time.sleep(_env_float("FAKE_BLENDER_STARTUP_SECONDS", 0.3))
+    
+    if "-P" not in argv:
+        return 0
+    script_path = Path(argv[argv.index("-P") + 1])
+    args = argv[argv.index("--") + 1:] if "--" in argv else []
+    if script_path.name == "runner.py" and args and args[0].endswith("manifest.json"):
+        return run_pack(Path(args[0]))
+    return run_script(script_path, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,267 @@
+"""
+Benchmark harness.
+
+Runs the FastAPI app in-process, RQ workers in threads and the fake Blender
+executable against throwaway storage. Redis is an in-memory fakeredis server
+unless a real REDIS_URL is given; the database is a temporary SQLite file
+unless DATABASE_URL points elsewhere (e.g. a scratch Postgres).
+
+configure_environment() must be called before anything under `app` is
+imported, because settings are read at import time.
+"""
+import contextvars
+import math
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+
+WORKER_THREAD_PREFIX = "bench-worker"
+
+
+def configure_environment(
+    database_url: Optional[str] = None,
+    redis_url: Optional[str] = None,
+    blender_startup: float = 0.3,
+    blender_run: float = 0.2,
+    root: Optional[str] = None,
+) -> Path:
+    """Point the app's settings at scratch storage and the fake Blender"""
+    root_dir = Path(root or tempfile.mkdtemp(prefix="mcp3d-bench-"))
+    root_dir.mkdir(parents=True, exist_ok=True)
+    
+    env = {
+        "APP_ENV": "bench",
+        "DATABASE_URL": database_url or f"sqlite:///{root_dir / 'bench.db'}",
+        "LOCAL_UPLOAD_DIR": str(root_dir / "uploads"),
+        "LOCAL_OUTPUT_DIR": str(root_dir / "outputs"),
+        "BLENDER_WORKDIR": str(root_dir / "outputs"),
+        "BLENDER_EXEC_MODE": "server_headless",
+        "BLENDER_PATH": str(_write_blender_launcher(root_dir)),
+        "FAKE_BLENDER_STARTUP_SECONDS": str(blender_startup),
+        "FAKE_BLENDER_RUN_SECONDS": str(blender_run),
+    }
+    if redis_url:
+        env["REDIS_URL"] = redis_url
+    os.environ.update(env)
+    
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    return root_dir
+
+
+def _write_blender_launcher(root_dir: Path) -> Path:
+    """BLENDER_PATH must be a single executable, so wrap fake_blender.py"""
+    fake = BENCH_DIR / "fake_blender.py"
+    if sys.platform == "win32":
+        launcher = root_dir / "blender.cmd"
+        launcher.write_text(f'@"{sys.executable}" "{fake}" %*\r\n', encoding="utf-8")
+    else:
+        launcher = root_dir / "blender"
+        launcher.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake}" "$@"\n', encoding="utf-8")
+        launcher.chmod(launcher.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return launcher
+
+
+# Per-request statement counter, propagated from the middleware into the
+# threadpool that runs sync endpoints (contextvars are copied there)
+_request_queries: contextvars.ContextVar = contextvars.ContextVar("bench_request_queries", default=None)
+
+
+class QueryCounter:
+    """Counts SQL statements: per API request, and totals for API vs worker threads"""
+    
+    def __init__(self, engine):
+        from sqlalchemy import event
+        
+        self._lock = threading.Lock()
+        self.api = 0
+        self.worker = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+    
+    def _on_execute(self, *args, **kwargs):
+        box = _request_queries.get()
+        if box is not None:
+            box[0] += 1
+        is_worker = threading.current_thread().name.startswith(WORKER_THREAD_PREFIX)
+        with self._lock:
+            if is_worker:
+                self.worker += 1
+            else:
+                self.api += 1
+
+
+def install_query_header(app):
+    """Report each request's SQL statement count in an X-DB-Queries header"""
+    
+    @app.middleware("http")
+    async def count_queries(request, call_next):
+        box = [0]
+        token = _request_queries.set(box)
+        try:
+            response = await call_next(request)
+        finally:
+            _request_queries.reset(token)
+        response.headers["X-DB-Queries"] = str(box[0])
+        return response
+
+
+class WorkerPool:
+    """Non-forking RQ workers running in daemon threads against the shared connection"""
+    
+    def __init__(self, connection, queue_names: list[str], size: int = 2):
+        from rq import Queue
+        from rq.timeouts import TimerDeathPenalty
+        from app.workers.worker import persistent_worker_class
+        
+        # Same non-forking worker as `--mode persistent`, so per-job overhead
+        # lands in job.meta["worker_overhead_ms"]
+        class ThreadWorker(persistent_worker_class()):
+            # SIGALRM-based timeouts and signal handlers only work on the main thread
+            death_penalty_class = TimerDeathPenalty
+            
+            def _install_signal_handlers(self):
+                pass
+        
+        self._connection = connection
+        self._queues = [Queue(name, connection=connection) for name in queue_names]
+        self._worker_class = ThreadWorker
+        self._size = size
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+    
+    def _loop(self, index: int):
+        worker = self._worker_class(
+            self._queues, connection=self._connection, name=f"{WORKER_THREAD_PREFIX}-{index}-{os.getpid()}"
+        )
+        while not self._stop.is_set():
+            worker.work(burst=True, logging_level="WARNING")
+            # Burst mode returns on an empty queue; poll again shortly
+            time.sleep(0.005)
+    
+    def start(self):
+        for i in range(self._size):
+            t = threading.Thread(target=self._loop, args=(i,), name=f"{WORKER_THREAD_PREFIX}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+    
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+
+
+class Bench:
+    """Everything a benchmark needs: API client, Redis, workers and counters"""
+    
+    def __init__(self, redis_url: Optional[str] = None, workers: int = 0):
+        import fakeredis
+        import redis
+        from app.core import queue as queue_module
+        from app.core.config import settings
+        
+        if redis_url:
+            self.redis = redis.from_url(redis_url)
+        else:
+            self.redis = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        
+        queue_module.use_connection(self.redis)
+        self.queue = queue_module.get_queue()
+        
+        from fastapi.testclient import TestClient
+        from app.core.database import get_engine
+        from app.main import app
+        
+        engine = get_engine()
+        create_schema(engine)
+        self.engine = engine
+        self.queries = QueryCounter(engine)
+        if not getattr(app.state, "bench_query_header", False):
+            install_query_header(app)
+            app.state.bench_query_header = True
+        self.client = TestClient(app)
+        self.workers = WorkerPool(self.redis, [settings.RQ_QUEUE_NAME], size=workers) if workers else None
+    
+    def __enter__(self):
+        if self.workers:
+            self.workers.start()
+        return self
+    
+    def __exit__(self, *exc):
+        if self.workers:
+            self.workers.stop()
+        self.client.close()
+    
+    def seed_project(self, name: str = "bench", reference_mm: float = 120.0) -> str:
+        """Create a project with a scale reference; returns project_id"""
+        project = self.client.post("/api/v1/projects", json={"name": name}).json()
+        self.client.post(
+            "/api/v1/extraction/scale-reference",
+            json={
+                "project_id": project["id"],
+                "reference_name": "overall_length_mm",
+                "reference_value": reference_mm,
+                "unit": "mm",
+            },
+        )
+        return project["id"]
+    
+    def wait_for_jobs(self, job_ids: list[str], timeout: float = 300.0) -> list[dict]:
+        """Poll the API until every job has finished"""
+        deadline = time.monotonic() + timeout
+        pending = set(job_ids)
+        done: dict[str, dict] = {}
+        while pending and time.monotonic() < deadline:
+            for job_id in list(pending):
+                job = self.client.get(f"/api/v1/jobs/{job_id}").json()
+                if job["status"] in ("succeeded", "failed", "cancelled"):
+                    done[job_id] = job
+                    pending.discard(job_id)
+            if pending:
+                time.sleep(0.02)
+        if pending:
+            raise TimeoutError(f"{len(pending)} jobs still pending after {timeout}s")
+        return [done[job_id] for job_id in job_ids]
+
+
+def create_schema(engine):
+    """Create all tables (the benchmark database is always throwaway)"""
+    from app.models.base import Base
+    from app.models.project import Project  # noqa: F401
+    from app.models.asset import Asset  # noqa: F401
+    from app.models.scale_reference import ScaleReference  # noqa: F401
+    from app.models.extraction_result import ExtractionResult  # noqa: F401
+    from app.models.script_version import ScriptVersion  # noqa: F401
+    from app.models.job import Job  # noqa: F401
+    
+    Base.metadata.create_all(engine)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def summarize(values: list[float]) -> dict:
+    """mean/p50/p95/p99/max of a sample, rounded for reports"""
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean": round(sum(values) / len(values), 6),
+        "p50": round(percentile(values, 50), 6),
+        "p95": round(percentile(values, 95), 6),
+        "p99": round(percentile(values, 99), 6),
+        "max": round(max(values), 6),
+    }
@@ -0,0 +1,145 @@
+"""
+Hole-pattern scaling benchmark.
+
+    python -m benchmarks.holes                                # cutter geometry only (no Blender)
+    python -m benchmarks.holes --blender /usr/bin/blender     # full generated scripts
+    python -m benchmarks.holes --blender blender --counts 64 1024 4096 --solvers fast
+
+Without --blender it times cutter_arrays (the numpy half of the hole
+stage) and script generation per hole count. With --blender it runs the
+generated script (no render, no checkpoints) for every hole count and
+solver and reports the holes stage time printed by the script plus the
+whole Blender run.
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import configure_environment, summarize
+
+DEFAULT_COUNTS = (8, 64, 256, 1024, 4096)
+STAGE_RE = re.compile(r"^Stage (\w+): ([\d.]+)s$", re.MULTILINE)
+
+
+def _plate(hole_count: int) -> dict:
+    # Ring of holes whose diameter shrinks with the count so they never overlap
+    ring_radius = 40.0
+    return {
+        "L": 120.0, "W": 120.0, "T": 3.0,
+        "hole_d": min(8.0, 0.8 * 2 * 3.14159 * ring_radius / hole_count),
+        "hole_count": hole_count,
+        "ring_radius": ring_radius,
+        "fillet_radius": 0.0,
+    }
+
+
+def bench_cutter_arrays(counts, segments: int, repeat: int) -> dict:
+    import numpy as np
+    from app.workers.tasks import HOLE_CUTTERS
+    
+    namespace = {"np": np}
+    exec(HOLE_CUTTERS, namespace)
+    cutter_arrays = namespace["cutter_arrays"]
+    
+    results = {}
+    for count in counts:
+        p = _plate(count)
+        angles = 2 * np.pi * np.arange(count) / count
+        centers = np.stack([np.cos(angles), np.sin(angles)], axis=1) * p["ring_radius"]
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cutter_arrays(centers, p["hole_d"] / 2, p["T"] * 3, p["T"] / 2, segments)
+            samples.append(time.perf_counter() - start)
+        results[f"cutter_arrays[holes={count},segments={segments}]"] = summarize(samples)
+    return results
+
+
+def bench_script_generation(counts, repeat: int) -> dict:
+    from app.workers.tasks import build_blender_script
+    
+    results = {}
+    for count in counts:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            build_blender_script(**_plate(count), project_id="bench", render=False, checkpoint=False)
+            samples.append(time.perf_counter() - start)
+        results[f"build_blender_script[holes={count}]"] = summarize(samples)
+    return results
+
+
+def bench_blender(blender: str, counts, solvers, segments: int, timeout: float) -> dict:
+    from app.workers.tasks import build_blender_script
+    
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="mcp3d-holes-") as workdir:
+        for solver in solvers:
+            for count in counts:
+                name = f"blender[holes={count},solver={solver},segments={segments}]"
+                script = Path(workdir) / f"holes_{solver}_{count}.py"
+                script.write_text(
+                    build_blender_script(
+                        **_plate(count), project_id=f"{solver}_{count}", render=False, checkpoint=False,
+                        formats=["stl"], save_blend=False, boolean_solver=solver, hole_segments=segments,
+                    ),
+                    encoding="utf-8",
+                )
+                start = time.perf_counter()
+                try:
+                    proc = subprocess.run(
+                        [blender, "-b", "--factory-startup", "-P", str(script)],
+                        cwd=workdir, capture_output=True, text=True, timeout=timeout,
+                    )
+                except subprocess.TimeoutExpired:
+                    results[name] = {"error": f"timed out after {timeout:.0f}s"}
+                    continue
+                total = time.perf_counter() - start
+                stages = {stage: float(seconds) for stage, seconds in STAGE_RE.findall(proc.stdout)}
+                if proc.returncode != 0 or "holes" not in stages:
+                    results[name] = {"error": (proc.stderr or proc.stdout)[-300:]}
+                    continue
+                results[name] = {"holes_s": stages["holes"], "total_s": total}
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=list(DEFAULT_COUNTS))
+    parser.add_argument("--segments", type=int, default=32)
+    parser.add_argument("--solvers", nargs="+", choices=["fast", "exact"], default=["fast", "exact"])
+    parser.add_argument("--repeat", type=int, default=5, help="repeats for the in-process benchmarks")
+    parser.add_argument("--blender", default=None, help="Blender executable; runs the full scripts")
+    parser.add_argument("--timeout", type=float, default=300, help="per Blender run (the job timeout)")
+    parser.add_argument("--json", dest="json_out", default=None, help="write results to this file")
+    args = parser.parse_args(argv)
+    
+    configure_environment()
+    
+    if args.blender:
+        results = bench_blender(args.blender, args.counts, args.solvers, args.segments, args.timeout)
+    else:
+        results = bench_cutter_arrays(args.counts, args.segments, args.repeat)
+        results.update(bench_script_generation(args.counts, args.repeat))
+    
+    width = max(len(name) for name in results)
+    for name, stats in results.items():
+        if "error" in stats:
+            print(f"{name:<{width}}  ERROR {stats['error']}")
+        elif "holes_s" in stats:
+            print(f"{name:<{width}}  holes={stats['holes_s']:8.2f}s  total={stats['total_s']:8.2f}s")
+        else:
+            print(f"{name:<{width}}  p50={stats['p50'] * 1000:9.3f}ms  p95={stats['p95'] * 1000:9.3f}ms  n={stats['n']}")
+    
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 1 if any("error" in stats for stats in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Import-time profile of the API and worker processes.
+
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --target worker --top 40
+
+Runs `python -X importtime` in a fresh interpreter, then reports total cold
+import time, the slowest modules (cumulative and self time) and the top-level
+packages that dominate. For the API target it also lists any worker-only
+modules that leaked into the import graph.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from benchmarks.harness import BACKEND_DIR
+
+TARGETS = {
+    "api": "import app.main",
+    "worker": "import app.workers.worker, app.workers.tasks",
+}
+
+# Must never be imported just to serve HTTP
+WORKER_ONLY_MODULES = ("app.workers.tasks", "app.workers.process", "rq.worker")
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(statement: str) -> list[tuple[str, int, int, int]]:
+    """Return (module, self_us, cumulative_us, depth) rows from -X importtime"""
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=str(BACKEND_DIR),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def report(target: str, top: int) -> int:
+    rows = profile(TARGETS[target])
+    total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    modules = {module for module, *_ in rows}
+    
+    print(f"== {target}: {TARGETS[target]!r}")
+    print(f"total cold import: {total_us / 1000:.1f} ms across {len(rows)} modules\n")
+    
+    print(f"slowest by cumulative time (top {top}):")
+    for module, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {module}")
+    
+    per_package = defaultdict(int)
+    for module, self_us, _, _ in rows:
+        per_package[module.split(".")[0]] += self_us
+    print("\nself time by top-level package:")
+    for package, self_us in sorted(per_package.items(), key=lambda kv: kv[1], reverse=True)[:15]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+    
+    if target == "api":
+        leaked = [m for m in WORKER_ONLY_MODULES if m in modules]
+        print("\nworker-only modules imported by the API:", ", ".join(leaked) if leaked else "none")
+        return 1 if leaked else 0
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["api", "worker", "all"], default="all")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+    
+    status = 0
+    for target in (TARGETS if args.target == "all" else [args.target]):
+        status |= report(target, args.top)
+        print()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Job load generator.
+
+Submits a burst of jobs through POST /api/v1/jobs from concurrent clients,
+lets in-process RQ workers drain them through the fake Blender, and reports
+job throughput, queue latency / run time percentiles and SQL statements per
+API request.
+
+    python -m benchmarks.load --jobs 200 --clients 8 --workers 4
+    python -m benchmarks.load --blender-startup 0.8 --blender-run 0.1 --mix run_blender=1
+    python -m benchmarks.load --database-url postgresql+psycopg2://... --redis-url redis://localhost:6379/15
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.harness import configure_environment, summarize
+
+FINISHED_RQ_STATUSES = ("finished", "failed", "canceled", "stopped")
+
+
+def _parse_mix(text: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+def _prepare_projects(bench, count: int) -> list[str]:
+    """Projects with extraction + script already done so run_blender jobs have work"""
+    project_ids = [bench.seed_project(name=f"load-{i}") for i in range(count)]
+    for job_type in ("extract", "generate_script"):
+        ids = [
+            bench.client.post("/api/v1/jobs", json={"project_id": pid, "job_type": job_type}).json()["id"]
+            for pid in project_ids
+        ]
+        bench.wait_for_jobs(ids)
+    return project_ids
+
+
+def _wait_rq(bench, job_ids: list[str], timeout: float) -> list:
+    from rq.job import Job as RQJob
+    
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = [j for j in RQJob.fetch_many(job_ids, connection=bench.redis) if j is not None]
+        if all(j.get_status() in FINISHED_RQ_STATUSES for j in jobs):
+            return jobs
+        time.sleep(0.05)
+    raise TimeoutError(f"jobs still running after {timeout}s")
+
+
+def run_load(args) -> dict:
+    from benchmarks.harness import Bench
+    
+    mix = _parse_mix(args.mix)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    rng = random.Random(args.seed)
+    
+    with Bench(redis_url=args.redis_url, workers=args.workers) as bench:
+        project_ids = _prepare_projects(bench, args.projects)
+        
+        submissions = []
+        for seq in range(args.jobs):
+            duplicate = submissions and rng.random() < args.duplicate_ratio
+            if duplicate:
+                submissions.append(dict(rng.choice(submissions)))
+                continue
+            submissions.append({
+                "project_id": rng.choice(project_ids),
+                "job_type": rng.choices(names, weights)[0],
+                # Distinct params so deduplication only kicks in for intended duplicates
+                "params": {"bench_seq": seq},
+            })
+        
+        submit_latency, submit_queries = [], []
+        lock = threading.Lock()
+        
+        def submit(payload):
+            start = time.perf_counter()
+            response = bench.client.post("/api/v1/jobs", json=payload)
+            elapsed = time.perf_counter() - start
+            with lock:
+                submit_latency.append(elapsed)
+                submit_queries.append(int(response.headers.get("X-DB-Queries", 0)))
+            return response.json()["id"] if response.status_code == 200 else None
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            job_ids = [job_id for job_id in pool.map(submit, submissions) if job_id]
+        submit_wall = time.perf_counter() - started
+        
+        unique_ids = list(dict.fromkeys(job_ids))
+        rq_jobs = _wait_rq(bench, unique_ids, args.timeout)
+        drain_wall = time.perf_counter() - started
+        worker_queries = bench.queries.worker
+        
+        queue_latency, run_time, end_to_end, overhead = [], [], [], []
+        outcomes: dict[str, int] = {}
+        for job in rq_jobs:
+            outcomes[job.get_status()] = outcomes.get(job.get_status(), 0) + 1
+            if job.enqueued_at and job.started_at:
+                queue_latency.append((job.started_at - job.enqueued_at).total_seconds())
+            if job.started_at and job.ended_at:
+                run_time.append((job.ended_at - job.started_at).total_seconds())
+            if job.enqueued_at and job.ended_at:
+                end_to_end.append((job.ended_at - job.enqueued_at).total_seconds())
+            if "worker_overhead_ms" in job.meta:
+                overhead.append(job.meta["worker_overhead_ms"] / 1000.0)
+    
+    return {
+        "config": {
+            "jobs": args.jobs, "clients": args.clients, "workers": args.workers,
+            "mix": args.mix, "duplicate_ratio": args.duplicate_ratio,
+            "blender_startup": args.blender_startup, "blender_run": args.blender_run,
+        },
+        "submitted": len(job_ids),
+        "executed": len(unique_ids),
+        "deduplicated": len(job_ids) - len(unique_ids),
+        "outcomes": outcomes,
+        "submit_wall_seconds": round(submit_wall, 3),
+        "drain_wall_seconds": round(drain_wall, 3),
+        "throughput_jobs_per_second": round(len(unique_ids) / drain_wall, 3) if drain_wall else 0.0,
+        "submit_latency": summarize(submit_latency),
+        "queue_latency": summarize(queue_latency),
+        "run_time": summarize(run_time),
+        "end_to_end": summarize(end_to_end),
+        "worker_overhead": summarize(overhead),
+        "db_queries_per_submit": summarize([float(q) for q in submit_queries]),
+        "db_queries_per_job_worker": round(worker_queries / len(unique_ids), 2) if unique_ids else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent submitting clients")
+    parser.add_argument("--workers", type=int, default=4, help="in-process RQ worker threads")
+    parser.add_argument("--projects", type=int, default=4)
+    parser.add_argument("--mix", default="run_blender=0.6,generate_script=0.3,extract=0.1")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="fraction of repeated submissions")
+    parser.add_argument("--blender-startup", type=float, default=0.3)
+    parser.add_argument("--blender-run", type=float, default=0.2)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--redis-url", default=None, help="real Redis instead of the in-memory stand-in")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_out", default=None)
+    args = parser.parse_args(argv)
+    
+    configure_environment(
+        database_url=args.database_url,
+        redis_url=args.redis_url,
+        blender_startup=args.blender_startup,
+        blender_run=args.blender_run,
+    )
+    
+    report = run_load(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json_out:
+        Path(args.json_out).write_text(text, encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Microbenchmarks for hot paths.
+
+    python -m benchmarks.micro                     # print a report
+    python -m benchmarks.micro --json base.json    # save results
+    python -m benchmarks.micro --compare base.json # fail on regressions
+
+Covers build_blender_script, save_upload_file and the list endpoints
+(with SQL statement counts per request).
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.harness import configure_environment, summarize
+
+
+def _time_calls(fn, repeat: int, warmup: int = 3) -> list[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_build_blender_script(repeat: int) -> dict:
+    from app.workers.tasks import build_blender_script
+    
+    results = {}
+    for hole_count in (8, 128, 1024):
+        def call(hole_count=hole_count):
+            build_blender_script(
+                L=120.0, W=54.0, T=5.0,
+                hole_d=9.6, hole_count=hole_count,
+                ring_radius=18.9, fillet_radius=2.4,
+                project_id="bench",
+            )
+        results[f"build_blender_script[holes={hole_count}]"] = summarize(_time_calls(call, repeat))
+    return results
+
+
+def bench_save_upload_file(repeat: int) -> dict:
+    from app.core.storage import save_upload_file
+    
+    results = {}
+    for label, size in (("64KiB", 64 * 1024), ("4MiB", 4 * 1024 * 1024), ("32MiB", 32 * 1024 * 1024)):
+        payload = b"solid bench\n" * (size // 12)
+        # Fewer repeats for the big payloads - they are I/O bound anyway
+        n = max(3, repeat // (1 if size < 1 << 20 else 10))
+        
+        def call(payload=payload):
+            save_upload_file(io.BytesIO(payload), "bench.stl")
+        results[f"save_upload_file[{label}]"] = summarize(_time_calls(call, n, warmup=1))
+    return results
+
+
+def bench_list_endpoints(repeat: int, rows: int) -> dict:
+    from benchmarks.harness import Bench
+    from app.core.database import SessionLocal
+    from app.models.job import Job
+    from app.models.script_version import ScriptVersion
+    
+    results = {}
+    with Bench() as bench:
+        project_id = bench.seed_project()
+        for i in range(rows // 10):
+            bench.client.post("/api/v1/projects", json={"name": f"bench-{i}"})
+        
+        db = SessionLocal()
+        try:
+            db.add_all(
+                Job(project_id=project_id, job_type="extract", status="succeeded", progress=100, params={"seq": i})
+                for i in range(rows)
+            )
+            db.add_all(
+                ScriptVersion(project_id=project_id, version=i + 1, script_text="# bench\n" * 200)
+                for i in range(min(rows, 200))
+            )
+            db.commit()
+        finally:
+            db.close()
+        
+        endpoints = {
+            "GET /projects": "/api/v1/projects",
+            "GET /jobs?limit=100": "/api/v1/jobs?limit=100",
+            "GET /jobs?project_id&status": f"/api/v1/jobs?project_id={project_id}&status=succeeded",
+            "GET /scripts/{project_id}": f"/api/v1/scripts/{project_id}",
+        }
+        for label, url in endpoints.items():
+            response = bench.client.get(url)
+            response.raise_for_status()
+            stats = summarize(_time_calls(lambda url=url: bench.client.get(url), repeat))
+            stats["queries_per_request"] = int(response.headers["X-DB-Queries"])
+            results[label] = stats
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Names of benchmarks whose p50 regressed by more than threshold (fraction)"""
+    regressions = []
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if not base or not base.get("p50"):
+            continue
+        change = (stats["p50"] - base["p50"]) / base["p50"]
+        if change > threshold:
+            regressions.append(f"{name}: p50 {base['p50']:.6f}s -> {stats['p50']:.6f}s (+{change:.0%})")
+        if stats.get("queries_per_request", 0) > base.get("queries_per_request", 0) and "queries_per_request" in base:
+            regressions.append(
+                f"{name}: queries/request {base['queries_per_request']} -> {stats['queries_per_request']}"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=1000, help="jobs seeded for list endpoint benchmarks")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--only", choices=["script", "upload", "endpoints"], default=None)
+    parser.add_argument("--json", dest="json_out", default=None, help="write results to this file")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed p50 regression (fraction)")
+    args = parser.parse_args(argv)
+    
+    configure_environment(database_url=args.database_url)
+    
+    results = {}
+    if args.only in (None, "script"):
+        results.update(bench_build_blender_script(args.repeat))
+    if args.only in (None, "upload"):
+        results.update(bench_save_upload_file(args.repeat))
+    if args.only in (None, "endpoints"):
+        results.update(bench_list_endpoints(args.repeat, args.rows))
+    
+    width = max(len(name) for name in results)
+    for name, stats in results.items():
+        extra = f"  queries={stats['queries_per_request']}" if "queries_per_request" in stats else ""
+        print(
+            f"{name:<{width}}  p50={stats['p50'] * 1000:9.3f}ms  p95={stats['p95'] * 1000:9.3f}ms  "
+            f"n={stats['n']}{extra}"
+        )
+    
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+Shared test fixtures.
+
+Settings are read when app.core.config is imported, so the environment is
+set up here, before any test module imports from `app`. Redis is an
+in-memory fakeredis server (pip install fakeredis).
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from app.core import queue
+
+
+@pytest.fixture
+def redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    previous = queue._conn
+    conn = fakeredis.FakeRedis()
+    queue.use_connection(conn)
+    yield conn
+    queue.use_connection(previous)
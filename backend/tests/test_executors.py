@@ -0,0 +1,175 @@
+"""Executor routing, cost recording and the local executor (app.workers.executors)"""
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.core.shape_descriptors import load_triangles
+from app.workers import executors
+from app.workers.executors import (
+    COST_SAMPLES,
+    EXECUTORS,
+    CadExecutor,
+    CadTask,
+    NoExecutorAvailable,
+    mean_cost,
+    record_cost,
+    route,
+    write_obj,
+    write_stl,
+)
+
+
+def cube(size: float = 10.0) -> np.ndarray:
+    """(12, 3, 3) triangles of an axis-aligned cube with outward normals"""
+    corners = np.array([[x, y, z] for x in (0, size) for y in (0, size) for z in (0, size)], dtype=np.float32)
+    faces = [
+        (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5),
+        (0, 4, 5), (0, 5, 1), (2, 3, 7), (2, 7, 6),
+        (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+    ]
+    return corners[np.array(faces)]
+
+
+@pytest.fixture
+def executor_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CAD_EXECUTORS", "blender,local")
+    monkeypatch.setattr(settings, "BLENDER_EXEC_MODE", "server_headless")
+
+
+@pytest.fixture
+def stl_source(tmp_path):
+    path = tmp_path / "source.stl"
+    write_stl(cube(), path)
+    return path
+
+
+def export_task(tmp_path, sources, formats) -> CadTask:
+    out = tmp_path / "out"
+    return CadTask(
+        job_id="job-1",
+        operation="export",
+        workdir=out,
+        formats=formats,
+        outputs={fmt: out / f"model.{fmt}" for fmt in formats},
+        sources=sources,
+    )
+
+
+class StubExecutor(CadExecutor):
+    """Returns a fixed return code without doing anything"""
+    name = "stub"
+    operations = frozenset({"export"})
+    
+    def __init__(self, returncode: int = 0):
+        self.returncode = returncode
+    
+    def run(self, task):
+        return self.returncode, None, None, None
+
+
+# ===== Routing =====
+
+def test_mesh_export_routes_to_local(redis, executor_settings, tmp_path, stl_source):
+    task = export_task(tmp_path, {"blend": "/runs/model.blend", "stl": str(stl_source)}, ["obj"])
+    assert route(task).name == "local"
+
+
+def test_format_local_cannot_write_routes_to_blender(redis, executor_settings, tmp_path, stl_source):
+    task = export_task(tmp_path, {"blend": "/runs/model.blend", "stl": str(stl_source)}, ["glb"])
+    assert route(task).name == "blender"
+
+
+def test_recorded_costs_change_the_choice(redis, executor_settings, tmp_path, stl_source):
+    task = export_task(tmp_path, {"blend": "/runs/model.blend", "stl": str(stl_source)}, ["stl"])
+    for _ in range(5):
+        record_cost("local", "export", 30.0)
+    assert route(task).name == "blender"
+
+
+def test_named_tool_restricts_candidates(redis, executor_settings, tmp_path, stl_source):
+    task = export_task(tmp_path, {"blend": "/runs/model.blend", "stl": str(stl_source)}, ["stl"])
+    assert route(task, "Blender").name == "blender"
+
+
+def test_disabled_executors_are_skipped(redis, executor_settings, monkeypatch, tmp_path, stl_source):
+    monkeypatch.setattr(settings, "BLENDER_EXEC_MODE", "local_only")
+    task = export_task(tmp_path, {"blend": "/runs/model.blend", "stl": str(stl_source)}, ["glb"])
+    with pytest.raises(NoExecutorAvailable, match="glb"):
+        route(task)
+    with pytest.raises(NoExecutorAvailable, match="'blender' executor"):
+        route(export_task(tmp_path, {"stl": str(stl_source)}, ["stl"]), "blender")
+
+
+# ===== Cost recording =====
+
+def test_mean_cost_defaults_until_recorded(redis):
+    local = EXECUTORS["local"]
+    assert mean_cost(local, "export") == local.default_cost_seconds
+    record_cost("local", "export", 1.0)
+    record_cost("local", "export", 3.0)
+    assert mean_cost(local, "export") == pytest.approx(2.0)
+
+
+def test_cost_samples_are_capped(redis):
+    for i in range(COST_SAMPLES + 10):
+        record_cost("local", "measure", float(i))
+    assert redis.llen(executors._cost_key("local", "measure")) == COST_SAMPLES
+    # The newest samples are kept
+    assert mean_cost(EXECUTORS["local"], "measure") == pytest.approx(np.mean(range(10, COST_SAMPLES + 10)))
+
+
+def test_only_successful_runs_are_recorded(redis, tmp_path):
+    task = export_task(tmp_path, {}, [])
+    assert StubExecutor(returncode=1).execute(task).returncode == 1
+    assert redis.llen(executors._cost_key("stub", "export")) == 0
+    result = StubExecutor().execute(task)
+    assert result.returncode == 0
+    assert result.usage_dict()["executor"] == "stub"
+    assert redis.llen(executors._cost_key("stub", "export")) == 1
+
+
+# ===== Local executor =====
+
+@pytest.mark.parametrize("fmt", ["stl", "obj"])
+def test_local_export_keeps_the_geometry(redis, tmp_path, stl_source, fmt):
+    task = export_task(tmp_path, {"stl": str(stl_source)}, [fmt])
+    result = EXECUTORS["local"].execute(task)
+    assert result.returncode == 0
+    assert set(result.outputs) == {fmt}
+    exported = load_triangles(result.outputs[fmt].read_bytes(), result.outputs[fmt].name)
+    assert exported.shape == (12, 3, 3)
+    assert np.allclose(np.sort(exported.reshape(-1, 3), axis=0), np.sort(cube().reshape(-1, 3), axis=0))
+
+
+def test_local_export_reads_obj_sources(redis, tmp_path):
+    source = tmp_path / "source.obj"
+    write_obj(cube(), source)
+    task = export_task(tmp_path, {"obj": str(source)}, ["stl"])
+    result = EXECUTORS["local"].execute(task)
+    assert result.returncode == 0
+    assert len(load_triangles(result.outputs["stl"].read_bytes(), "model.stl")) == 12
+
+
+def test_local_measure_of_a_cube(redis, tmp_path, stl_source):
+    task = CadTask(
+        job_id="job-1",
+        operation="measure",
+        workdir=tmp_path / "out",
+        sources={"stl": str(stl_source)},
+        params={"density_g_cm3": 2.0},
+    )
+    result = EXECUTORS["local"].execute(task)
+    assert result.returncode == 0
+    metrics = result.metrics
+    assert metrics["triangles"] == 12
+    assert metrics["volume_mm3"] == pytest.approx(1000.0)
+    assert metrics["surface_area_mm2"] == pytest.approx(600.0)
+    assert (metrics["bbox_x_mm"], metrics["bbox_y_mm"], metrics["bbox_z_mm"]) == pytest.approx((10.0, 10.0, 10.0))
+    assert metrics["mass_g"] == pytest.approx(2.0)
+
+
+def test_local_executor_rejects_empty_meshes(redis, tmp_path):
+    source = tmp_path / "empty.stl"
+    write_stl(np.zeros((0, 3, 3), dtype=np.float32), source)
+    result = EXECUTORS["local"].execute(export_task(tmp_path, {"stl": str(source)}, ["obj"]))
+    assert result.returncode == 1
+    assert result.outputs == {}
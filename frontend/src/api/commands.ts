@@ -0,0 +1,17 @@
+import { api } from './client'
+
+export interface CommandSuggestion {
+  command: string
+  count: number
+  tool?: string | null
+}
+
+export interface CommandSuggestionsOut {
+  prefix: string
+  suggestions: CommandSuggestion[]
+}
+
+export const commandsApi = {
+  suggest: (prefix: string, tool?: string, limit: number = 5) =>
+    api.get<CommandSuggestionsOut>('/commands/suggest', { params: { prefix, tool, limit } }),
+}
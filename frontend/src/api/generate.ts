@@ -0,0 +1,34 @@
+import { api } from './client'
+import type { JobOut } from './jobs'
+
+export interface TemplateParameters {
+  length?: number
+  width?: number
+  thickness?: number
+  hole_diameter?: number
+  hole_count?: number
+  hole_ring_radius?: number
+  fillet_radius?: number
+}
+
+export interface GenerateIn {
+  prompt: string
+  project_id?: string
+  project_name?: string
+  parameters?: TemplateParameters
+  formats?: string[]
+  run_blender?: boolean
+}
+
+export interface GenerateOut {
+  project_id: string
+  prompt_key: string
+  interpreter: string
+  cached: boolean
+  parameters: TemplateParameters
+  job: JobOut
+}
+
+export const generateApi = {
+  create: (data: GenerateIn) => api.post<GenerateOut>('/generate', data),
+}
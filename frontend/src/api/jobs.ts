@@ -1,7 +1,7 @@
 import { api } from './client'
 
-export type JobType = 'extract' | 'generate_script' | 'run_blender'
-export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed'
+export type JobType = 'extract' | 'generate_script' | 'run_blender' | 'export' | 'measure' | 'sweep'
+export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled'
 
 export interface JobOut {
   id: string
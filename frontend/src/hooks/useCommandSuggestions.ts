@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { commandsApi } from '../api/commands'
 
 interface CommandSuggestion {
   command: string
@@ -6,27 +7,6 @@ interface CommandSuggestion {
   tool?: string
 }
 
-// Mock suggestions - replace with actual API call
-const mockSuggestions: Record<string, CommandSuggestion[]> = {
-  blender: [
-    { command: 'Create a cube with dimensions 10x10x10', description: 'Simple cube primitive' },
-    { command: 'Generate a sphere with radius 5', description: 'Sphere primitive' },
-    { command: 'Create a cylinder with height 20 and radius 3', description: 'Cylinder primitive' },
-    { command: 'Generate a torus with major radius 8 and minor radius 2', description: 'Torus primitive' },
-    { command: 'Create a mesh grid with 50x50 subdivisions', description: 'Grid mesh' },
-  ],
-  rhino: [
-    { command: 'Create NURBS surface with 4 control points', description: 'NURBS surface' },
-    { command: 'Generate lofted surface between 3 curves', description: 'Lofted surface' },
-    { command: 'Create extruded surface from curve', description: 'Extruded surface' },
-  ],
-  freecad: [
-    { command: 'Create parametric box with length, width, height', description: 'Parametric box' },
-    { command: 'Generate sketch-based extrusion', description: 'Sketch extrusion' },
-    { command: 'Create part with fillet edges', description: 'Filleted part' },
-  ],
-}
-
 export function useCommandSuggestions(
   query: string,
   tool: string = 'blender',
@@ -38,32 +18,39 @@ export function useCommandSuggestions(
   useEffect(() => {
     if (!enabled || query.length < 2) {
       setSuggestions([])
+      setIsLoading(false)
       return
     }
 
     setIsLoading(true)
+    let cancelled = false
 
     // Debounce
     const timer = setTimeout(() => {
-      // Filter mock suggestions based on query
-      const toolSuggestions = mockSuggestions[tool] || mockSuggestions.blender
-      const filtered = toolSuggestions
-        .filter((s) =>
-          s.command.toLowerCase().includes(query.toLowerCase()) ||
-          s.description?.toLowerCase().includes(query.toLowerCase())
-        )
-        .slice(0, 5)
-
-      setSuggestions(filtered)
-      setIsLoading(false)
-
-      // TODO: Replace with actual API call
-      // api.get(`/commands/suggestions`, { params: { q: query, tool } })
-      //   .then(res => setSuggestions(res.data))
-      //   .finally(() => setIsLoading(false))
+      commandsApi
+        .suggest(query, tool)
+        .then((res) => {
+          if (cancelled) return
+          setSuggestions(
+            res.data.suggestions.map((s) => ({
+              command: s.command,
+              description: `Used ${s.count} time${s.count === 1 ? '' : 's'}`,
+              tool: s.tool ?? undefined,
+            }))
+          )
+        })
+        .catch(() => {
+          if (!cancelled) setSuggestions([])
+        })
+        .finally(() => {
+          if (!cancelled) setIsLoading(false)
+        })
     }, 200)
 
-    return () => clearTimeout(timer)
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
   }, [query, tool, enabled])
 
   return { suggestions, isLoading }
@@ -1,4 +1,6 @@
 import { useState, useCallback } from 'react'
+import { generateApi } from '../api/generate'
+import { jobsApi, JobOut } from '../api/jobs'
 
 interface GenerateOptions {
   prompt: string
@@ -8,6 +10,20 @@ interface GenerateOptions {
   referenceFile?: File | null
 }
 
+const POLL_INTERVAL_MS = 1000
+
+async function waitForJob(jobId: string, onProgress: (job: JobOut) => void): Promise<JobOut> {
+  for (;;) {
+    const { data: job } = await jobsApi.get(jobId)
+    onProgress(job)
+    if (job.status === 'succeeded') return job
+    if (job.status === 'failed' || job.status === 'cancelled') {
+      throw new Error(job.message || `Job ${job.status}`)
+    }
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS))
+  }
+}
+
 export function useGenerateModel() {
   const [isGenerating, setIsGenerating] = useState(false)
   const [generationProgress, setGenerationProgress] = useState(0)
@@ -22,31 +38,32 @@ export function useGenerateModel() {
     setModelData(null)
 
     try {
-      // Simulate generation progress
-      const steps = [
-        'Analyzing prompt...',
-        'Generating 3D model...',
-        'Applying textures...',
-        'Finalizing...',
-      ]
+      setGenerationStep('Analyzing prompt...')
+      const { data: generated } = await generateApi.create({
+        prompt: options.prompt,
+        formats: options.exportFormat ? [options.exportFormat.toLowerCase()] : undefined,
+      })
+      setGenerationProgress(10)
 
-      for (let i = 0; i < steps.length; i++) {
-        setGenerationStep(steps[i])
-        setGenerationProgress((i + 1) * 25)
-        await new Promise((resolve) => setTimeout(resolve, 1000))
-      }
+      setGenerationStep('Generating script...')
+      const scriptJob = await waitForJob(generated.job.id, (job) => {
+        setGenerationProgress(10 + Math.round(job.progress * 0.3))
+      })
 
-      // TODO: Replace with actual API call
-      // const response = await api.post('/generate', options)
-      // setModelData(response.data)
-      
-      // Keep options parameter for future use when implementing API integration
-      void options
+      setGenerationStep('Generating 3D model...')
+      const blenderJob = await waitForJob(scriptJob.result.next_job_id, (job) => {
+        setGenerationProgress(40 + Math.round(job.progress * 0.6))
+      })
 
-      // Simulate success
       setGenerationProgress(100)
       setGenerationStep('Complete')
-      setModelData({ success: true, url: 'mock-model-url.stl' })
+      setModelData({
+        success: true,
+        projectId: generated.project_id,
+        parameters: generated.parameters,
+        exports: blenderJob.result?.exports,
+        job: blenderJob,
+      })
     } catch (err: any) {
       setError(err.message || 'Generation failed')
       setGenerationStep('Failed')